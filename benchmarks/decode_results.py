@@ -0,0 +1,98 @@
+"""Measures how long it takes to decode a large findMany page and build its
+result, with each JSON decoder and result format.
+
+Run it from the root of the repository with:
+
+    python -m benchmarks.decode_results
+"""
+from json import (
+    dumps,
+    loads)
+from noloco.constants import (
+    COMPACT,
+    EAGER,
+    LAZY)
+from noloco.results import Result
+from timeit import timeit
+
+
+PAGE_SIZE = 5000
+REPEATS = 5
+
+
+def build_body():
+    edges = [
+        {
+            'node': {
+                'id': index,
+                'uuid': f'uuid-{index}',
+                'createdAt': '2023-01-02T03:04:05.678Z',
+                'email': f'user{index}@noloco.io',
+                'firstName': f'User {index}',
+                'score': index / 3,
+                'active': index % 2 == 0,
+                'company': {
+                    'id': index % 10,
+                    'name': f'Company {index % 10}'
+                }
+            }
+        }
+        for index
+        in range(PAGE_SIZE)]
+
+    return dumps({
+        'data': {
+            'userCollection': {
+                'totalCount': PAGE_SIZE,
+                'edges': edges,
+                'pageInfo': {
+                    'hasPreviousPage': False,
+                    'hasNextPage': False,
+                    'startCursor': None,
+                    'endCursor': None
+                },
+                '__typename': 'UserConnection'
+            }
+        }
+    }).encode()
+
+
+def decode(json_loads, body, result_format):
+    result = Result.build(
+        'user',
+        'userCollection',
+        json_loads(body)['data'],
+        {'include': {'company': True}},
+        None,
+        result_format)
+
+    # Read a field from every record, as a caller typically would.
+    return sum(record['id'] for record in result.data)
+
+
+def main():
+    decoders = [('json', loads)]
+
+    try:
+        from orjson import loads as orjson_loads
+        decoders.append(('orjson', orjson_loads))
+    except ImportError:
+        print('orjson is not installed, so only json is measured.')
+
+    body = build_body()
+    print(f'Decoding {PAGE_SIZE} records ({len(body)} bytes):')
+
+    for decoder_name, json_loads in decoders:
+        seconds = timeit(lambda: json_loads(body), number=REPEATS) / REPEATS
+        print(f'  {decoder_name:<8}{"decode":<10}{seconds * 1000:8.1f}ms')
+
+        for result_format in EAGER, LAZY, COMPACT:
+            seconds = timeit(
+                lambda: decode(json_loads, body, result_format),
+                number=REPEATS) / REPEATS
+            print(f'  {decoder_name:<8}{result_format:<10}'
+                  f'{seconds * 1000:8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+from json import dumps
+from noloco.constants import (
+    BOOLEAN,
+    DATE,
+    DECIMAL,
+    INTEGER,
+    MULTIPLE_OPTION)
+from noloco.pagination import (
+    iterate_pages,
+    iterate_pages_async,
+    prefetch,
+    prefetch_async)
+from noloco.utils import import_optional_dependency
+
+
+def import_pyarrow():
+    return import_optional_dependency('pyarrow', 'arrow')
+
+
+def arrow_type(pyarrow, field_type):
+    if field_type == INTEGER:
+        return pyarrow.int64()
+    elif field_type == DECIMAL:
+        return pyarrow.float64()
+    elif field_type == BOOLEAN:
+        return pyarrow.bool_()
+    elif field_type == DATE:
+        return pyarrow.timestamp('ms', tz='UTC')
+    elif field_type == MULTIPLE_OPTION:
+        return pyarrow.list_(pyarrow.string())
+    else:
+        return pyarrow.string()
+
+
+def arrow_schema(data_type):
+    pyarrow = import_pyarrow()
+
+    # Only the top-level fields are exported, which are the fields that are
+    # always fetched for the data type.
+    return pyarrow.schema([
+        pyarrow.field(field['name'], arrow_type(pyarrow, field['type']))
+        for field
+        in data_type['fields']
+        if field['relationship'] is None])
+
+
+def arrow_column(pyarrow, field, values):
+    if field.type == pyarrow.timestamp('ms', tz='UTC'):
+        # Dates are returned as ISO 8601 strings and are parsed by Arrow.
+        return pyarrow.array(values, type=pyarrow.string()).cast(field.type)
+    elif field.type == pyarrow.string():
+        # Any field without a more specific type, such as a duration, is
+        # stored as its JSON encoding.
+        return pyarrow.array(
+            [
+                value if value is None or isinstance(value, str)
+                else dumps(value)
+                for value
+                in values
+            ],
+            type=field.type)
+    else:
+        return pyarrow.array(values, type=field.type)
+
+
+def build_record_batch(schema, records):
+    pyarrow = import_pyarrow()
+
+    return pyarrow.record_batch(
+        [
+            arrow_column(
+                pyarrow,
+                field,
+                [record.get(field.name) for record in records])
+            for field
+            in schema
+        ],
+        schema=schema)
+
+
+def iterate_record_batches(
+        find_many,
+        data_type,
+        options,
+        page_size,
+        prefetch_pages=0):
+    schema = arrow_schema(data_type)
+
+    pages = iterate_pages(find_many, data_type['name'], options, page_size)
+    if prefetch_pages > 0:
+        pages = prefetch(pages, prefetch_pages)
+
+    # Each page is converted and released before the next one is read.
+    for page in pages:
+        yield build_record_batch(schema, page.data)
+
+
+async def iterate_record_batches_async(
+        find_many,
+        data_type,
+        options,
+        page_size,
+        prefetch_pages=0):
+    schema = arrow_schema(data_type)
+
+    pages = iterate_pages_async(
+        find_many,
+        data_type['name'],
+        options,
+        page_size)
+    if prefetch_pages > 0:
+        pages = prefetch_async(pages, prefetch_pages)
+
+    async for page in pages:
+        yield build_record_batch(schema, page.data)
+
+
+def parquet_writer(path, data_type):
+    parquet = import_optional_dependency('pyarrow.parquet', 'arrow')
+
+    return parquet.ParquetWriter(path, arrow_schema(data_type))
@@ -0,0 +1,350 @@
+from hashlib import sha256
+from noloco.cache import LRUCache
+from noloco.constants import DEFAULT_CACHE_SWEEP_INTERVAL
+from noloco.exceptions import NolocoCacheBackendError
+import os
+import socket
+import sqlite3
+from tempfile import mkstemp
+from threading import (
+    Lock,
+    local)
+import time
+
+
+def expires_at(ttl):
+    return None if ttl is None else time.time() + ttl
+
+
+def has_expired(expiry):
+    return expiry is not None and time.time() >= expiry
+
+
+def create_private_directory(directory):
+    # Cached entries can hold API keys, so only their owner can read them.
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+
+class MemoryBackend:
+    # Keeps entries in this process, evicting the least recently used once
+    # there are more than `max_size` of them.
+    blocking = False
+
+    def __init__(self, max_size):
+        self.__entries = LRUCache(max_size)
+
+    def get(self, key):
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+
+        value, expiry = entry
+        return None if has_expired(expiry) else value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        self.__entries.set(key, (value, expires_at(ttl)))
+
+    def delete(self, key):
+        self.__entries.delete(key)
+
+
+class FileBackend:
+    # Keeps each entry in its own file in a directory, which can be shared by
+    # every process on the machine.
+    blocking = True
+
+    def __init__(self, directory, sweep_interval=DEFAULT_CACHE_SWEEP_INTERVAL):
+        self.directory = directory
+        self.sweep_interval = sweep_interval
+        self.__next_sweep = 0
+
+    def __path(self, key):
+        return os.path.join(
+            self.directory,
+            sha256(key.encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self.__path(key), 'rb') as entry_file:
+                expiry, _, value = entry_file.read().partition(b'\n')
+            expiry = float(expiry) if expiry else None
+        except (OSError, ValueError):
+            # A missing or unreadable entry is treated as a miss.
+            return None
+
+        return None if has_expired(expiry) else value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        expiry = expires_at(ttl)
+        header = b'' if expiry is None else repr(expiry).encode()
+
+        # Each entry is written to a temporary file that only its owner can
+        # read, which is then moved into place so that readers never see a
+        # partially written entry.
+        create_private_directory(self.directory)
+        descriptor, temporary_path = mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as entry_file:
+                entry_file.write(header + b'\n' + value)
+            os.replace(temporary_path, self.__path(key))
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+        self.__sweep()
+
+    def __sweep(self):
+        # Expired entries are removed as new ones are written, at most once
+        # every `sweep_interval` seconds, so the directory does not keep
+        # growing.
+        now = time.time()
+        if now < self.__next_sweep:
+            return
+
+        self.__next_sweep = now + self.sweep_interval
+
+        for entry_name in os.listdir(self.directory):
+            # Temporary files are still being written by another process.
+            if len(entry_name) != 64:
+                continue
+
+            entry_path = os.path.join(self.directory, entry_name)
+            try:
+                with open(entry_path, 'rb') as entry_file:
+                    expiry = entry_file.readline().strip()
+
+                if expiry and has_expired(float(expiry)):
+                    os.unlink(entry_path)
+            except (OSError, ValueError):
+                pass
+
+    def delete(self, key):
+        try:
+            os.unlink(self.__path(key))
+        except FileNotFoundError:
+            pass
+
+
+class SQLiteBackend:
+    # Keeps entries in a SQLite database, which can be shared by every process
+    # on the machine.
+    blocking = True
+
+    def __init__(self, path):
+        self.path = path
+        self.__connections = local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        create_private_directory(directory)
+        os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+
+        try:
+            with self.__connection() as connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS entries ('
+                    'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                    'expires_at REAL)')
+        except sqlite3.Error as err:
+            raise NolocoCacheBackendError(str(err))
+
+    def __connection(self):
+        # SQLite connections cannot be shared between threads, so each thread
+        # opens its own.
+        connection = getattr(self.__connections, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self.__connections.connection = connection
+
+        return connection
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        # SQLite errors, such as the database being locked for too long, are
+        # raised as cache backend errors so that the caches treat them as a
+        # miss rather than failing the call.
+        try:
+            rows = self.__connection().execute(
+                'SELECT key, value FROM entries WHERE key IN '
+                f'({", ".join("?" for _ in keys)}) '
+                'AND (expires_at IS NULL OR expires_at > ?)',
+                [*keys, time.time()]).fetchall()
+        except sqlite3.Error as err:
+            raise NolocoCacheBackendError(str(err))
+
+        values = dict(rows)
+
+        return [values.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        try:
+            with self.__connection() as connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO entries VALUES (?, ?, ?)',
+                    (key, value, expires_at(ttl)))
+
+                # Expired entries are removed as new ones are written, so the
+                # database does not keep growing.
+                connection.execute(
+                    'DELETE FROM entries WHERE expires_at <= ?',
+                    (time.time(),))
+        except sqlite3.Error as err:
+            raise NolocoCacheBackendError(str(err))
+
+    def delete(self, key):
+        try:
+            with self.__connection() as connection:
+                connection.execute(
+                    'DELETE FROM entries WHERE key = ?',
+                    (key,))
+        except sqlite3.Error as err:
+            raise NolocoCacheBackendError(str(err))
+
+
+def encode_command(*arguments):
+    # Commands are sent as an array of bulk strings in the Redis protocol.
+    encoded_arguments = [
+        argument if isinstance(argument, bytes) else str(argument).encode()
+        for argument
+        in arguments]
+
+    return b''.join(
+        [f'*{len(encoded_arguments)}\r\n'.encode()] + [
+            f'${len(argument)}\r\n'.encode() + argument + b'\r\n'
+            for argument
+            in encoded_arguments])
+
+
+def read_reply(reader):
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('The connection to the cache was closed')
+
+    reply_type, body = line[:1], line[1:-2]
+
+    if reply_type == b'+':
+        return body
+    elif reply_type == b'-':
+        raise NolocoCacheBackendError(body.decode())
+    elif reply_type == b':':
+        return int(body)
+    elif reply_type == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+
+        value = reader.read(length + 2)
+        if len(value) != length + 2:
+            raise ConnectionError('The connection to the cache was closed')
+        return value[:-2]
+    elif reply_type == b'*':
+        length = int(body)
+        if length < 0:
+            return None
+
+        return [read_reply(reader) for _ in range(length)]
+    else:
+        raise NolocoCacheBackendError(f'Unexpected reply {line!r}')
+
+
+class RedisBackend:
+    # Keeps entries on a server that speaks the Redis protocol, which can be
+    # shared by every process that can reach it.
+    blocking = True
+
+    def __init__(
+            self,
+            host='localhost',
+            port=6379,
+            db=0,
+            password=None,
+            prefix='noloco:',
+            timeout=5):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.prefix = prefix
+        self.timeout = timeout
+        self.__password = password
+
+        self.__lock = Lock()
+        self.__socket = None
+        self.__reader = None
+
+    def __connect(self):
+        connection = socket.create_connection(
+            (self.host, self.port),
+            self.timeout)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.__socket = connection
+        self.__reader = connection.makefile('rb')
+
+        # A connection that could not be authenticated or switched to its
+        # database is dropped, so that no command is sent over it.
+        try:
+            if self.__password is not None:
+                self.__send(encode_command('AUTH', self.__password))
+            if self.db != 0:
+                self.__send(encode_command('SELECT', self.db))
+        except Exception:
+            self.__disconnect()
+            raise
+
+    def __send(self, command):
+        self.__socket.sendall(command)
+        return read_reply(self.__reader)
+
+    def __disconnect(self):
+        if self.__socket is not None:
+            self.__reader.close()
+            self.__socket.close()
+            self.__socket = None
+            self.__reader = None
+
+    def __execute(self, *arguments):
+        command = encode_command(*arguments)
+
+        # The connection is shared, so one command is sent at a time. If it
+        # has been dropped since it was last used it is reconnected once.
+        with self.__lock:
+            for attempt in range(2):
+                try:
+                    if self.__socket is None:
+                        self.__connect()
+                    return self.__send(command)
+                except OSError:
+                    self.__disconnect()
+                    if attempt == 1:
+                        raise
+
+    def close(self):
+        with self.__lock:
+            self.__disconnect()
+
+    def get(self, key):
+        return self.__execute('GET', self.prefix + key)
+
+    def get_many(self, keys):
+        return self.__execute('MGET', *[self.prefix + key for key in keys])
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            self.__execute('SET', self.prefix + key, value)
+        else:
+            self.__execute(
+                'SET',
+                self.prefix + key,
+                value,
+                'PX',
+                max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self.__execute('DEL', self.prefix + key)
@@ -0,0 +1,644 @@
+import asyncio
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    wait)
+from gql import gql
+from gql.transport.exceptions import TransportQueryError
+from noloco.constants import EAGER
+from noloco.exceptions import (
+    NolocoBatchNotExecutedError,
+    NolocoDataTypeNotFoundError,
+    NolocoFieldNotFoundError)
+from noloco.mutations import MutationBuilder
+from noloco.queries import QueryBuilder
+from noloco.requests import (
+    create_command,
+    delete_command,
+    find_many_command,
+    find_unique_command,
+    is_validation_failure,
+    update_command)
+from noloco.utils import gql_args
+from pydash import get
+from re import search
+
+
+class BatchOperation:
+    def __init__(self, command):
+        self.command = command
+        self.document_failed = False
+        self.error = None
+        self.executed = False
+        self.__result = None
+
+    def resolve(self, result):
+        self.__result = result
+        self.executed = True
+
+    def reject(self, error, document_failed=False):
+        # An operation that failed along with the rest of its document was
+        # never executed, so it can safely be sent again.
+        self.document_failed = document_failed
+        self.error = error
+        self.executed = True
+
+    def result(self):
+        """Returns the result of the operation once the batch has executed.
+
+        Returns:
+            The same result the equivalent client call would have returned.
+
+        Raises:
+            NolocoBatchNotExecutedError: If the batch has not executed yet.
+            TransportQueryError: If this operation failed.
+        """
+        if not self.executed:
+            raise NolocoBatchNotExecutedError()
+        elif self.error is not None:
+            raise self.error
+        else:
+            return self.__result
+
+
+class BatchDocument:
+    def __init__(
+            self,
+            snapshot,
+            operations,
+            failed_operations,
+            document=None,
+            dependencies=None,
+            variable_values=None,
+            upload_files=False):
+        # The operations that were built into the document, and those that
+        # could not be built along with the errors they failed with.
+        self.operations = operations
+        self.failed_operations = failed_operations
+
+        self.dependencies = dependencies or set()
+        self.document = document
+        self.snapshot = snapshot
+        self.upload_files = upload_files
+        self.variable_values = variable_values
+
+    def has_missing_schema(self):
+        return any(
+            isinstance(
+                err,
+                (NolocoDataTypeNotFoundError, NolocoFieldNotFoundError))
+            for _, err
+            in self.failed_operations)
+
+    def reject_failed_operations(self):
+        for operation, err in self.failed_operations:
+            operation.reject(err)
+
+
+class Batch:
+    def __init__(
+            self,
+            project,
+            find_many_callback,
+            find_unique_callback,
+            result_format=EAGER):
+        self.__find_many_callback = find_many_callback
+        self.__find_unique_callback = find_unique_callback
+        self.__mutation_builder = MutationBuilder()
+        self.__project = project
+        self.__query_builder = QueryBuilder()
+        self.__result_format = result_format
+
+        self.operations = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.execute_async()
+
+    def create(self, data_type_name, options):
+        return self.__add(create_command(
+            self.__project,
+            data_type_name,
+            options,
+            self.__find_unique_callback,
+            self.__result_format))
+
+    def delete(self, data_type_name, id):
+        return self.__add(delete_command(
+            self.__project,
+            data_type_name,
+            id,
+            self.__result_format))
+
+    def findMany(self, data_type_name, options={}):
+        return self.__add(find_many_command(
+            self.__project,
+            data_type_name,
+            options,
+            self.__find_many_callback,
+            self.__result_format))
+
+    def findUnique(self, data_type_name, options):
+        return self.__add(find_unique_command(
+            self.__project,
+            data_type_name,
+            options,
+            self.__find_unique_callback,
+            self.__result_format))
+
+    def update(self, data_type_name, id, options):
+        return self.__add(update_command(
+            self.__project,
+            data_type_name,
+            id,
+            options,
+            self.__find_unique_callback,
+            self.__result_format))
+
+    def execute(self):
+        """Sends every operation that has not been executed yet. Queries and
+        mutations cannot share a GraphQL document, so at most two requests are
+        made: one for all of the queries and one for all of the mutations.
+
+        Returns:
+            The results of all of the operations in the batch, in the order
+            they were added. An operation that failed is returned as its
+            error rather than raising it.
+        """
+        self.__project.connect()
+
+        for operations in self.__pending_groups():
+            self.__execute_group(operations)
+
+        return self.results()
+
+    async def execute_async(self):
+        """Sends every operation that has not been executed yet. See
+        `Batch.execute`.
+        """
+        await self.__project.connect()
+
+        for operations in self.__pending_groups():
+            await self.__execute_group_async(operations)
+
+        return self.results()
+
+    def results(self):
+        return [
+            operation.error if operation.error is not None
+            else operation.result()
+            for operation
+            in self.operations]
+
+    def __add(self, command):
+        # Every operation is aliased by its position in the batch so that
+        # operations on the same data type do not collide in the document.
+        command.with_alias(f'b{len(self.operations)}_{command.result_name}')
+
+        operation = BatchOperation(command)
+        self.operations.append(operation)
+
+        return operation
+
+    def __pending_groups(self):
+        mutations = []
+        queries = []
+
+        for operation in self.operations:
+            if not operation.executed:
+                if operation.command.is_mutation():
+                    mutations.append(operation)
+                else:
+                    queries.append(operation)
+
+        return [group for group in [queries, mutations] if group]
+
+    def __build_document(self, operations):
+        # Every operation is built from the same snapshot of the project,
+        # which the document is then executed against. An operation that
+        # cannot be built is left out of the document, so that it fails on its
+        # own without failing the rest of the batch.
+        snapshot = self.__project.snapshot
+        built_operations = []
+        failed_operations = []
+        shapes = []
+        dependencies = set()
+        fragments = []
+        flattened_options = {}
+        upload_files = False
+
+        for operation in operations:
+            try:
+                shape, operation_dependencies, fragment, \
+                    operation_flattened_options, operation_upload_files = \
+                    operation.command.build_fragment(snapshot)
+            except Exception as err:
+                failed_operations.append((operation, err))
+                continue
+
+            built_operations.append(operation)
+            shapes.append(shape)
+            dependencies |= operation_dependencies
+            fragments.append(fragment)
+            flattened_options.update(operation_flattened_options)
+            upload_files = upload_files or operation_upload_files
+
+        if not built_operations:
+            return BatchDocument(snapshot, [], failed_operations)
+
+        # Batches of the same shape, such as the chunks of a bulk import,
+        # share the same parsed document.
+        document_key = ('batch', tuple(shapes))
+        document = self.__project.documents.get(document_key)
+
+        if document is None:
+            if built_operations[0].command.is_mutation():
+                document = self.__mutation_builder.build_mutation(
+                    fragments,
+                    flattened_options)
+            else:
+                document = self.__query_builder.build_query(
+                    fragments,
+                    flattened_options)
+
+            document = gql(document)
+            self.__project.cache_document(
+                document_key,
+                document,
+                dependencies,
+                snapshot.generation)
+
+        return BatchDocument(
+            snapshot,
+            built_operations,
+            failed_operations,
+            document,
+            dependencies,
+            gql_args(flattened_options),
+            upload_files)
+
+    def __execute_group(self, operations, retry=True):
+        document = self.__build_document(operations)
+
+        # An operation on a data type or field that is missing from the schema
+        # may have been built against a stale schema, so the schema is
+        # refreshed once before those operations are failed.
+        if document.has_missing_schema() and retry:
+            self.__project.refresh(generation=document.snapshot.generation)
+            document = self.__build_document(operations)
+
+        document.reject_failed_operations()
+        if not document.operations:
+            return
+
+        try:
+            raw_result = document.snapshot.client.execute(
+                document.document,
+                variable_values=document.variable_values,
+                upload_files=document.upload_files)
+        except TransportQueryError as err:
+            if is_validation_failure(err) and retry:
+                self.__project.refresh(
+                    generation=document.snapshot.generation)
+                return self.__execute_group(document.operations, retry=False)
+            else:
+                raw_result = err
+        finally:
+            self.__invalidate_results(
+                document.operations,
+                document.dependencies)
+
+        self.__resolve_group(
+            document.operations,
+            document.snapshot,
+            raw_result)
+
+    async def __execute_group_async(self, operations, retry=True):
+        document = self.__build_document(operations)
+
+        if document.has_missing_schema() and retry:
+            await self.__project.refresh(
+                generation=document.snapshot.generation)
+            document = self.__build_document(operations)
+
+        document.reject_failed_operations()
+        if not document.operations:
+            return
+
+        try:
+            raw_result = await document.snapshot.client.execute(
+                document.document,
+                variable_values=document.variable_values,
+                upload_files=document.upload_files)
+        except TransportQueryError as err:
+            if is_validation_failure(err) and retry:
+                await self.__project.refresh(
+                    generation=document.snapshot.generation)
+                return await self.__execute_group_async(
+                    document.operations,
+                    retry=False)
+            else:
+                raw_result = err
+        finally:
+            await self.__invalidate_results_async(
+                document.operations,
+                document.dependencies)
+
+        self.__resolve_group(
+            document.operations,
+            document.snapshot,
+            raw_result)
+
+    def __invalidate_results(self, operations, dependencies):
+        # Mutations discard the cached results of every query that depends on
+        # a data type they could have changed.
+        results = self.__project.results
+        if results is not None and operations[0].command.is_mutation():
+            results.invalidate(dependencies)
+
+    async def __invalidate_results_async(self, operations, dependencies):
+        results = self.__project.results
+        if results is not None and operations[0].command.is_mutation():
+            await results.invalidate_async(dependencies)
+
+    def __resolve_group(self, operations, snapshot, raw_result):
+        if isinstance(raw_result, TransportQueryError):
+            # Errors are attributed to the operation whose alias is at the
+            # start of their path. An error without a path means the document
+            # was not executed at all, and is attributed to the operation
+            # whose variable it names, such as a value that could not be
+            # coerced to its type. Any other error without a path failed the
+            # document as a whole, so every operation in it failed too.
+            err = raw_result
+            data = err.data or {}
+            keys_by_prefix = {
+                operation.command.result_key().split('_', 1)[0]:
+                operation.command.result_key()
+                for operation
+                in operations}
+            errors_by_key = {}
+            document_errors = []
+            unexecuted_errors = []
+            for error in err.errors or []:
+                path = get(error, 'path') or []
+                if path:
+                    errors_by_key.setdefault(path[0], []).append(error)
+                    continue
+
+                unexecuted_errors.append(error)
+                variable = search(r'\$(b[0-9]+)_', get(error, 'message', ''))
+                if variable and variable.group(1) in keys_by_prefix:
+                    errors_by_key.setdefault(
+                        keys_by_prefix[variable.group(1)],
+                        []).append(error)
+                else:
+                    document_errors.append(error)
+        else:
+            err = None
+            data = raw_result
+            errors_by_key = {}
+            document_errors = []
+            unexecuted_errors = []
+
+        for operation in operations:
+            command = operation.command
+            result_key = command.result_key()
+            own_errors = errors_by_key.get(result_key, [])
+            operation_errors = own_errors + document_errors
+
+            # An operation that was not executed fails too, even if it was
+            # another operation in the document that caused it.
+            document_failed = bool(unexecuted_errors) and not own_errors
+            if document_failed and not operation_errors:
+                operation_errors = unexecuted_errors
+
+            if operation_errors:
+                operation.reject(
+                    TransportQueryError(
+                        str(operation_errors[0]),
+                        errors=operation_errors,
+                        data={result_key: get(data, result_key)},
+                        extensions=err.extensions),
+                    document_failed=document_failed)
+            else:
+                operation.resolve(command.build_result(
+                    {result_key: get(data, result_key)},
+                    snapshot.data_types))
+
+
+class BulkResult:
+    def __init__(self, results):
+        # Every row's result or error, in the same order as the input rows.
+        self.results = results
+        self.succeeded = []
+        self.failed = []
+
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                self.failed.append((index, result))
+            else:
+                self.succeeded.append((index, result))
+
+    def __str__(self):
+        return f'{{\'succeeded\': {len(self.succeeded)}, ' \
+            f'\'failed\': {len(self.failed)}}}'
+
+
+def chunk_rows(rows, chunk_size):
+    chunk = []
+
+    for row in rows:
+        chunk.append(row)
+
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def unique_lookup(data_type_name, field_name, options):
+    # Looks up the record with each value of a unique field, as an operation
+    # that can be added to a batch.
+    def add_operation(batch, value):
+        return batch.findUnique(
+            data_type_name,
+            {**options, 'where': {field_name: {'equals': value}}})
+
+    return add_operation
+
+
+def add_rows(batch, add_operation, chunk):
+    # A row that cannot be added to the batch, for example because it is
+    # missing its data, fails on its own without failing the rest of the
+    # chunk.
+    operations = []
+
+    for row in chunk:
+        try:
+            operations.append(add_operation(batch, row))
+        except Exception as err:
+            operations.append(err)
+
+    return operations
+
+
+def row_results(operations, batch_error):
+    results = []
+
+    for operation in operations:
+        if isinstance(operation, Exception):
+            results.append(operation)
+        elif not operation.executed:
+            # If the request as a whole fails, for example because the server
+            # could not be reached, every row that was sent failed with it.
+            results.append(batch_error)
+        elif operation.error is not None:
+            results.append(operation.error)
+        else:
+            results.append(operation.result())
+
+    return results
+
+
+def failed_documents(chunk, operations):
+    # Rows that failed only because their document was not executed, as
+    # another row in it had a bad value, are sent again. If every row in the
+    # chunk failed that way the error could not be attributed to any of them,
+    # so the rows are split in half until the ones that caused it fail on
+    # their own.
+    indexes = [
+        index
+        for index, operation
+        in enumerate(operations)
+        if isinstance(operation, BatchOperation) and operation.document_failed]
+
+    if len(chunk) == 1 or not indexes:
+        return []
+    elif len(indexes) == len(chunk):
+        middle = len(indexes) // 2
+        return [indexes[:middle], indexes[middle:]]
+    else:
+        return [indexes]
+
+
+def execute_chunk(new_batch, add_operation, chunk):
+    batch = new_batch()
+    operations = add_rows(batch, add_operation, chunk)
+
+    try:
+        batch.execute()
+        batch_error = None
+    except Exception as err:
+        batch_error = err
+
+    results = row_results(operations, batch_error)
+    for indexes in failed_documents(chunk, operations):
+        retried_results = execute_chunk(
+            new_batch,
+            add_operation,
+            [chunk[index] for index in indexes])
+        for index, result in zip(indexes, retried_results):
+            results[index] = result
+
+    return results
+
+
+async def execute_chunk_async(new_batch, add_operation, chunk):
+    batch = new_batch()
+    operations = add_rows(batch, add_operation, chunk)
+
+    try:
+        await batch.execute_async()
+        batch_error = None
+    except Exception as err:
+        batch_error = err
+
+    results = row_results(operations, batch_error)
+    for indexes in failed_documents(chunk, operations):
+        retried_results = await execute_chunk_async(
+            new_batch,
+            add_operation,
+            [chunk[index] for index in indexes])
+        for index, result in zip(indexes, retried_results):
+            results[index] = result
+
+    return results
+
+
+def run_bulk(new_batch, add_operation, rows, chunk_size, max_workers):
+    chunk_results = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+
+        # Only keep a bounded number of chunks in flight so that the rows are
+        # consumed from the iterable as the chunks are sent, rather than all
+        # up front.
+        for chunk in chunk_rows(rows, chunk_size):
+            if len(in_flight) >= max_workers:
+                _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            future = executor.submit(
+                execute_chunk,
+                new_batch,
+                add_operation,
+                chunk)
+            chunk_results.append(future)
+            in_flight.add(future)
+
+    results = []
+    for future in chunk_results:
+        results.extend(future.result())
+
+    return BulkResult(results)
+
+
+async def run_bulk_async(
+        new_batch,
+        add_operation,
+        rows,
+        chunk_size,
+        max_workers):
+    chunk_results = []
+    in_flight = set()
+
+    try:
+        # As with run_bulk, only a bounded number of chunks are in flight so
+        # that the rows are consumed as the chunks are sent.
+        for chunk in chunk_rows(rows, chunk_size):
+            if len(in_flight) >= max_workers:
+                _, in_flight = await asyncio.wait(
+                    in_flight,
+                    return_when=asyncio.FIRST_COMPLETED)
+
+            task = asyncio.ensure_future(execute_chunk_async(
+                new_batch,
+                add_operation,
+                chunk))
+            chunk_results.append(task)
+            in_flight.add(task)
+
+        await asyncio.gather(*chunk_results)
+    finally:
+        # If the rows fail to iterate or the call is cancelled, the chunks
+        # still in flight are cancelled with it.
+        for task in in_flight:
+            task.cancel()
+
+    results = []
+    for chunk_result in chunk_results:
+        results.extend(chunk_result.result())
+
+    return BulkResult(results)
@@ -0,0 +1,279 @@
+import asyncio
+from collections import OrderedDict
+from functools import partial
+from hashlib import sha256
+from json import (
+    dumps,
+    loads)
+from noloco.exceptions import NolocoCacheBackendError
+from noloco.schema import schema_fingerprint
+from threading import Lock
+import time
+from uuid import uuid4
+
+
+async def call_backend(backend, function, *args):
+    # A backend that blocks on I/O, such as reading a file or talking to a
+    # server, is called from a thread so that it does not hold up the event
+    # loop. A backend that does not block is called straight away.
+    if not getattr(backend, 'blocking', True):
+        return function(*args)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(function, *args))
+
+
+class LRUCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key, default=None):
+        with self.__lock:
+            if key not in self.__entries:
+                return default
+
+            self.__entries.move_to_end(key)
+            return self.__entries[key][0]
+
+    def set(self, key, value, tags=()):
+        if self.max_size <= 0:
+            return
+
+        with self.__lock:
+            self.__entries[key] = (value, frozenset(tags))
+            self.__entries.move_to_end(key)
+
+            # Evict the least recently used entries once the cache is full.
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def invalidate(self, tags):
+        # Remove every entry that was tagged with any of the tags.
+        tags = frozenset(tags)
+
+        with self.__lock:
+            for key in [
+                    key
+                    for key, (value, entry_tags)
+                    in self.__entries.items()
+                    if entry_tags & tags]:
+                del self.__entries[key]
+
+
+class CachedSchema:
+    def __init__(self, project_api_key, data_types, fingerprint, saved_at):
+        self.project_api_key = project_api_key
+        self.data_types = data_types
+        self.fingerprint = fingerprint
+        self.saved_at = saved_at
+
+
+class SchemaCache:
+    def __init__(self, backend, ttl, account_api_key):
+        self.backend = backend
+        self.ttl = ttl
+
+        # Entries are only shared between clients with the same account API
+        # key, which is never stored itself.
+        self.__account = sha256(account_api_key.encode()).hexdigest()
+
+    def __key(self, project_name):
+        key = sha256(f'{self.__account}:{project_name}'.encode()).hexdigest()
+        return f'schema:{key}'
+
+    def load(self, project_name, include_expired=False):
+        try:
+            entry = loads(self.backend.get(self.__key(project_name)))
+
+            cached_schema = CachedSchema(
+                entry['projectApiKey'],
+                entry['dataTypes'],
+                entry['fingerprint'],
+                entry['savedAt'])
+        except (
+                OSError,
+                NolocoCacheBackendError,
+                ValueError,
+                KeyError,
+                TypeError):
+            # A missing or unreadable entry is treated as a miss.
+            return None
+
+        if not include_expired and \
+                time.time() - cached_schema.saved_at > self.ttl:
+            return None
+
+        if schema_fingerprint(cached_schema.data_types) != \
+                cached_schema.fingerprint:
+            return None
+
+        return cached_schema
+
+    def save(self, project_name, project_api_key, data_types):
+        entry = dumps({
+            'projectName': project_name,
+            'projectApiKey': project_api_key,
+            'dataTypes': data_types,
+            'fingerprint': schema_fingerprint(data_types),
+            'savedAt': time.time()
+        })
+
+        # Expired entries are kept, as their project API key is still worth
+        # validating when the schema is next fetched.
+        self.backend.set(self.__key(project_name), entry.encode())
+
+    async def load_async(self, project_name, include_expired=False):
+        return await call_backend(
+            self.backend,
+            self.load,
+            project_name,
+            include_expired)
+
+    async def save_async(self, project_name, project_api_key, data_types):
+        await call_backend(
+            self.backend,
+            self.save,
+            project_name,
+            project_api_key,
+            data_types)
+
+
+class ResultCache:
+    def __init__(self, backend, ttl, namespace):
+        self.backend = backend
+        self.ttl = ttl
+        self.__namespace = namespace
+
+    def __generation_key(self, data_type_name=None):
+        if data_type_name is None:
+            return f'generation:{self.__namespace}'
+        else:
+            return f'generation:{self.__namespace}:{data_type_name}'
+
+    def __result_key(self, key):
+        return 'result:{}:{}'.format(
+            self.__namespace,
+            sha256(repr(key).encode()).hexdigest())
+
+    def generations(self, data_type_names):
+        # Every data type has a generation that is replaced whenever it is
+        # invalidated, along with one for the cache as a whole, so a result is
+        # only current while the generations it was read at are.
+        generation_keys = [self.__generation_key()] + [
+            self.__generation_key(data_type_name)
+            for data_type_name
+            in sorted(set(data_type_names))]
+
+        try:
+            generations = self.backend.get_many(generation_keys)
+
+            for index, generation in enumerate(generations):
+                if generation is None:
+                    # A missing generation, for example one the backend has
+                    # evicted, starts a new generation rather than reviving
+                    # any results that were stored against the old one.
+                    generations[index] = self.__new_generation(
+                        generation_keys[index])
+        except (OSError, NolocoCacheBackendError):
+            # Without the generations the result cannot be cached.
+            return None
+
+        return [
+            [generation_key, generation.decode()]
+            for generation_key, generation
+            in zip(generation_keys, generations)]
+
+    def get(self, key):
+        try:
+            encoded_entry = self.backend.get(self.__result_key(key))
+            if encoded_entry is None:
+                return None
+
+            entry = loads(encoded_entry)
+            generations = entry['generations']
+            current_generations = self.backend.get_many([
+                generation_key
+                for generation_key, _
+                in generations])
+        except (OSError, NolocoCacheBackendError, ValueError, KeyError):
+            # The cache is only an optimisation, so if it cannot be read the
+            # query is sent instead.
+            return None
+
+        if any(
+                current_generation is None or
+                current_generation.decode() != generation
+                for current_generation, (_, generation)
+                in zip(current_generations, generations)):
+            return None
+
+        # Results are built in place, so every hit decodes a fresh copy.
+        return entry['result']
+
+    def set(self, key, raw_result, generations):
+        # The generations are the ones from before the query was sent, so a
+        # result that raced with a change to its data types is never current.
+        if generations is None:
+            return
+
+        entry = dumps({'generations': generations, 'result': raw_result})
+
+        try:
+            self.backend.set(self.__result_key(key), entry.encode(), self.ttl)
+        except (OSError, NolocoCacheBackendError):
+            pass
+
+    def invalidate(self, data_type_names=None):
+        if data_type_names is None:
+            generation_keys = [self.__generation_key()]
+        else:
+            generation_keys = [
+                self.__generation_key(data_type_name)
+                for data_type_name
+                in set(data_type_names)]
+
+        # The cache is only an optimisation, so failing to invalidate it does
+        # not fail the mutation that triggered it.
+        try:
+            for generation_key in generation_keys:
+                self.__new_generation(generation_key)
+        except (OSError, NolocoCacheBackendError):
+            pass
+
+    async def generations_async(self, data_type_names):
+        return await call_backend(
+            self.backend,
+            self.generations,
+            data_type_names)
+
+    async def get_async(self, key):
+        return await call_backend(self.backend, self.get, key)
+
+    async def set_async(self, key, raw_result, generations):
+        await call_backend(
+            self.backend,
+            self.set,
+            key,
+            raw_result,
+            generations)
+
+    async def invalidate_async(self, data_type_names=None):
+        await call_backend(self.backend, self.invalidate, data_type_names)
+
+    def __new_generation(self, generation_key):
+        generation = uuid4().hex.encode()
+        self.backend.set(generation_key, generation)
+        return generation
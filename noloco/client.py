@@ -1,21 +1,117 @@
-from gql import Client
-from gql.transport.aiohttp import AIOHTTPTransport
-from noloco.project import Project
-from noloco.requests import Command
-from noloco.utils import options_without_data
+from functools import partial
+from hashlib import sha256
+from noloco.arrow import (
+    iterate_record_batches,
+    iterate_record_batches_async,
+    parquet_writer)
+from noloco.backends import (
+    FileBackend,
+    MemoryBackend)
+from noloco.batches import (
+    Batch,
+    run_bulk,
+    run_bulk_async,
+    unique_lookup)
+from noloco.cache import (
+    ResultCache,
+    SchemaCache)
+from noloco.constants import (
+    DEFAULT_BULK_CHUNK_SIZE,
+    DEFAULT_BULK_MAX_WORKERS,
+    DEFAULT_DOCUMENT_CACHE_SIZE,
+    DEFAULT_EXPORT_WORKERS,
+    DEFAULT_LOADER_MAX_BATCH_SIZE,
+    DEFAULT_LOADER_WINDOW,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_POOL_SIZE_PER_HOST,
+    DEFAULT_RESULT_CACHE_TTL,
+    DEFAULT_SCHEMA_CACHE_TTL,
+    COMPACT,
+    EAGER)
+from noloco.loaders import (
+    AsyncLoader,
+    Loader)
+from noloco.pagination import (
+    export_records,
+    export_records_async,
+    iterate_records,
+    iterate_records_async)
+from noloco.project import (
+    AsyncProject,
+    Project)
+from noloco.requests import (
+    create_command,
+    delete_command,
+    find_many_command,
+    find_unique_command,
+    update_command)
+from noloco.transports import TransportBuilder
+from noloco.utils import find_data_type_by_name
 
 
 CORE_BASE_URL = 'https://api.core.noloco.io'
 PROJECT_BASE_URL = 'https://api.portals.noloco.io'
 
 
+def build_schema_cache(
+        schema_cache_dir,
+        schema_cache_backend,
+        schema_cache_ttl,
+        account_api_key):
+    if schema_cache_backend is None and schema_cache_dir is not None:
+        schema_cache_backend = FileBackend(schema_cache_dir)
+
+    if schema_cache_backend is None:
+        return None
+    else:
+        return SchemaCache(
+            schema_cache_backend,
+            schema_cache_ttl,
+            account_api_key)
+
+
+def build_result_cache(
+        result_cache_size,
+        result_cache_backend,
+        result_cache_ttl,
+        account_api_key,
+        portal_name):
+    if result_cache_backend is None and result_cache_size > 0:
+        result_cache_backend = MemoryBackend(result_cache_size)
+
+    if result_cache_backend is None:
+        return None
+    else:
+        # Results are only shared between clients for the same portal with
+        # the same account API key, which is never stored itself.
+        return ResultCache(
+            result_cache_backend,
+            result_cache_ttl,
+            sha256(f'{account_api_key}:{portal_name}'.encode()).hexdigest())
+
+
 class Noloco:
     def __init__(
         self,
         account_api_key,
         portal_name,
         core_base_url=CORE_BASE_URL,
-        project_base_url=PROJECT_BASE_URL
+        project_base_url=PROJECT_BASE_URL,
+        pool_size=DEFAULT_POOL_SIZE,
+        pool_size_per_host=DEFAULT_POOL_SIZE_PER_HOST,
+        keep_alive=True,
+        document_cache_size=DEFAULT_DOCUMENT_CACHE_SIZE,
+        result_format=EAGER,
+        json_loads=None,
+        schema_cache_dir=None,
+        schema_cache_ttl=DEFAULT_SCHEMA_CACHE_TTL,
+        lazy=False,
+        preload=False,
+        result_cache_size=0,
+        result_cache_ttl=DEFAULT_RESULT_CACHE_TTL,
+        schema_cache_backend=None,
+        result_cache_backend=None
     ):
         """Initialises a Noloco client.
 
@@ -29,6 +125,57 @@ class Noloco:
             project_base_url: The URL that the project API is hosted at. This
                 is an optional parameter and if you are using the production
                 API you should not provide it.
+            pool_size: The maximum number of connections the client will keep
+                open to Noloco.
+            pool_size_per_host: The maximum number of connections the client
+                will keep open to any one Noloco host.
+            keep_alive: Whether connections are kept alive and reused between
+                calls. This is on by default so that, once connected, each call
+                only costs a single round trip.
+            document_cache_size: The maximum number of parsed GraphQL documents
+                to keep. Calls that only differ in their values reuse the same
+                document instead of building and parsing it again.
+            result_format: How results are returned. By default ('eager')
+                every nested record and collection in a result is wrapped as
+                soon as it is returned. When this is 'lazy' they are only
+                wrapped the first time they are read, which is much cheaper
+                for large results when only some of their fields are used.
+                When this is 'compact' each record only stores its values and
+                shares its field names with every similar record, which uses
+                much less memory for large pages. Compact records are read
+                only.
+            json_loads: The function used to decode the JSON body of every
+                response, in place of the standard library's `json.loads`. It
+                is passed the raw body, for example `orjson.loads`.
+            schema_cache_dir: A directory to cache the project's data types
+                and API key in. When a fresh entry exists, the client is built
+                from it without contacting Noloco. Entries are only readable by
+                the current user, and a cached schema is refreshed as soon as
+                a call fails to validate against it.
+            schema_cache_ttl: The number of seconds a cached schema is used
+                for before it is fetched again.
+            lazy: Whether to defer fetching the project document and validating
+                the API keys until the client is first used, so that
+                constructing the client never blocks on the network. Any error
+                is then raised from the first call instead.
+            preload: When the client is lazy, whether to start fetching the
+                project document in a background thread straight away, so that
+                it is usually ready by the time of the first call.
+            result_cache_size: The maximum number of query results to cache.
+                Results are not cached unless this is set. A cached result is
+                returned for a `findMany` or `findUnique` with the same
+                options, and is discarded when a record of any data type it
+                depends on is created, updated or deleted through the client.
+            result_cache_ttl: The number of seconds a query result is cached
+                for.
+            schema_cache_backend: A cache backend to cache the project's data
+                types and API key in, in place of `schema_cache_dir`. A
+                backend such as a `RedisBackend` lets every process that uses
+                it share the cached schema.
+            result_cache_backend: A cache backend to cache query results in,
+                in place of an in-memory cache of `result_cache_size` results.
+                Results are cached whenever this is given, and a backend such
+                as a `RedisBackend` lets every process that uses it share them.
 
         Returns:
             A Noloco client.
@@ -39,16 +186,94 @@ class Noloco:
             NolocoUnknownError: If we are not sure what went wrong.
         """
         # Build the account client that will be used to interact with the
-        # project document.
-        account_transport = AIOHTTPTransport(
-            url=core_base_url, headers={'Authorization': account_api_key})
-        account_client = Client(
-            transport=account_transport,
-            fetch_schema_from_transport=False)
+        # project document. Every client built here holds its connections open
+        # in a pool that is reused across calls until the client is closed.
+        transport_builder = TransportBuilder(
+            pool_size,
+            pool_size_per_host,
+            keep_alive,
+            json_loads)
+        account_client = transport_builder.build_client(
+            core_base_url,
+            account_api_key)
 
         # Fetch the project document, lookup and validate the project API key
         # and cache the data types locally.
-        self.__project = Project(account_client, project_base_url, portal_name)
+        self.__project = Project(
+            account_client,
+            project_base_url,
+            portal_name,
+            transport_builder,
+            document_cache_size,
+            build_schema_cache(
+                schema_cache_dir,
+                schema_cache_backend,
+                schema_cache_ttl,
+                account_api_key),
+            lazy,
+            preload,
+            build_result_cache(
+                result_cache_size,
+                result_cache_backend,
+                result_cache_ttl,
+                account_api_key,
+                portal_name))
+        self.__result_format = result_format
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect(self):
+        """Fetches the project document, validates the API keys and caches
+        the data types locally, if this has not happened yet. You only need to
+        call this on a lazy client, to connect it before its first call.
+
+        Raises:
+            NolocoAccountApiKeyError: If your Account API Key is incorrect.
+            NolocoProjectApiKeyError: If we cannot fetch you Project API Key.
+            NolocoUnknownError: If we are not sure what went wrong.
+        """
+        self.__project.connect()
+
+    def close(self):
+        """Closes the connections held open by the client. You can also use
+        the client as a context manager to close it automatically.
+        """
+        self.__project.close()
+
+    def batch(self):
+        """Starts a batch of operations that are sent to Noloco together in a
+        single request when the batch is executed. The batch has the same
+        create, delete, findMany, findUnique and update methods as the client
+        but rather than returning results they return a `BatchOperation`
+        whose `result()` is available once the batch has executed. For
+        example:
+
+                with client.batch() as batch:
+                    jane = batch.create(
+                        'user',
+                        {'data': {'firstName': 'Jane'}})
+                    john = batch.create(
+                        'user',
+                        {'data': {'firstName': 'John'}})
+
+                print(jane.result().id, john.result().id)
+
+        Using the batch as a context manager executes it on exit, otherwise
+        you can call `batch.execute()` yourself. A failed operation does not
+        fail the rest of the batch; its error is raised from its `result()`.
+
+        Returns:
+            A new batch.
+        """
+        return Batch(
+            self.__project,
+            self.findMany,
+            self.findUnique,
+            self.__result_format)
 
     def create(self, data_type_name, options):
         """Creates a record in a Noloco collection.
@@ -86,14 +311,41 @@ class Noloco:
         Returns:
             The record that was created in the Noloco collection.
         """
-        return Command(self.__project) \
-            .for_data_type(data_type_name) \
-            .with_options(options_without_data(options)) \
-            .mutate('create') \
-            .value(options['data']) \
-            .with_pagination_callback(self.findUnique) \
-            .build() \
-            .execute()
+        return create_command(
+            self.__project,
+            data_type_name,
+            options,
+            self.findUnique,
+            self.__result_format).build().execute()
+
+    def create_many(
+            self,
+            data_type_name,
+            rows,
+            chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+            max_workers=DEFAULT_BULK_MAX_WORKERS):
+        """Creates many records in a Noloco collection. The rows are split into
+        chunks that are each sent as a single batch, and up to `max_workers`
+        chunks are sent at once.
+
+        Args:
+            data_type_name: The name of the data type the collection is for.
+                For example 'user'.
+            rows: An iterable of the options for each record to create, in the
+                same format as the options to `create`.
+            chunk_size: The number of rows to send in each request.
+            max_workers: The maximum number of requests to send at once.
+
+        Returns:
+            A `BulkResult` with the result or error for every row. A row that
+            fails does not stop the others from being created.
+        """
+        return run_bulk(
+            self.batch,
+            lambda batch, options: batch.create(data_type_name, options),
+            rows,
+            chunk_size,
+            max_workers)
 
     def delete(self, data_type_name, id):
         """Deletes a record from a Noloco collection.
@@ -106,14 +358,125 @@ class Noloco:
         Returns:
             None.
         """
-        return Command(self.__project) \
-            .for_data_type(data_type_name) \
-            .mutate('delete') \
-            .with_id_lookup(id) \
-            .build() \
-            .execute()
+        return delete_command(
+            self.__project,
+            data_type_name,
+            id,
+            self.__result_format).build().execute()
+
+    def delete_many(
+            self,
+            data_type_name,
+            ids,
+            chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+            max_workers=DEFAULT_BULK_MAX_WORKERS):
+        """Deletes many records from a Noloco collection. See `create_many`
+        for how the rows are sent.
+
+        Args:
+            data_type_name: The name of the data type the collection is for.
+                For example 'user'.
+            ids: An iterable of the IDs of the records to delete.
+            chunk_size: The number of rows to send in each request.
+            max_workers: The maximum number of requests to send at once.
+
+        Returns:
+            A `BulkResult` with the result or error for every row.
+        """
+        return run_bulk(
+            self.batch,
+            lambda batch, id: batch.delete(data_type_name, id),
+            ids,
+            chunk_size,
+            max_workers)
 
-    def findMany(self, data_type_name, options={}):
+    def export(
+            self,
+            data_type_name,
+            options={},
+            partition_field='id',
+            workers=DEFAULT_EXPORT_WORKERS,
+            page_size=DEFAULT_PAGE_SIZE):
+        """Exports every record in a Noloco collection that matches the
+        provided criteria by fetching disjoint slices of the collection in
+        parallel. The range of `partition_field` across the matching records
+        is split into up to `workers` slices, each slice is paged through in
+        its own thread and the records are yielded as their pages arrive. For
+        example:
+
+                for order in client.export('order', workers=8):
+                    print(order.id)
+
+        Records are not returned in any particular order, and records whose
+        `partition_field` is empty are not exported.
+
+        Args:
+            data_type_name: The name of the data type the collection is for.
+                For example 'order'.
+            options: The configuration for the search, in the same format as
+                the options to `findMany`. Any paging options are replaced.
+            partition_field: The field the collection is split on. This must
+                be an integer, decimal or date field, for example 'id' or
+                'createdAt'.
+            workers: The maximum number of slices to fetch in parallel.
+            page_size: The number of records to fetch in each request.
+
+        Returns:
+            A generator of the matching records.
+        """
+        return export_records(
+            self.findMany,
+            data_type_name,
+            options,
+            partition_field,
+            workers,
+            page_size)
+
+    def export_to_parquet(
+            self,
+            data_type_name,
+            path,
+            options={},
+            page_size=DEFAULT_PAGE_SIZE,
+            prefetch_pages=0):
+        """Exports every record in a Noloco collection that matches the
+        provided criteria to a Parquet file. The collection is paged through
+        and each page is written to the file as an Arrow record batch, so only
+        one page is held in memory at a time. This requires PyArrow, which you
+        can install with `pip install noloco[arrow]`.
+
+        Args:
+            data_type_name: The name of the data type the collection is for.
+                For example 'order'.
+            path: The path of the Parquet file to write.
+            options: The configuration for the search, in the same format as
+                the options to `findMany`. Any paging options are replaced.
+            page_size: The number of records to fetch in each request.
+            prefetch_pages: The number of pages to fetch ahead of the page
+                being written. See `iter_many`.
+
+        Returns:
+            The number of records that were written.
+        """
+        self.__project.connect()
+        rows = 0
+
+        with parquet_writer(
+                path,
+                find_data_type_by_name(
+                    data_type_name,
+                    self.__project.data_types)) as writer:
+            for record_batch in self.iter_record_batches(
+                    data_type_name,
+                    options,
+                    page_size,
+                    prefetch_pages):
+                writer.write_batch(record_batch)
+                rows += record_batch.num_rows
+
+        return rows
+
+    def findMany(self, data_type_name, options={}, format=None):
         """Searches a Noloco collection for records matching the provided
         criteria.
 
@@ -143,16 +506,24 @@ class Noloco:
                     }
                 }
 
+            format: The format to return the results in. This overrides the
+                client's `result_format` for this call and any pages fetched
+                from its results. When this is 'columnar' the records are
+                decoded straight into one NumPy array per field, available as
+                `result.columns`, instead of being returned as records. This
+                requires NumPy, which you can install with
+                `pip install noloco[columnar]`.
+
         Returns:
             The result of querying the Noloco collection.
         """
-        return Command(self.__project) \
-            .for_data_type(data_type_name) \
-            .with_options(options) \
-            .query('findMany') \
-            .with_pagination_callback(self.findMany) \
-            .build() \
-            .execute()
+        result_format = format or self.__result_format
+        return find_many_command(
+            self.__project,
+            data_type_name,
+            options,
+            partial(self.findMany, format=result_format),
+            result_format).build().execute()
 
     def findUnique(self, data_type_name, options):
         """Fetches a record from a Noloco collection that you identify by any
@@ -181,14 +552,171 @@ class Noloco:
         Returns:
             The result of looking up the Noloco record.
         """
-        return Command(self.__project) \
-            .for_data_type(data_type_name) \
-            .with_options(options) \
-            .query('findUnique') \
-            .with_unique_lookup() \
-            .with_pagination_callback(self.findUnique) \
-            .build() \
-            .execute()
+        return find_unique_command(
+            self.__project,
+            data_type_name,
+            options,
+            self.findUnique,
+            self.__result_format).build().execute()
+
+    def find_unique_many(
+            self,
+            data_type_name,
+            field_name,
+            values,
+            options={},
+            chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+            max_workers=DEFAULT_BULK_MAX_WORKERS):
+        """Fetches the record with each of many values of a unique field.
+        The lookups are split into chunks that are each sent as a single
+        batch, and up to `max_workers` chunks are sent at once, so looking up
+        hundreds of records only takes a few round trips. For example:
+
+                result = client.find_unique_many(
+                    'user',
+                    'email',
+                    ['jane@noloco.io', 'john@noloco.io'])
+
+        Args:
+            data_type_name: The name of the data type you want to fetch. For
+                example 'user'.
+            field_name: The name of the unique field to look the records up
+                by. For example 'email'.
+            values: An iterable of the values of the field to look up.
+            options: Any other options for the lookups, in the same format as
+                the options to `findUnique`, such as relationships to include.
+            chunk_size: The number of lookups to send in each request.
+            max_workers: The maximum number of requests to send at once.
+
+        Returns:
+            A `BulkResult` with the record or error for every value, in the
+            same order as the values.
+        """
+        return run_bulk(
+            self.batch,
+            unique_lookup(data_type_name, field_name, options),
+            values,
+            chunk_size,
+            max_workers)
+
+    def invalidate_results(self, data_type_name=None):
+        """Discards cached query results. Results are already discarded when
+        a record is created, updated or deleted through the client, so this
+        is only needed when records are changed some other way, for example
+        by another client or in Noloco itself.
+
+        Args:
+            data_type_name: The name of the data type whose results should be
+                discarded, along with any result that includes its records.
+                When this is not given every cached result is discarded.
+
+        Returns:
+            None.
+        """
+        if self.__project.results is not None:
+            self.__project.results.invalidate(
+                None if data_type_name is None else [data_type_name])
+
+    def iter_many(
+            self,
+            data_type_name,
+            options={},
+            page_size=DEFAULT_PAGE_SIZE,
+            prefetch_pages=0):
+        """Iterates over every record in a Noloco collection that matches the
+        provided criteria, fetching them a page at a time as they are needed.
+        Only the current page is held in memory, so this can be used to stream
+        collections of any size. For example:
+
+                for user in client.iter_many('user', {'where': {...}}):
+                    print(user.email)
+
+        Args:
+            data_type_name: The name of the data type the collection is for.
+                For example 'user'.
+            options: The configuration for the search, in the same format as
+                the options to `findMany`. Any paging options are replaced.
+            page_size: The number of records to fetch in each request.
+            prefetch_pages: The number of pages to fetch ahead of the page
+                being iterated over. When this is set the pages are fetched in
+                a background thread, so the next page is usually ready by the
+                time you finish the current one. Fetching pauses once it is
+                this many pages ahead.
+
+        Returns:
+            A generator of the matching records.
+        """
+        return iterate_records(
+            self.findMany,
+            data_type_name,
+            options,
+            page_size,
+            prefetch_pages)
+
+    def iter_record_batches(
+            self,
+            data_type_name,
+            options={},
+            page_size=DEFAULT_PAGE_SIZE,
+            prefetch_pages=0):
+        """Iterates over every record in a Noloco collection that matches the
+        provided criteria as Arrow record batches, one for each page. The
+        schema of the batches is derived from the types of the data type's
+        top-level fields. This requires PyArrow, which you can install with
+        `pip install noloco[arrow]`.
+
+        Args:
+            data_type_name: The name of the data type the collection is for.
+                For example 'order'.
+            options: The configuration for the search, in the same format as
+                the options to `findMany`. Any paging options are replaced.
+            page_size: The number of records to fetch in each request, and so
+                the number of rows in each record batch.
+            prefetch_pages: The number of pages to fetch ahead of the page
+                being iterated over. See `iter_many`.
+
+        Returns:
+            A generator of `pyarrow.RecordBatch`.
+        """
+        self.__project.connect()
+        return iterate_record_batches(
+            partial(self.findMany, format=COMPACT),
+            find_data_type_by_name(data_type_name, self.__project.data_types),
+            options,
+            page_size,
+            prefetch_pages)
+
+    def loader(
+            self,
+            window=DEFAULT_LOADER_WINDOW,
+            max_batch_size=DEFAULT_LOADER_MAX_BATCH_SIZE):
+        """Starts a loader that coalesces `findUnique` lookups. Lookups made
+        through the loader within `window` seconds of each other, from any
+        thread, are sent to Noloco together as a single batch, the same lookup
+        is only sent once, and every record it loads is cached for as long as
+        the loader is in use. For example, using a loader for the duration of
+        a web request:
+
+                with client.loader() as loader:
+                    company = loader.findUnique(
+                        'company',
+                        {'where': {'id': {'equals': 2}}})
+
+        `loader.load` takes the same arguments as `findUnique` but returns a
+        `concurrent.futures.Future` straight away, so that several lookups
+        can be made before waiting for any of them. A failed lookup is not
+        cached.
+
+        Args:
+            window: How long, in seconds, to wait for more lookups before
+                sending them.
+            max_batch_size: The most lookups to send in a single batch; the
+                lookups are sent straight away once there are this many.
+
+        Returns:
+            A new loader, whose cache is cleared when it exits a `with` block.
+        """
+        return Loader(self.batch, window, max_batch_size)
 
     def update(self, data_type_name, id, options):
         """Updates a record in a collection.
@@ -223,12 +751,485 @@ class Noloco:
         Returns:
             The result of updating the Noloco record.
         """
-        return Command(self.__project) \
-            .for_data_type(data_type_name) \
-            .with_options(options_without_data(options)) \
-            .mutate('update') \
-            .with_id_lookup(id) \
-            .value(options['data']) \
-            .with_pagination_callback(self.findUnique) \
-            .build() \
-            .execute()
+        return update_command(
+            self.__project,
+            data_type_name,
+            id,
+            options,
+            self.findUnique,
+            self.__result_format).build().execute()
+
+    def update_many(
+            self,
+            data_type_name,
+            rows,
+            chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+            max_workers=DEFAULT_BULK_MAX_WORKERS):
+        """Updates many records in a Noloco collection. See `create_many` for
+        how the rows are sent.
+
+        Args:
+            data_type_name: The name of the data type the collection is for.
+                For example 'user'.
+            rows: An iterable of `(id, options)` pairs, where the options are
+                in the same format as the options to `update`.
+            chunk_size: The number of rows to send in each request.
+            max_workers: The maximum number of requests to send at once.
+
+        Returns:
+            A `BulkResult` with the result or error for every row.
+        """
+        return run_bulk(
+            self.batch,
+            lambda batch, row: batch.update(data_type_name, row[0], row[1]),
+            rows,
+            chunk_size,
+            max_workers)
+
+
+class AsyncNoloco:
+    def __init__(
+        self,
+        account_api_key,
+        portal_name,
+        core_base_url=CORE_BASE_URL,
+        project_base_url=PROJECT_BASE_URL,
+        pool_size=DEFAULT_POOL_SIZE,
+        pool_size_per_host=DEFAULT_POOL_SIZE_PER_HOST,
+        keep_alive=True,
+        document_cache_size=DEFAULT_DOCUMENT_CACHE_SIZE,
+        result_format=EAGER,
+        json_loads=None,
+        schema_cache_dir=None,
+        schema_cache_ttl=DEFAULT_SCHEMA_CACHE_TTL,
+        result_cache_size=0,
+        result_cache_ttl=DEFAULT_RESULT_CACHE_TTL,
+        schema_cache_backend=None,
+        result_cache_backend=None
+    ):
+        """Initialises an asyncio Noloco client.
+
+        Nothing is fetched when the client is constructed. The project document
+        is fetched and the API keys validated when the client is connected,
+        either explicitly with `await client.connect()`, by using the client as
+        an async context manager, or implicitly on the first call. Every call
+        made through the client then shares a single long-lived session so
+        calls can be awaited concurrently, for example with `asyncio.gather`,
+        up to the limits of the connection pool.
+
+        Args:
+            account_api_key: The Account API Key from your Integrations & API
+                Keys settings page.
+            portal_name: The name of your Noloco portal.
+            core_base_url: The URL that the core API is hosted at. This is an
+                optional parameter and if you are using the production API you
+                should not provide it.
+            project_base_url: The URL that the project API is hosted at. This
+                is an optional parameter and if you are using the production
+                API you should not provide it.
+            pool_size: The maximum number of connections the client will keep
+                open to Noloco.
+            pool_size_per_host: The maximum number of connections the client
+                will keep open to any one Noloco host.
+            keep_alive: Whether connections are kept alive and reused between
+                calls. This is on by default so that, once connected, each call
+                only costs a single round trip.
+            document_cache_size: The maximum number of parsed GraphQL documents
+                to keep. Calls that only differ in their values reuse the same
+                document instead of building and parsing it again.
+            result_format: How results are returned. By default ('eager')
+                every nested record and collection in a result is wrapped as
+                soon as it is returned. When this is 'lazy' they are only
+                wrapped the first time they are read, which is much cheaper
+                for large results when only some of their fields are used.
+                When this is 'compact' each record only stores its values and
+                shares its field names with every similar record, which uses
+                much less memory for large pages. Compact records are read
+                only.
+            json_loads: The function used to decode the JSON body of every
+                response, in place of the standard library's `json.loads`. It
+                is passed the raw body, for example `orjson.loads`.
+            schema_cache_dir: A directory to cache the project's data types
+                and API key in. When a fresh entry exists, the client is built
+                from it without contacting Noloco. Entries are only readable by
+                the current user, and a cached schema is refreshed as soon as
+                a call fails to validate against it.
+            schema_cache_ttl: The number of seconds a cached schema is used
+                for before it is fetched again.
+            result_cache_size: The maximum number of query results to cache.
+                Results are not cached unless this is set. A cached result is
+                returned for a `findMany` or `findUnique` with the same
+                options, and is discarded when a record of any data type it
+                depends on is created, updated or deleted through the client.
+            result_cache_ttl: The number of seconds a query result is cached
+                for.
+            schema_cache_backend: A cache backend to cache the project's data
+                types and API key in, in place of `schema_cache_dir`. A
+                backend such as a `RedisBackend` lets every process that uses
+                it share the cached schema.
+            result_cache_backend: A cache backend to cache query results in,
+                in place of an in-memory cache of `result_cache_size` results.
+                Results are cached whenever this is given, and a backend such
+                as a `RedisBackend` lets every process that uses it share them.
+
+        Returns:
+            An asyncio Noloco client.
+        """
+        # Build the account client that will be used to interact with the
+        # project document.
+        transport_builder = TransportBuilder(
+            pool_size,
+            pool_size_per_host,
+            keep_alive,
+            json_loads)
+        account_client = transport_builder.build_async_client(
+            core_base_url,
+            account_api_key)
+
+        self.__project = AsyncProject(
+            account_client,
+            project_base_url,
+            portal_name,
+            transport_builder,
+            document_cache_size,
+            build_schema_cache(
+                schema_cache_dir,
+                schema_cache_backend,
+                schema_cache_ttl,
+                account_api_key),
+            build_result_cache(
+                result_cache_size,
+                result_cache_backend,
+                result_cache_ttl,
+                account_api_key,
+                portal_name))
+        self.__result_format = result_format
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self):
+        """Fetches the project document, validates the API keys, caches the
+        data types locally and opens the session used by every call. Calling
+        this on a client that is already connected does nothing.
+
+        Raises:
+            NolocoAccountApiKeyError: If your Account API Key is incorrect.
+            NolocoProjectApiKeyError: If we cannot fetch you Project API Key.
+            NolocoUnknownError: If we are not sure what went wrong.
+        """
+        await self.__project.connect()
+
+    async def close(self):
+        """Closes the connections held open by the client."""
+        await self.__project.close()
+
+    def batch(self):
+        """Starts a batch of operations that are sent to Noloco together in a
+        single request. See `Noloco.batch`. The batch executes when it exits
+        an `async with` block, or when `await batch.execute_async()` is
+        called.
+
+        Returns:
+            A new batch.
+        """
+        return Batch(
+            self.__project,
+            self.findMany,
+            self.findUnique,
+            self.__result_format)
+
+    async def create(self, data_type_name, options):
+        """Creates a record in a Noloco collection. See `Noloco.create` for a
+        description of the options.
+
+        Returns:
+            The record that was created in the Noloco collection.
+        """
+        await self.connect()
+        built_command = await create_command(
+            self.__project,
+            data_type_name,
+            options,
+            self.findUnique,
+            self.__result_format).build_async()
+        return await built_command.execute_async()
+
+    async def create_many(
+            self,
+            data_type_name,
+            rows,
+            chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+            max_workers=DEFAULT_BULK_MAX_WORKERS):
+        """Creates many records in a Noloco collection. See
+        `Noloco.create_many`.
+
+        Returns:
+            A `BulkResult` with the result or error for every row.
+        """
+        await self.connect()
+        return await run_bulk_async(
+            self.batch,
+            lambda batch, options: batch.create(data_type_name, options),
+            rows,
+            chunk_size,
+            max_workers)
+
+    async def delete(self, data_type_name, id):
+        """Deletes a record from a Noloco collection. See `Noloco.delete`.
+
+        Returns:
+            None.
+        """
+        await self.connect()
+        built_command = await delete_command(
+            self.__project,
+            data_type_name,
+            id,
+            self.__result_format).build_async()
+        return await built_command.execute_async()
+
+    async def delete_many(
+            self,
+            data_type_name,
+            ids,
+            chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+            max_workers=DEFAULT_BULK_MAX_WORKERS):
+        """Deletes many records from a Noloco collection. See
+        `Noloco.delete_many`.
+
+        Returns:
+            A `BulkResult` with the result or error for every row.
+        """
+        await self.connect()
+        return await run_bulk_async(
+            self.batch,
+            lambda batch, id: batch.delete(data_type_name, id),
+            ids,
+            chunk_size,
+            max_workers)
+
+    def export(
+            self,
+            data_type_name,
+            options={},
+            partition_field='id',
+            workers=DEFAULT_EXPORT_WORKERS,
+            page_size=DEFAULT_PAGE_SIZE):
+        """Exports every record in a Noloco collection that matches the
+        provided criteria by fetching disjoint slices of the collection
+        concurrently. See `Noloco.export`.
+
+        Returns:
+            An async generator of the matching records.
+        """
+        return export_records_async(
+            self.findMany,
+            data_type_name,
+            options,
+            partition_field,
+            workers,
+            page_size)
+
+    async def export_to_parquet(
+            self,
+            data_type_name,
+            path,
+            options={},
+            page_size=DEFAULT_PAGE_SIZE,
+            prefetch_pages=0):
+        """Exports every record in a Noloco collection that matches the
+        provided criteria to a Parquet file. See `Noloco.export_to_parquet`.
+
+        Returns:
+            The number of records that were written.
+        """
+        await self.connect()
+        rows = 0
+
+        with parquet_writer(
+                path,
+                find_data_type_by_name(
+                    data_type_name,
+                    self.__project.data_types)) as writer:
+            async for record_batch in self.iter_record_batches(
+                    data_type_name,
+                    options,
+                    page_size,
+                    prefetch_pages):
+                writer.write_batch(record_batch)
+                rows += record_batch.num_rows
+
+        return rows
+
+    async def findMany(self, data_type_name, options={}, format=None):
+        """Searches a Noloco collection for records matching the provided
+        criteria. See `Noloco.findMany` for a description of the options.
+
+        Any collection in the result pages asynchronously, so
+        `next_page()` and `previous_page()` must be awaited. This includes
+        'columnar' results.
+
+        Returns:
+            The result of querying the Noloco collection.
+        """
+        await self.connect()
+        result_format = format or self.__result_format
+        built_command = await find_many_command(
+            self.__project,
+            data_type_name,
+            options,
+            partial(self.findMany, format=result_format),
+            result_format).build_async()
+        return await built_command.execute_async()
+
+    async def findUnique(self, data_type_name, options):
+        """Fetches a record from a Noloco collection that you identify by any
+        of its unique fields. See `Noloco.findUnique` for a description of the
+        options.
+
+        Returns:
+            The result of looking up the Noloco record.
+        """
+        await self.connect()
+        built_command = await find_unique_command(
+            self.__project,
+            data_type_name,
+            options,
+            self.findUnique,
+            self.__result_format).build_async()
+        return await built_command.execute_async()
+
+    async def find_unique_many(
+            self,
+            data_type_name,
+            field_name,
+            values,
+            options={},
+            chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+            max_workers=DEFAULT_BULK_MAX_WORKERS):
+        """Fetches the record with each of many values of a unique field. See
+        `Noloco.find_unique_many`.
+
+        Returns:
+            A `BulkResult` with the record or error for every value.
+        """
+        await self.connect()
+        return await run_bulk_async(
+            self.batch,
+            unique_lookup(data_type_name, field_name, options),
+            values,
+            chunk_size,
+            max_workers)
+
+    def invalidate_results(self, data_type_name=None):
+        """Discards cached query results. See `Noloco.invalidate_results`.
+
+        Returns:
+            None.
+        """
+        if self.__project.results is not None:
+            self.__project.results.invalidate(
+                None if data_type_name is None else [data_type_name])
+
+    def iter_many(
+            self,
+            data_type_name,
+            options={},
+            page_size=DEFAULT_PAGE_SIZE,
+            prefetch_pages=0):
+        """Iterates over every record in a Noloco collection that matches the
+        provided criteria, fetching them a page at a time as they are needed.
+        See `Noloco.iter_many`; when pages are prefetched they are fetched by
+        a background task rather than a thread. For example:
+
+                async for user in client.iter_many('user'):
+                    print(user.email)
+
+        Returns:
+            An async generator of the matching records.
+        """
+        return iterate_records_async(
+            self.findMany,
+            data_type_name,
+            options,
+            page_size,
+            prefetch_pages)
+
+    async def iter_record_batches(
+            self,
+            data_type_name,
+            options={},
+            page_size=DEFAULT_PAGE_SIZE,
+            prefetch_pages=0):
+        """Iterates over every record in a Noloco collection that matches the
+        provided criteria as Arrow record batches, one for each page. See
+        `Noloco.iter_record_batches`.
+
+        Returns:
+            An async generator of `pyarrow.RecordBatch`.
+        """
+        await self.connect()
+
+        async for record_batch in iterate_record_batches_async(
+                partial(self.findMany, format=COMPACT),
+                find_data_type_by_name(
+                    data_type_name,
+                    self.__project.data_types),
+                options,
+                page_size,
+                prefetch_pages):
+            yield record_batch
+
+    def loader(self, max_batch_size=DEFAULT_LOADER_MAX_BATCH_SIZE):
+        """Starts a loader that coalesces `findUnique` lookups. See
+        `Noloco.loader`. Rather than waiting for a window, the lookups made
+        by every task that runs in the same tick of the event loop are sent
+        together, and `loader.load` returns an `asyncio.Future`.
+
+        Returns:
+            A new loader, whose cache is cleared when it exits an `async with`
+            block.
+        """
+        return AsyncLoader(self.batch, max_batch_size)
+
+    async def update(self, data_type_name, id, options):
+        """Updates a record in a collection. See `Noloco.update` for a
+        description of the options.
+
+        Returns:
+            The result of updating the Noloco record.
+        """
+        await self.connect()
+        built_command = await update_command(
+            self.__project,
+            data_type_name,
+            id,
+            options,
+            self.findUnique,
+            self.__result_format).build_async()
+        return await built_command.execute_async()
+
+    async def update_many(
+            self,
+            data_type_name,
+            rows,
+            chunk_size=DEFAULT_BULK_CHUNK_SIZE,
+            max_workers=DEFAULT_BULK_MAX_WORKERS):
+        """Updates many records in a Noloco collection. See
+        `Noloco.update_many`.
+
+        Returns:
+            A `BulkResult` with the result or error for every row.
+        """
+        await self.connect()
+        return await run_bulk_async(
+            self.batch,
+            lambda batch, row: batch.update(data_type_name, row[0], row[1]),
+            rows,
+            chunk_size,
+            max_workers)
@@ -0,0 +1,138 @@
+from noloco.constants import (
+    BOOLEAN,
+    DATE,
+    DECIMAL,
+    INTEGER)
+from noloco.results import no_page
+from noloco.utils import (
+    find_field_by_name,
+    import_optional_dependency)
+
+
+def build_column(numpy, field_type, values):
+    has_nulls = any(value is None for value in values)
+
+    if field_type == INTEGER:
+        if has_nulls:
+            # Integer arrays cannot hold a null so fall back to floats, where
+            # a missing value is NaN.
+            return numpy.array(
+                [numpy.nan if value is None else value for value in values],
+                dtype=numpy.float64)
+        else:
+            return numpy.array(values, dtype=numpy.int64)
+    elif field_type == DECIMAL:
+        return numpy.array(
+            [numpy.nan if value is None else value for value in values],
+            dtype=numpy.float64)
+    elif field_type == BOOLEAN and not has_nulls:
+        return numpy.array(values, dtype=numpy.bool_)
+    elif field_type == DATE:
+        # Dates are returned in UTC, and a missing date is NaT.
+        return numpy.array(
+            [None if value is None else value.rstrip('Z') for value in values],
+            dtype='datetime64[ms]')
+    else:
+        column = numpy.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+
+
+def build_columns(data_type, nodes):
+    numpy = import_optional_dependency('numpy', 'columnar')
+
+    if nodes:
+        field_names = list(nodes[0].keys())
+    else:
+        # Without any records to go on, the columns are the top-level fields
+        # that are always fetched for the data type.
+        field_names = [
+            field['name']
+            for field
+            in data_type['fields']
+            if field['relationship'] is None]
+
+    columns = {}
+    for field_name in field_names:
+        field = find_field_by_name(field_name, data_type['fields'])
+        field_type = field['type'] if field is not None else None
+
+        columns[field_name] = build_column(
+            numpy,
+            field_type,
+            [node.get(field_name) for node in nodes])
+
+    return columns
+
+
+class ColumnarResult:
+    def __init__(
+            self,
+            data_type,
+            result,
+            options,
+            client):
+        self.__client = client
+        self.__data_type_name = data_type['name']
+        self.__options = options
+        self.__page_info = result['pageInfo']
+
+        self.total_count = result['totalCount']
+        self.has_previous_page = result['pageInfo']['hasPreviousPage']
+        self.has_next_page = result['pageInfo']['hasNextPage']
+        self.start_cursor = result['pageInfo']['startCursor']
+        self.end_cursor = result['pageInfo']['endCursor']
+
+        # The edges are decoded straight into one array per field, without
+        # building a record for each of them.
+        self.columns = build_columns(
+            data_type,
+            [edge['node'] for edge in result['edges']])
+
+    def __getitem__(self, field_name):
+        return self.columns[field_name]
+
+    def __len__(self):
+        return len(self.columns[next(iter(self.columns))]) \
+            if self.columns else 0
+
+    def __str__(self):
+        return str({
+            'total_count': self.total_count,
+            'has_previous_page': self.has_previous_page,
+            'has_next_page': self.has_next_page,
+            'columns': self.columns
+        })
+
+    def __page(self, paged_options):
+        return self.__client(self.__data_type_name, paged_options)
+
+    def previous_page(self):
+        if not self.__page_info['hasPreviousPage']:
+            return no_page(self.__client)
+        else:
+            options = {
+                option: value
+                for option, value
+                in self.__options.items()
+                if option != 'after'}
+            options['before'] = self.__page_info['startCursor']
+
+            return self.__page(options)
+
+    def next_page(self):
+        if not self.__page_info['hasNextPage']:
+            return no_page(self.__client)
+        else:
+            options = {
+                option: value
+                for option, value
+                in self.__options.items()
+                if option != 'before'}
+            options['after'] = self.__page_info['endCursor']
+
+            return self.__page(options)
+
+    @staticmethod
+    def build(data_type, result_name, result, options, client):
+        return ColumnarResult(data_type, result[result_name], options, client)
@@ -60,3 +60,81 @@ MANY_TO_MANY = 'MANY_TO_MANY'
 
 
 GRAPHQL_VALIDATION_FAILED = 'GRAPHQL_VALIDATION_FAILED'
+
+
+###############################################################################
+# Connection Pooling
+###############################################################################
+
+
+DEFAULT_POOL_SIZE = 100
+
+
+DEFAULT_POOL_SIZE_PER_HOST = 100
+
+
+###############################################################################
+# Bulk Operations
+###############################################################################
+
+
+DEFAULT_BULK_CHUNK_SIZE = 50
+
+
+DEFAULT_BULK_MAX_WORKERS = 4
+
+
+###############################################################################
+# Loaders
+###############################################################################
+
+
+DEFAULT_LOADER_MAX_BATCH_SIZE = 50
+
+
+DEFAULT_LOADER_WINDOW = 0.002
+
+
+###############################################################################
+# Caching
+###############################################################################
+
+
+DEFAULT_DOCUMENT_CACHE_SIZE = 256
+
+
+DEFAULT_SCHEMA_CACHE_TTL = 60 * 60
+
+
+DEFAULT_RESULT_CACHE_TTL = 60
+
+
+DEFAULT_CACHE_SWEEP_INTERVAL = 60
+
+
+###############################################################################
+# Pagination
+###############################################################################
+
+
+DEFAULT_PAGE_SIZE = 100
+
+
+DEFAULT_EXPORT_WORKERS = 8
+
+
+###############################################################################
+# Result Formats
+###############################################################################
+
+
+EAGER = 'eager'
+
+
+LAZY = 'lazy'
+
+
+COMPACT = 'compact'
+
+
+COLUMNAR = 'columnar'
@@ -7,6 +7,17 @@ class NolocoAccountApiKeyError(Exception):
         self.error = error
 
 
+class NolocoBatchNotExecutedError(Exception):
+    def __init__(self):
+        super().__init__(
+            'The batch this operation belongs to has not been executed yet.')
+
+
+class NolocoCacheBackendError(Exception):
+    def __init__(self, message):
+        super().__init__(f'The cache backend returned an error: {message}')
+
+
 class NolocoDataTypeNotFoundError(Exception):
     def __init__(self, data_type_name):
         super().__init__(
@@ -37,6 +48,14 @@ class NolocoInvalidSingleFieldConnectionError(Exception):
             f'Value for argument "{argument_name}" must be a single connection')
 
 
+class NolocoMissingDependencyError(Exception):
+    def __init__(self, package_name, extra_name):
+        super().__init__(
+            f'{package_name} is required for this feature. Install it with '
+            f'pip install noloco[{extra_name}]')
+        self.package_name = package_name
+
+
 class NolocoProjectApiKeyError(Exception):
     def __init__(self, project_name, error):
         super().__init__(
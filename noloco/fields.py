@@ -149,8 +149,16 @@ class DataTypeFieldsBuilder:
             data_types,
             response,
             data_type_path='',
-            is_collection=False):
-        data_type_full_name = data_type_path + data_type_name
+            is_collection=False,
+            alias=None):
+        # An aliased field is qualified by its alias rather than its name so
+        # that several copies of it can be selected in one document.
+        if alias is not None:
+            data_type_full_name = data_type_path + alias
+            data_type_field = f'{alias}: {data_type_name}'
+        else:
+            data_type_full_name = data_type_path + data_type_name
+            data_type_field = data_type_name
 
         # Each top level key on the response object gets fully qualified by the
         # nesting path and mapped ont
@@ -172,6 +180,6 @@ class DataTypeFieldsBuilder:
             base_fragment = DATA_TYPE_FIELDS
 
         return base_fragment.format(
-            data_type_name=data_type_name,
+            data_type_name=data_type_field,
             data_type_args=data_type_args,
             data_type_schema=data_type_schema)
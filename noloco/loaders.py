@@ -0,0 +1,200 @@
+import asyncio
+from concurrent.futures import Future
+from json import dumps
+from threading import (
+    Lock,
+    Timer)
+
+
+def loader_key(data_type_name, options):
+    # Lookups with the same options fetch the same record, however the
+    # options were written.
+    return data_type_name, dumps(options, sort_keys=True, default=str)
+
+
+class Loader:
+    def __init__(self, new_batch, window, max_batch_size):
+        self.__new_batch = new_batch
+        self.__window = window
+        self.__max_batch_size = max_batch_size
+
+        self.__lock = Lock()
+        self.__futures = {}
+        self.__pending = []
+        self.__timer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.clear()
+
+    def load(self, data_type_name, options):
+        key = loader_key(data_type_name, options)
+
+        with self.__lock:
+            # A record that has already been loaded, or is being loaded, is
+            # shared rather than fetched again.
+            future = self.__futures.get(key)
+            if future is not None:
+                return future
+
+            future = Future()
+            self.__futures[key] = future
+            self.__pending.append((key, data_type_name, options, future))
+
+            if len(self.__pending) >= self.__max_batch_size:
+                pending = self.__take_pending()
+            else:
+                # The first lookup starts the window, and every lookup made
+                # before it closes is sent along with it.
+                if self.__timer is None:
+                    self.__timer = Timer(
+                        self.__window,
+                        self.__dispatch_pending)
+                    self.__timer.daemon = True
+                    self.__timer.start()
+                pending = None
+
+        if pending is not None:
+            self.__dispatch(pending)
+
+        return future
+
+    def findUnique(self, data_type_name, options):
+        return self.load(data_type_name, options).result()
+
+    def clear(self):
+        with self.__lock:
+            self.__futures.clear()
+
+    def __take_pending(self):
+        pending = self.__pending
+        self.__pending = []
+
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+        return pending
+
+    def __dispatch_pending(self):
+        with self.__lock:
+            pending = self.__take_pending()
+
+        if pending:
+            self.__dispatch(pending)
+
+    def __dispatch(self, pending):
+        batch = self.__new_batch()
+        operations = [
+            batch.findUnique(data_type_name, options)
+            for _, data_type_name, options, _
+            in pending]
+
+        try:
+            batch.execute()
+        except Exception as err:
+            for key, _, _, future in pending:
+                self.__reject(key, future, err)
+            return
+
+        for (key, _, _, future), operation in zip(pending, operations):
+            if operation.error is not None:
+                self.__reject(key, future, operation.error)
+            elif not future.done():
+                future.set_result(operation.result())
+
+    def __reject(self, key, future, error):
+        # Failures are not cached, so a later lookup tries again.
+        with self.__lock:
+            if self.__futures.get(key) is future:
+                del self.__futures[key]
+
+        if not future.done():
+            future.set_exception(error)
+
+
+class AsyncLoader:
+    def __init__(self, new_batch, max_batch_size):
+        self.__new_batch = new_batch
+        self.__max_batch_size = max_batch_size
+
+        self.__dispatches = set()
+        self.__futures = {}
+        self.__pending = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.clear()
+
+    def load(self, data_type_name, options):
+        key = loader_key(data_type_name, options)
+
+        # A lookup that was cancelled is not cached, so it is looked up again.
+        future = self.__futures.get(key)
+        if future is not None and not future.cancelled():
+            return future
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__futures[key] = future
+        self.__pending.append((key, data_type_name, options, future))
+
+        if len(self.__pending) >= self.__max_batch_size:
+            self.__dispatch_pending()
+        elif len(self.__pending) == 1:
+            # Wait for the next tick of the event loop, so that every task
+            # that is ready to run can add its own lookups first.
+            loop.call_soon(self.__dispatch_pending)
+
+        return future
+
+    async def findUnique(self, data_type_name, options):
+        # The future is shared by every task that looks up the same record, so
+        # one task being cancelled must not cancel it for the others.
+        return await asyncio.shield(self.load(data_type_name, options))
+
+    def clear(self):
+        self.__futures.clear()
+
+    def __dispatch_pending(self):
+        pending = self.__pending
+        self.__pending = []
+
+        if pending:
+            # Keep hold of the dispatch until it finishes so that it is not
+            # garbage collected while it is running.
+            dispatch = asyncio.ensure_future(self.__dispatch(pending))
+            self.__dispatches.add(dispatch)
+            dispatch.add_done_callback(self.__dispatches.discard)
+
+    async def __dispatch(self, pending):
+        batch = self.__new_batch()
+        operations = [
+            batch.findUnique(data_type_name, options)
+            for _, data_type_name, options, _
+            in pending]
+
+        try:
+            await batch.execute_async()
+        except Exception as err:
+            for key, _, _, future in pending:
+                self.__reject(key, future, err)
+            return
+
+        for (key, _, _, future), operation in zip(pending, operations):
+            if operation.error is not None:
+                self.__reject(key, future, operation.error)
+            elif not future.done():
+                future.set_result(operation.result())
+
+    def __reject(self, key, future, error):
+        # Failures are not cached, so a later lookup tries again.
+        if self.__futures.get(key) is future:
+            del self.__futures[key]
+
+        if not future.done():
+            future.set_exception(error)
@@ -6,15 +6,14 @@ from noloco.exceptions import (
 from noloco.fields import DataTypeFieldsBuilder
 from noloco.utils import (
     build_operation_args,
+    find_field_by_name,
+    find_reverse_relationship_field,
     gql_type,
     with_required,
     is_multi_relationship,
     is_reverse_multi_relationship, pascal_case,
     with_required)
-from pydash import (
-    find,
-    get
-)
+from pydash import get
 
 
 DATA_TYPE_MUTATION = '''mutation{mutation_args} {{
@@ -30,12 +29,9 @@ class MutationBuilder:
         mutation_args = {}
 
         for arg_name, arg_value in args.items():
-            data_type_fields = [
-                field
-                for field
-                in data_type['fields']
-                if field['name'] == arg_name]
-            data_type_field = find(data_type_fields)
+            data_type_field = find_field_by_name(
+                arg_name,
+                data_type['fields'])
 
             if data_type_field is not None:
                 is_required = data_type_field['required']
@@ -97,11 +93,10 @@ class MutationBuilder:
             else:
                 # The field is a reverse relationship field to the data type or
                 # doesn't exist.
-                for related_data_type in data_types:
-                    for field in related_data_type['fields']:
-                        if field['type'] == data_type['type'] and \
-                                field['reverseName'] == arg_name:
-                            related_field = field
+                related_field = find_reverse_relationship_field(
+                    arg_name,
+                    data_type['name'],
+                    data_types)
 
                 if related_field is not None:
                     # This is a reverse relationship field and can be
@@ -140,15 +135,34 @@ class MutationBuilder:
             data_type,
             data_types,
             options,
-            flattened_options):
-        mutation_args = build_operation_args(flattened_options)
+            flattened_options,
+            alias=None):
+        mutation_fragment = self.build_data_type_mutation_fragment(
+            mutation,
+            data_type,
+            data_types,
+            options,
+            alias)
+
+        return self.build_mutation([mutation_fragment], flattened_options)
 
-        mutation_fragment = self.fields_builder.build_fields(
+    def build_data_type_mutation_fragment(
+            self,
+            mutation,
+            data_type,
+            data_types,
+            options,
+            alias=None):
+        return self.fields_builder.build_fields(
             mutation + pascal_case(data_type['name']),
             data_type,
             data_types,
-            options)
+            options,
+            alias=alias)
+
+    def build_mutation(self, mutation_fragments, flattened_options):
+        mutation_args = build_operation_args(flattened_options)
 
         return DATA_TYPE_MUTATION.format(
             mutation_args=mutation_args,
-            mutation_fragment=mutation_fragment)
+            mutation_fragment='\n'.join(mutation_fragments))
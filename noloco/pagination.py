@@ -0,0 +1,370 @@
+import asyncio
+from datetime import (
+    datetime,
+    timezone)
+from math import ceil
+from queue import (
+    Full,
+    Queue)
+from threading import (
+    Event,
+    Thread)
+
+
+# Marks the end of the pages a fetcher puts on a prefetch queue.
+END_OF_PAGES = object()
+
+
+class PrefetchError:
+    def __init__(self, error):
+        self.error = error
+
+
+def format_date(timestamp):
+    date = datetime.fromtimestamp(timestamp, timezone.utc)
+    return date.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def parse_date(date):
+    return datetime.fromisoformat(date.replace('Z', '+00:00')).timestamp()
+
+
+def split_range(lower, upper, partitions):
+    # Split the range into contiguous, disjoint slices. The first slice
+    # includes the lower bound and every slice includes its upper bound, so
+    # together they cover every value from lower to upper exactly once.
+    if isinstance(lower, str):
+        lower_value = parse_date(lower)
+        upper_value = parse_date(upper)
+        width = upper_value - lower_value
+        boundaries = sorted(set(
+            round(lower_value + width * i / partitions, 3)
+            for i in range(1, partitions)))
+        boundaries = [
+            format_date(boundary)
+            for boundary
+            in boundaries
+            if lower_value <= boundary < upper_value]
+    elif isinstance(lower, int):
+        boundaries = sorted(set(
+            lower + (upper - lower) * i // partitions
+            for i in range(1, partitions)))
+        boundaries = [
+            boundary
+            for boundary
+            in boundaries
+            if lower <= boundary < upper]
+    else:
+        boundaries = sorted(set(
+            lower + (upper - lower) * i / partitions
+            for i in range(1, partitions)))
+        boundaries = [
+            boundary
+            for boundary
+            in boundaries
+            if lower <= boundary < upper]
+
+    conditions = []
+    previous_boundary = None
+    for boundary in boundaries + [upper]:
+        if previous_boundary is None:
+            conditions.append({'gte': lower, 'lte': boundary})
+        else:
+            conditions.append({'gt': previous_boundary, 'lte': boundary})
+        previous_boundary = boundary
+
+    return conditions
+
+
+def partition_options(options, partition_field, condition):
+    # Any range the caller placed on the partition field is already reflected
+    # in the bounds the partitions were split from, so it is replaced.
+    where = options.get('where') or {}
+    field_where = {
+        operator: value
+        for operator, value
+        in (where.get(partition_field) or {}).items()
+        if operator not in ('gt', 'gte', 'lt', 'lte')}
+
+    return {
+        **options,
+        'where': {
+            **where,
+            partition_field: {**field_where, **condition}
+        }
+    }
+
+
+def exported_options(options, partition_field):
+    # Records whose partition field is empty do not fall in any slice, so
+    # they are left out of the export. This also keeps them from being read
+    # as a bound, which they would be when they sort first.
+    where = options.get('where') or {}
+
+    return {
+        **options,
+        'where': {
+            **where,
+            partition_field: {
+                'not': None,
+                **(where.get(partition_field) or {})
+            }
+        }
+    }
+
+
+def bound_options(options, partition_field, direction):
+    return {
+        **page_options(options, 1),
+        'order_by': {'direction': direction, 'field': partition_field}
+    }
+
+
+def page_options(options, page_size, after=None):
+    # Copy the options rather than changing the caller's, and replace any
+    # paging options with our own.
+    paged_options = {
+        option: value
+        for option, value
+        in options.items()
+        if option not in ('after', 'before', 'first')}
+    paged_options['first'] = page_size
+
+    if after is not None:
+        paged_options['after'] = after
+
+    return paged_options
+
+
+def iterate_pages(find_many, data_type_name, options, page_size):
+    after = options.get('after')
+
+    while True:
+        page = find_many(
+            data_type_name,
+            page_options(options, page_size, after))
+        yield page
+
+        if not page.has_next_page:
+            return
+
+        after = page.end_cursor
+
+
+async def iterate_pages_async(find_many, data_type_name, options, page_size):
+    after = options.get('after')
+
+    while True:
+        page = await find_many(
+            data_type_name,
+            page_options(options, page_size, after))
+        yield page
+
+        if not page.has_next_page:
+            return
+
+        after = page.end_cursor
+
+
+def merge_pages(sources, size):
+    queue = Queue(maxsize=size)
+    stopped = Event()
+
+    def put(item):
+        # The queue is bounded, so the fetchers block once they are `size`
+        # pages ahead and only carry on as pages are consumed. They check in
+        # periodically in case the consumer has stopped.
+        while not stopped.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+
+        return False
+
+    def fetch_pages(pages):
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+
+            put(END_OF_PAGES)
+        except Exception as err:
+            put(PrefetchError(err))
+
+    for pages in sources:
+        Thread(target=fetch_pages, args=(pages,), daemon=True).start()
+
+    try:
+        remaining_sources = len(sources)
+        while remaining_sources > 0:
+            page = queue.get()
+
+            if page is END_OF_PAGES:
+                remaining_sources -= 1
+            elif isinstance(page, PrefetchError):
+                raise page.error
+            else:
+                yield page
+    finally:
+        stopped.set()
+
+
+async def merge_pages_async(sources, size):
+    queue = asyncio.Queue(maxsize=size)
+
+    async def fetch_pages(pages):
+        try:
+            async for page in pages:
+                await queue.put(page)
+
+            await queue.put(END_OF_PAGES)
+        except Exception as err:
+            await queue.put(PrefetchError(err))
+
+    fetchers = [
+        asyncio.ensure_future(fetch_pages(pages))
+        for pages
+        in sources]
+
+    try:
+        remaining_sources = len(sources)
+        while remaining_sources > 0:
+            page = await queue.get()
+
+            if page is END_OF_PAGES:
+                remaining_sources -= 1
+            elif isinstance(page, PrefetchError):
+                raise page.error
+            else:
+                yield page
+    finally:
+        for fetcher in fetchers:
+            fetcher.cancel()
+
+
+def prefetch(pages, size):
+    return merge_pages([pages], size)
+
+
+def prefetch_async(pages, size):
+    return merge_pages_async([pages], size)
+
+
+def iterate_records(
+        find_many,
+        data_type_name,
+        options,
+        page_size,
+        prefetch_pages=0):
+    pages = iterate_pages(find_many, data_type_name, options, page_size)
+    if prefetch_pages > 0:
+        pages = prefetch(pages, prefetch_pages)
+
+    for page in pages:
+        yield from page.data
+
+
+async def iterate_records_async(
+        find_many,
+        data_type_name,
+        options,
+        page_size,
+        prefetch_pages=0):
+    pages = iterate_pages_async(find_many, data_type_name, options, page_size)
+    if prefetch_pages > 0:
+        pages = prefetch_async(pages, prefetch_pages)
+
+    async for page in pages:
+        for record in page.data:
+            yield record
+
+
+def export_records(
+        find_many,
+        data_type_name,
+        options,
+        partition_field,
+        workers,
+        page_size):
+    # Find how many records there are and the range of the partition field
+    # across them.
+    options = exported_options(options, partition_field)
+    lowest = find_many(
+        data_type_name,
+        bound_options(options, partition_field, 'ASC'))
+    partitions = min(workers, ceil(lowest.total_count / page_size))
+
+    if partitions > 1:
+        highest = find_many(
+            data_type_name,
+            bound_options(options, partition_field, 'DESC'))
+        lower = lowest.data[0][partition_field]
+        upper = highest.data[0][partition_field]
+
+    # A range that cannot be split is paged through in one go.
+    if partitions <= 1 or lower is None or upper is None:
+        yield from iterate_records(
+            find_many,
+            data_type_name,
+            options,
+            page_size)
+        return
+
+    # Page through each slice of the range in parallel and merge the pages
+    # into one stream as they arrive.
+    sources = [
+        iterate_pages(
+            find_many,
+            data_type_name,
+            partition_options(options, partition_field, condition),
+            page_size)
+        for condition
+        in split_range(lower, upper, partitions)]
+
+    for page in merge_pages(sources, len(sources) * 2):
+        yield from page.data
+
+
+async def export_records_async(
+        find_many,
+        data_type_name,
+        options,
+        partition_field,
+        workers,
+        page_size):
+    options = exported_options(options, partition_field)
+    lowest = await find_many(
+        data_type_name,
+        bound_options(options, partition_field, 'ASC'))
+    partitions = min(workers, ceil(lowest.total_count / page_size))
+
+    if partitions > 1:
+        highest = await find_many(
+            data_type_name,
+            bound_options(options, partition_field, 'DESC'))
+        lower = lowest.data[0][partition_field]
+        upper = highest.data[0][partition_field]
+
+    if partitions <= 1 or lower is None or upper is None:
+        async for record in iterate_records_async(
+                find_many,
+                data_type_name,
+                options,
+                page_size):
+            yield record
+        return
+
+    sources = [
+        iterate_pages_async(
+            find_many,
+            data_type_name,
+            partition_options(options, partition_field, condition),
+            page_size)
+        for condition
+        in split_range(lower, upper, partitions)]
+
+    async for page in merge_pages_async(sources, len(sources) * 2):
+        for record in page.data:
+            yield record
@@ -1,43 +1,492 @@
-from gql import Client, gql
-from gql.transport.aiohttp import AIOHTTPTransport
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from gql import gql
 from gql.transport.exceptions import TransportQueryError
+from noloco.cache import LRUCache
 from noloco.exceptions import (
     NolocoAccountApiKeyError,
+    NolocoCacheBackendError,
     NolocoProjectApiKeyError,
     NolocoUnknownError)
 from noloco.queries import (
     PROJECT_DOCUMENT_QUERY,
     VALIDATE_API_KEYS_QUERY)
+from noloco.schema import (
+    Schema,
+    schema_fingerprint)
 from pydash import get
+from threading import (
+    Lock,
+    Thread)
+
+
+def load_schema(schema_cache, project_name, include_expired=False):
+    if schema_cache is None:
+        return None
+    else:
+        return schema_cache.load(project_name, include_expired)
+
+
+def expired_api_key(schema_cache, project_name):
+    # The project API key from an expired cache entry is likely to still be
+    # current, so it is worth validating while the project document is
+    # fetched.
+    expired_schema = load_schema(schema_cache, project_name, True)
+
+    if expired_schema is None:
+        return None
+    else:
+        return expired_schema.project_api_key
+
+
+def save_schema(schema_cache, project_name, project_api_key, data_types):
+    if schema_cache is None:
+        return
+
+    # Failing to cache the schema only means it is fetched again next time.
+    try:
+        schema_cache.save(project_name, project_api_key, data_types)
+    except (OSError, NolocoCacheBackendError):
+        pass
+
+
+async def load_schema_async(
+        schema_cache,
+        project_name,
+        include_expired=False):
+    if schema_cache is None:
+        return None
+    else:
+        return await schema_cache.load_async(project_name, include_expired)
+
+
+async def expired_api_key_async(schema_cache, project_name):
+    expired_schema = await load_schema_async(schema_cache, project_name, True)
+
+    if expired_schema is None:
+        return None
+    else:
+        return expired_schema.project_api_key
+
+
+async def save_schema_async(
+        schema_cache,
+        project_name,
+        project_api_key,
+        data_types):
+    if schema_cache is None:
+        return
+
+    try:
+        await schema_cache.save_async(
+            project_name,
+            project_api_key,
+            data_types)
+    except (OSError, NolocoCacheBackendError):
+        pass
+
+
+class ProjectSnapshot:
+    # Everything a command reads from a project, which is replaced as a whole
+    # rather than changed, so that a command built from one snapshot never
+    # sees part of another.
+    __slots__ = ('client', 'data_types', 'fingerprint', 'generation')
+
+    def __init__(self, client, data_types, fingerprint, generation):
+        object.__setattr__(self, 'client', client)
+        object.__setattr__(self, 'data_types', data_types)
+        object.__setattr__(self, 'fingerprint', fingerprint)
+        object.__setattr__(self, 'generation', generation)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{name} cannot be changed on a snapshot')
+
+
+EMPTY_SNAPSHOT = ProjectSnapshot(None, None, None, 0)
 
 
 class Project:
-    def __init__(self, account_client, base_url, name):
+    def __init__(
+            self,
+            account_client,
+            base_url,
+            name,
+            transport_builder,
+            document_cache_size,
+            schema_cache=None,
+            lazy=False,
+            preload=False,
+            result_cache=None):
         self.__account_client = account_client
         self.__base_url = base_url
+        self.__documents_lock = Lock()
+        self.__project_api_key = None
+        self.__project_client = None
         self.__project_name = name
+        self.__schema_cache = schema_cache
+        self.__schema_lock = Lock()
+        self.__transport_builder = transport_builder
+
+        # Parsed documents are cached by the shape of the command that built
+        # them, for as long as the data types they were built from are valid.
+        self.documents = LRUCache(document_cache_size)
+
+        # The results of queries are only cached if a result cache is given.
+        self.results = result_cache
+
+        # Hold a single session open on the account client for as long as the
+        # project is in use, rather than connecting on every request.
+        self.__account_session = account_client.connect_sync()
 
-        self.refresh()
+        # The snapshot is populated when the project is connected, which
+        # happens straight away unless the project is lazy.
+        self.snapshot = EMPTY_SNAPSHOT
 
-    def refresh(self):
+        if not lazy:
+            try:
+                self.connect()
+            except Exception:
+                self.close()
+                raise
+        elif preload:
+            Thread(target=self.__preload, daemon=True).start()
+
+    @property
+    def client(self):
+        return self.snapshot.client
+
+    @property
+    def data_types(self):
+        return self.snapshot.data_types
+
+    @property
+    def fingerprint(self):
+        return self.snapshot.fingerprint
+
+    @property
+    def generation(self):
+        # How many times the snapshot has been replaced.
+        return self.snapshot.generation
+
+    def connect(self):
+        if self.client is not None:
+            return
+
+        with self.__schema_lock:
+            if self.client is None:
+                # A project that was closed opens its account session again
+                # when it is next used.
+                if self.__account_session is None:
+                    self.__account_session = \
+                        self.__account_client.connect_sync()
+
+                # A cached schema is trusted until a command fails to validate
+                # against it, at which point the project is refreshed.
+                if not self.__load_cached_schema():
+                    self.__refresh(expired_api_key(
+                        self.__schema_cache,
+                        self.__project_name))
+
+    def __preload(self):
+        # Any error is raised again from the first command, which retries the
+        # connection on the caller's thread.
+        try:
+            self.connect()
+        except Exception:
+            pass
+
+    def close(self):
+        with self.__schema_lock:
+            if self.__project_client is not None:
+                self.__project_client.close_sync()
+                self.__project_client = None
+                self.snapshot = EMPTY_SNAPSHOT
+
+            if self.__account_session is not None:
+                self.__account_client.close_sync()
+                self.__account_session = None
+
+    def refresh(self, expected_api_key=None, generation=None):
+        # Only one refresh runs at a time. A caller that found the schema out
+        # of date at an earlier generation waits for any refresh in flight and
+        # skips its own if the schema has been replaced in the meantime.
+        with self.__schema_lock:
+            if generation is None or generation == self.generation:
+                self.__refresh(expected_api_key)
+
+    def cache_document(self, key, document, dependencies, generation):
+        # A document built from data types that were replaced while it was
+        # being built is not cached, as it may no longer be valid.
+        with self.__documents_lock:
+            if generation == self.generation:
+                self.documents.set(key, document, dependencies)
+
+    def __refresh(self, expected_api_key):
+        if expected_api_key is None:
+            project_api_key, data_types, raw_data_types = \
+                self.__fetch_project_document()
+        else:
+            # Validate the project API key we expect to find while the project
+            # document is fetched, so that if it is right the two queries only
+            # cost a single round trip.
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                validation = executor.submit(
+                    self.__validate_project_api_key,
+                    expected_api_key)
+                project_api_key, data_types, raw_data_types = \
+                    self.__fetch_project_document()
+
+        # A project API key is only validated once, so refreshing the schema
+        # while the key is unchanged only costs a single round trip.
+        if expected_api_key is not None and \
+                project_api_key == expected_api_key:
+            validation.result()
+        elif project_api_key != self.__project_api_key:
+            self.__validate_project_api_key(project_api_key)
+
+        self.__use_schema(project_api_key, data_types, raw_data_types)
+        save_schema(
+            self.__schema_cache,
+            self.__project_name,
+            project_api_key,
+            raw_data_types)
+
+    def __fetch_project_document(self):
         # Try to validate the account API key and fetch the project API key.
         try:
-            project_document_query_result = self.__account_client.execute(
+            project_document_query_result = self.__account_session.execute(
                 gql(PROJECT_DOCUMENT_QUERY),
                 variable_values={'projectId': self.__project_name})
             project_api_key = get(
                 project_document_query_result,
                 'project.apiKeys.project')
-            self.data_types = get(
+            raw_data_types = get(
+                project_document_query_result, 'project.dataTypes')
+            data_types = Schema(raw_data_types, self.data_types)
+        except TransportQueryError as err:
+            raise NolocoAccountApiKeyError(self.__project_name, err)
+        except Exception as err:
+            raise NolocoUnknownError(err)
+
+        return project_api_key, data_types, raw_data_types
+
+    def __validate_project_api_key(self, project_api_key):
+        # Try to validate the project API key.
+        try:
+            self.__account_session.execute(
+                gql(VALIDATE_API_KEYS_QUERY),
+                variable_values={'projectToken': project_api_key})
+        except TransportQueryError as err:
+            raise NolocoProjectApiKeyError(self.__project_name, err)
+        except Exception as err:
+            raise NolocoUnknownError(err)
+
+    def __load_cached_schema(self):
+        cached_schema = load_schema(self.__schema_cache, self.__project_name)
+        if cached_schema is None:
+            return False
+
+        self.__use_schema(
+            cached_schema.project_api_key,
+            Schema(cached_schema.data_types, self.data_types),
+            cached_schema.data_types)
+        return True
+
+    def __use_schema(self, project_api_key, data_types, raw_data_types):
+        # Build the project client that will be used to interact with
+        # collections and open the session that every command will share. The
+        # client is kept for as long as the project API key is unchanged, and
+        # an old client is only closed once the new session is in place.
+        if project_api_key != self.__project_api_key or \
+                self.__project_client is None:
+            previous_project_client = self.__project_client
+            project_client = self.__transport_builder.build_client(
+                f'{self.__base_url}/data/{self.__project_name}',
+                project_api_key)
+            project_session = project_client.connect_sync()
+        else:
+            previous_project_client = None
+            project_client = self.__project_client
+            project_session = self.client
+
+        # The snapshot is swapped in one step, so that a document being
+        # cached either sees the new generation or is invalidated along with
+        # the rest.
+        with self.__documents_lock:
+            self.__invalidate_documents(data_types)
+            self.__project_api_key = project_api_key
+            self.__project_client = project_client
+            self.snapshot = ProjectSnapshot(
+                project_session,
+                data_types,
+                schema_fingerprint(raw_data_types),
+                self.generation + 1)
+
+        if previous_project_client is not None:
+            previous_project_client.close_sync()
+
+    def __invalidate_documents(self, data_types):
+        # Only the documents built from data types that have changed are
+        # discarded; the rest are still valid against the new data types.
+        if self.data_types is None:
+            self.documents.clear()
+        else:
+            self.documents.invalidate(
+                data_types.changed_data_types(self.data_types))
+
+
+class AsyncProject:
+    def __init__(
+            self,
+            account_client,
+            base_url,
+            name,
+            transport_builder,
+            document_cache_size,
+            schema_cache=None,
+            result_cache=None):
+        self.__account_client = account_client
+        self.__account_session = None
+        self.__base_url = base_url
+        self.__project_api_key = None
+        self.__project_client = None
+        self.__project_name = name
+        self.__schema_cache = schema_cache
+        self.__transport_builder = transport_builder
+
+        # Parsed documents are cached by the shape of the command that built
+        # them, for as long as the data types they were built from are valid.
+        self.documents = LRUCache(document_cache_size)
+
+        # The results of queries are only cached if a result cache is given.
+        self.results = result_cache
+        self.__schema_lock = None
+
+        # The snapshot is populated when the project is connected. Its client
+        # is a long-lived session that is shared by every command executed
+        # against the project.
+        self.snapshot = EMPTY_SNAPSHOT
+
+    def __lock(self):
+        # The lock is created lazily so that it binds to the running event
+        # loop rather than whichever loop existed at construction time.
+        if self.__schema_lock is None:
+            self.__schema_lock = asyncio.Lock()
+
+        return self.__schema_lock
+
+    @property
+    def client(self):
+        return self.snapshot.client
+
+    @property
+    def data_types(self):
+        return self.snapshot.data_types
+
+    @property
+    def fingerprint(self):
+        return self.snapshot.fingerprint
+
+    @property
+    def generation(self):
+        # How many times the snapshot has been replaced.
+        return self.snapshot.generation
+
+    async def connect(self):
+        async with self.__lock():
+            if self.client is None:
+                # The account session outlives a failed connection, so that
+                # the next command can retry without connecting it again.
+                if self.__account_session is None:
+                    self.__account_session = \
+                        await self.__account_client.connect_async()
+
+                if not await self.__load_cached_schema():
+                    await self.__refresh(await expired_api_key_async(
+                        self.__schema_cache,
+                        self.__project_name))
+
+    async def close(self):
+        if self.__project_client is not None:
+            await self.__project_client.close_async()
+            self.__project_client = None
+            self.snapshot = EMPTY_SNAPSHOT
+
+        if self.__account_session is not None:
+            await self.__account_client.close_async()
+            self.__account_session = None
+
+    async def refresh(self, expected_api_key=None, generation=None):
+        # Only one refresh runs at a time. A task that found the schema out of
+        # date at an earlier generation waits for any refresh in flight and
+        # skips its own if the schema has been replaced in the meantime.
+        async with self.__lock():
+            if generation is None or generation == self.generation:
+                await self.__refresh(expected_api_key)
+
+    def cache_document(self, key, document, dependencies, generation):
+        # A document built from data types that were replaced while it was
+        # being built is not cached, as it may no longer be valid.
+        if generation == self.generation:
+            self.documents.set(key, document, dependencies)
+
+    async def __refresh(self, expected_api_key):
+        if expected_api_key is None:
+            project_api_key, data_types, raw_data_types = \
+                await self.__fetch_project_document()
+        else:
+            # Validate the project API key we expect to find while the project
+            # document is fetched, so that if it is right the two queries only
+            # cost a single round trip.
+            validation_error, project_document = await asyncio.gather(
+                self.__validate_project_api_key(expected_api_key),
+                self.__fetch_project_document(),
+                return_exceptions=True)
+            if isinstance(project_document, Exception):
+                raise project_document
+
+            project_api_key, data_types, raw_data_types = project_document
+
+        # A project API key is only validated once, so refreshing the schema
+        # while the key is unchanged only costs a single round trip.
+        if expected_api_key is not None and \
+                project_api_key == expected_api_key:
+            if validation_error is not None:
+                raise validation_error
+        elif project_api_key != self.__project_api_key:
+            await self.__validate_project_api_key(project_api_key)
+
+        await self.__use_schema(project_api_key, data_types, raw_data_types)
+        await save_schema_async(
+            self.__schema_cache,
+            self.__project_name,
+            project_api_key,
+            raw_data_types)
+
+    async def __fetch_project_document(self):
+        # Try to validate the account API key and fetch the project API key.
+        try:
+            project_document_query_result = \
+                await self.__account_session.execute(
+                    gql(PROJECT_DOCUMENT_QUERY),
+                    variable_values={'projectId': self.__project_name})
+            project_api_key = get(
+                project_document_query_result,
+                'project.apiKeys.project')
+            raw_data_types = get(
                 project_document_query_result, 'project.dataTypes')
+            data_types = Schema(raw_data_types, self.data_types)
         except TransportQueryError as err:
             raise NolocoAccountApiKeyError(self.__project_name, err)
         except Exception as err:
             raise NolocoUnknownError(err)
 
+        return project_api_key, data_types, raw_data_types
+
+    async def __validate_project_api_key(self, project_api_key):
         # Try to validate the project API key.
         try:
-            self.__account_client.execute(
+            await self.__account_session.execute(
                 gql(VALIDATE_API_KEYS_QUERY),
                 variable_values={'projectToken': project_api_key})
         except TransportQueryError as err:
@@ -45,11 +494,53 @@ class Project:
         except Exception as err:
             raise NolocoUnknownError(err)
 
+    async def __load_cached_schema(self):
+        cached_schema = await load_schema_async(
+            self.__schema_cache,
+            self.__project_name)
+        if cached_schema is None:
+            return False
+
+        await self.__use_schema(
+            cached_schema.project_api_key,
+            Schema(cached_schema.data_types, self.data_types),
+            cached_schema.data_types)
+        return True
+
+    async def __use_schema(self, project_api_key, data_types, raw_data_types):
         # Build the project client that will be used to interact with
-        # collections.
-        project_transport = AIOHTTPTransport(
-            url=f'{self.__base_url}/data/{self.__project_name}',
-            headers={'Authorization': project_api_key})
-        self.client = Client(
-            transport=project_transport,
-            fetch_schema_from_transport=False)
+        # collections and open the session that every command will share. The
+        # client is kept for as long as the project API key is unchanged, and
+        # an old client is only closed once the new session is in place.
+        if project_api_key != self.__project_api_key or \
+                self.__project_client is None:
+            previous_project_client = self.__project_client
+            project_client = self.__transport_builder.build_async_client(
+                f'{self.__base_url}/data/{self.__project_name}',
+                project_api_key)
+            project_session = await project_client.connect_async()
+        else:
+            previous_project_client = None
+            project_client = self.__project_client
+            project_session = self.client
+
+        self.__invalidate_documents(data_types)
+        self.__project_api_key = project_api_key
+        self.__project_client = project_client
+        self.snapshot = ProjectSnapshot(
+            project_session,
+            data_types,
+            schema_fingerprint(raw_data_types),
+            self.generation + 1)
+
+        if previous_project_client is not None:
+            await previous_project_client.close_async()
+
+    def __invalidate_documents(self, data_types):
+        # Only the documents built from data types that have changed are
+        # discarded; the rest are still valid against the new data types.
+        if self.data_types is None:
+            self.documents.clear()
+        else:
+            self.documents.invalidate(
+                data_types.changed_data_types(self.data_types))
@@ -75,25 +75,52 @@ class QueryBuilder:
             data_type,
             data_types,
             options,
-            flattened_options):
-        is_collection = query_type == 'findMany'  # TODO - clean this up
-        query_args = build_operation_args(flattened_options)
-
-        query_fragment = self.fields_builder.build_fields(
+            flattened_options,
+            alias=None):
+        query_fragment = self.build_data_type_query_fragment(
+            query_type,
             result_name,
             data_type,
             data_types,
             options,
-            '',
-            is_collection)
+            alias)
 
-        if is_collection:
+        if query_type == 'findMany':
             query_template = DATA_TYPE_COLLECTION_QUERY
         else:
             query_template = DATA_TYPE_QUERY
 
-        query = query_template.format(
-            query_args=query_args,
-            data_type_fragment=query_fragment)
+        return self.build_query(
+            [query_fragment],
+            flattened_options,
+            query_template)
+
+    def build_data_type_query_fragment(
+            self,
+            query_type,
+            result_name,
+            data_type,
+            data_types,
+            options,
+            alias=None):
+        is_collection = query_type == 'findMany'  # TODO - clean this up
+
+        return self.fields_builder.build_fields(
+            result_name,
+            data_type,
+            data_types,
+            options,
+            '',
+            is_collection,
+            alias)
+
+    def build_query(
+            self,
+            query_fragments,
+            flattened_options,
+            query_template=DATA_TYPE_QUERY):
+        query_args = build_operation_args(flattened_options)
 
-        return query
+        return query_template.format(
+            query_args=query_args,
+            data_type_fragment='\n'.join(query_fragments))
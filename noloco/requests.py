@@ -1,6 +1,11 @@
 from gql import gql
 from gql.transport.exceptions import TransportQueryError
-from noloco.constants import GRAPHQL_VALIDATION_FAILED
+from json import dumps
+from noloco.columns import ColumnarResult
+from noloco.constants import (
+    COLUMNAR,
+    EAGER,
+    GRAPHQL_VALIDATION_FAILED)
 from noloco.exceptions import (
     NolocoDataTypeNotFoundError,
     NolocoFieldNotFoundError)
@@ -10,22 +15,108 @@ from noloco.results import Result
 from noloco.utils import (
     annotate_collection_args,
     change_where_to_lookup,
+    data_type_dependencies,
     find_data_type_by_name,
     flatten_args,
     gql_args,
     has_files,
+    include_shape,
+    options_without_data,
     result_name_suffix,
     pascal_case)
 from pydash import (
     get)
 
 
+def create_command(
+        project,
+        data_type_name,
+        options,
+        pagination_callback,
+        result_format=EAGER):
+    return Command(project) \
+        .for_data_type(data_type_name) \
+        .with_options(options_without_data(options)) \
+        .mutate('create') \
+        .value(options['data']) \
+        .with_pagination_callback(pagination_callback) \
+        .with_result_format(result_format)
+
+
+def delete_command(project, data_type_name, id, result_format=EAGER):
+    return Command(project) \
+        .for_data_type(data_type_name) \
+        .mutate('delete') \
+        .with_id_lookup(id) \
+        .with_result_format(result_format)
+
+
+def find_many_command(
+        project,
+        data_type_name,
+        options,
+        pagination_callback,
+        result_format=EAGER):
+    return Command(project) \
+        .for_data_type(data_type_name) \
+        .with_options(options) \
+        .query('findMany') \
+        .with_pagination_callback(pagination_callback) \
+        .with_result_format(result_format)
+
+
+def find_unique_command(
+        project,
+        data_type_name,
+        options,
+        pagination_callback,
+        result_format=EAGER):
+    return Command(project) \
+        .for_data_type(data_type_name) \
+        .with_options(options) \
+        .query('findUnique') \
+        .with_unique_lookup() \
+        .with_pagination_callback(pagination_callback) \
+        .with_result_format(result_format)
+
+
+def update_command(
+        project,
+        data_type_name,
+        id,
+        options,
+        pagination_callback,
+        result_format=EAGER):
+    return Command(project) \
+        .for_data_type(data_type_name) \
+        .with_options(options_without_data(options)) \
+        .mutate('update') \
+        .with_id_lookup(id) \
+        .value(options['data']) \
+        .with_pagination_callback(pagination_callback) \
+        .with_result_format(result_format)
+
+
+def is_validation_failure(err):
+    # The error code can either be reported against the response as a whole
+    # or against the individual errors within it.
+    if get(err, 'extensions.code') == GRAPHQL_VALIDATION_FAILED:
+        return True
+
+    for error in get(err, 'errors') or []:
+        if get(error, 'extensions.code') == GRAPHQL_VALIDATION_FAILED:
+            return True
+
+    return False
+
+
 class Command:
     def __init__(self, project):
         self.project = project
         self.__mutation_builder = MutationBuilder()
         self.__query_builder = QueryBuilder()
 
+        self.alias = None
         self.data_type_name = None
         self.id_lookup = None
         self.id_lookup_type = None
@@ -34,9 +125,14 @@ class Command:
         self.options = {}
         self.pagination_callback = None
         self.query_type = None
+        self.result_format = EAGER
         self.result_name = None
         self.unique_lookup = None
 
+    def with_alias(self, alias):
+        self.alias = alias
+        return self
+
     def for_data_type(self, data_type_name):
         self.data_type_name = data_type_name
         return self
@@ -53,6 +149,10 @@ class Command:
         self.pagination_callback = pagination_callback
         return self
 
+    def with_result_format(self, result_format):
+        self.result_format = result_format
+        return self
+
     def value(self, new_value):
         self.new_value = new_value
         return self
@@ -72,44 +172,136 @@ class Command:
         self.result_name = self.data_type_name + result_name_suffix(query_type)
         return self
 
+    def result_key(self):
+        # The key that the result of the command is returned under, which is
+        # also used to qualify the names of its variables.
+        if self.alias is not None:
+            return self.alias
+        else:
+            return self.result_name
+
+    def is_mutation(self):
+        return self.mutation is not None
+
+    def build_result(self, raw_result, data_types):
+        # Columnar results are only built for collections. Any other command
+        # falls back to the default format.
+        if self.result_format == COLUMNAR:
+            if self.query_type == 'findMany':
+                return ColumnarResult.build(
+                    find_data_type_by_name(self.data_type_name, data_types),
+                    self.result_key(),
+                    raw_result,
+                    self.options,
+                    self.pagination_callback)
+            else:
+                result_format = EAGER
+        else:
+            result_format = self.result_format
+
+        return Result.build(
+            self.data_type_name,
+            self.result_key(),
+            raw_result,
+            self.options,
+            self.pagination_callback,
+            result_format)
+
     def build(self, retry=True):
+        self.project.connect()
+
+        # The command is built from a single snapshot of the project, so that
+        # a concurrent refresh cannot change the schema part way through.
+        snapshot = self.project.snapshot
+
         try:
-            data_types = self.project.data_types
-            data_type = find_data_type_by_name(self.data_type_name, data_types)
+            return self.__build(snapshot)
+        except (NolocoDataTypeNotFoundError, NolocoFieldNotFoundError):
+            if retry:
+                self.project.refresh(generation=snapshot.generation)
+                return self.build(retry=False)
+            else:
+                raise
 
-            typed_options = annotate_collection_args(
-                data_type,
-                data_types,
-                self.options)
+    async def build_async(self, retry=True):
+        await self.project.connect()
+        snapshot = self.project.snapshot
 
-            if self.id_lookup is not None:
-                typed_options['id'] = {'type': 'ID!', 'value': self.id_lookup}
-            elif self.unique_lookup is not None:
-                typed_options = change_where_to_lookup(
-                    data_type,
-                    typed_options)
+        try:
+            return self.__build(snapshot)
+        except (NolocoDataTypeNotFoundError, NolocoFieldNotFoundError):
+            if retry:
+                await self.project.refresh(generation=snapshot.generation)
+                return await self.build_async(retry=False)
+            else:
+                raise
+
+    def build_fragment(self, snapshot):
+        data_types = snapshot.data_types
+        data_type, typed_options, flattened_options, upload_files = \
+            self.__build_options(data_types)
+
+        # The fragment only depends on the shape of the command, so it can be
+        # reused by any command with the same shape regardless of its values.
+        shape = self.__shape(typed_options, flattened_options)
+        fragment_key = ('fragment', shape)
+        cached_fragment = self.project.documents.get(fragment_key)
 
-            if self.new_value is not None:
-                mutation_args = self \
-                    .__mutation_builder \
-                    .build_data_type_mutation_args(
+        if cached_fragment is not None:
+            fragment, dependencies = cached_fragment
+        else:
+            if self.mutation is not None:
+                fragment = self.__mutation_builder \
+                    .build_data_type_mutation_fragment(
+                        self.mutation,
                         data_type,
                         data_types,
-                        self.new_value)
-                upload_files = has_files(mutation_args)
-                typed_options.update(mutation_args)
+                        typed_options,
+                        self.alias)
             else:
-                upload_files = False
+                fragment = self.__query_builder \
+                    .build_data_type_query_fragment(
+                        self.query_type,
+                        self.result_name,
+                        data_type,
+                        data_types,
+                        typed_options,
+                        self.alias)
+
+            # The fragment is cached with the data types it was built from,
+            # which a batch needs to tag the document it is combined into.
+            dependencies = self.__dependencies(data_type, data_types)
+            self.project.cache_document(
+                fragment_key,
+                (fragment, dependencies),
+                dependencies,
+                snapshot.generation)
+
+        return shape, dependencies, fragment, flattened_options, upload_files
 
-            flattened_options = flatten_args(self.result_name, typed_options)
+    def __build(self, snapshot):
+        data_types = snapshot.data_types
+        data_type, typed_options, flattened_options, upload_files = \
+            self.__build_options(data_types)
 
+        # Only the variable values differ between commands of the same shape,
+        # so the parsed document is cached against the shape and reused.
+        document_key = ('document', self.__shape(
+            typed_options,
+            flattened_options))
+        cached_document = self.project.documents.get(document_key)
+
+        if cached_document is not None:
+            document, dependencies = cached_document
+        else:
             if self.mutation is not None:
                 document = self.__mutation_builder.build_data_type_mutation(
                     self.mutation,
                     data_type,
                     data_types,
                     typed_options,
-                    flattened_options)
+                    flattened_options,
+                    self.alias)
 
             if self.query_type is not None:
                 document = self.__query_builder.build_data_type_query(
@@ -118,53 +310,189 @@ class Command:
                     data_type,
                     data_types,
                     typed_options,
-                    flattened_options)
-
-            return BuiltCommand(
-                self,
-                gql(document),
-                gql_args(flattened_options),
-                upload_files,
-                self.pagination_callback)
-        except (NolocoDataTypeNotFoundError, NolocoFieldNotFoundError):
-            if retry:
-                self.project.refresh()
-                self.build(retry=False)
-            else:
-                raise
+                    flattened_options,
+                    self.alias)
+
+            # The document is cached with the data types it was built from,
+            # which are also the data types its results depend on.
+            document = gql(document)
+            dependencies = self.__dependencies(data_type, data_types)
+            self.project.cache_document(
+                document_key,
+                (document, dependencies),
+                dependencies,
+                snapshot.generation)
+
+        return BuiltCommand(
+            self,
+            snapshot,
+            document_key,
+            document,
+            dependencies,
+            gql_args(flattened_options),
+            upload_files)
+
+    def __build_options(self, data_types):
+        data_type = find_data_type_by_name(self.data_type_name, data_types)
+
+        typed_options = annotate_collection_args(
+            data_type,
+            data_types,
+            self.options)
+
+        if self.id_lookup is not None:
+            typed_options['id'] = {'type': 'ID!', 'value': self.id_lookup}
+        elif self.unique_lookup is not None:
+            typed_options = change_where_to_lookup(
+                data_type,
+                typed_options)
+
+        if self.new_value is not None:
+            mutation_args = self \
+                .__mutation_builder \
+                .build_data_type_mutation_args(
+                    data_type,
+                    data_types,
+                    self.new_value)
+            upload_files = has_files(mutation_args)
+            typed_options.update(mutation_args)
+        else:
+            upload_files = False
+
+        flattened_options = flatten_args(self.result_key(), typed_options)
+
+        return data_type, typed_options, flattened_options, upload_files
+
+    def __dependencies(self, data_type, data_types):
+        return data_type_dependencies(
+            data_type,
+            data_types,
+            self.options,
+            self.new_value)
+
+    def __shape(self, typed_options, flattened_options):
+        return (
+            self.data_type_name,
+            self.mutation,
+            self.query_type,
+            self.alias,
+            include_shape(typed_options),
+            tuple(
+                (arg_name, arg_value['type'])
+                for arg_name, arg_value
+                in flattened_options.items()))
 
 
 class BuiltCommand:
     def __init__(
             self,
             command,
+            snapshot,
+            document_key,
             document,
+            dependencies,
             variable_values,
-            upload_files,
-            pagination_callback):
+            upload_files):
         self.__command = command
+        self.__dependencies = dependencies
         self.__document = document
+        self.__document_key = document_key
+        self.__snapshot = snapshot
         self.__variable_values = variable_values
         self.__upload_files = upload_files
-        self.__pagination_callback = pagination_callback
 
     def execute(self, retry=True):
+        results = self.__command.project.results
+        result_key = self.__result_key(results)
+
+        if result_key is not None:
+            generations = results.generations(self.__dependencies)
+            raw_result = results.get(result_key)
+            if raw_result is not None:
+                return self.__build_result(raw_result)
+
         try:
-            raw_result = self.__command.project.client.execute(
+            raw_result = self.__snapshot.client.execute(
                 self.__document,
                 variable_values=self.__variable_values,
                 upload_files=self.__upload_files)
-
-            return Result.build(
-                self.__command.data_type_name,
-                self.__command.result_name,
-                raw_result,
-                self.__command.options,
-                self.__pagination_callback)
         except TransportQueryError as err:
-            if get(err, 'extensions.code') == GRAPHQL_VALIDATION_FAILED and \
-                    retry:
-                self.__command.project.refresh()
+            if is_validation_failure(err) and retry:
+                # Every command that failed against the same schema waits on
+                # a single refresh rather than each fetching it again.
+                self.__command.project.refresh(
+                    generation=self.__snapshot.generation)
                 return self.__command.build().execute(retry=False)
             else:
                 raise
+        finally:
+            self.__invalidate_results(results)
+
+        if result_key is not None:
+            results.set(result_key, raw_result, generations)
+
+        return self.__build_result(raw_result)
+
+    async def execute_async(self, retry=True):
+        results = self.__command.project.results
+        result_key = self.__result_key(results)
+
+        if result_key is not None:
+            generations = await results.generations_async(
+                self.__dependencies)
+            raw_result = await results.get_async(result_key)
+            if raw_result is not None:
+                return self.__build_result(raw_result)
+
+        try:
+            raw_result = await self.__snapshot.client.execute(
+                self.__document,
+                variable_values=self.__variable_values,
+                upload_files=self.__upload_files)
+        except TransportQueryError as err:
+            if is_validation_failure(err) and retry:
+                await self.__command.project.refresh(
+                    generation=self.__snapshot.generation)
+                built_command = await self.__command.build_async()
+                return await built_command.execute_async(retry=False)
+            else:
+                raise
+        finally:
+            await self.__invalidate_results_async(results)
+
+        if result_key is not None:
+            await results.set_async(result_key, raw_result, generations)
+
+        return self.__build_result(raw_result)
+
+    def __build_result(self, raw_result):
+        return self.__command.build_result(
+            raw_result,
+            self.__snapshot.data_types)
+
+    def __result_key(self, results):
+        # Only the results of queries are cached. They are keyed by the
+        # document and the values of its variables, for the schema of the
+        # data types the document depends on, so that a change to any other
+        # data type does not discard them.
+        if results is None or self.__command.is_mutation():
+            return None
+
+        fingerprints = self.__snapshot.data_types.fingerprints
+        return (
+            tuple(
+                fingerprints.get(data_type_name)
+                for data_type_name
+                in sorted(self.__dependencies)),
+            self.__document_key,
+            dumps(self.__variable_values, sort_keys=True, default=str))
+
+    def __invalidate_results(self, results):
+        # A mutation discards the cached results of every query that depends
+        # on a data type it could have changed.
+        if results is not None and self.__command.is_mutation():
+            results.invalidate(self.__dependencies)
+
+    async def __invalidate_results_async(self, results):
+        if results is not None and self.__command.is_mutation():
+            await results.invalidate_async(self.__dependencies)
@@ -1,9 +1,112 @@
-from pydash import (
-    get,
-    set_)
+from collections.abc import (
+    Mapping,
+    Sequence)
+from inspect import (
+    isawaitable,
+    iscoroutinefunction)
+from noloco.constants import (
+    COMPACT,
+    EAGER,
+    LAZY)
+from pydash import get
 from re import sub
 
 
+def result_class(result_format):
+    if result_format == LAZY:
+        return LazyResult
+    elif result_format == COMPACT:
+        return Record
+    else:
+        return Result
+
+
+def no_page(client):
+    # Pages from an asynchronous client are awaited, so the lack of a page has
+    # to be awaitable too.
+    if iscoroutinefunction(client):
+        return resolve_none()
+    else:
+        return None
+
+
+async def resolve_none():
+    return None
+
+
+def replace_options(options, options_path, new_options):
+    # Copy each level of the options down to the path and replace the options
+    # at the end of it, leaving the original options as they were so that
+    # they can be shared by other results and other threads.
+    if options_path == '':
+        return new_options
+
+    key, _, remaining_path = options_path.partition('.')
+    nested_options = options.get(key)
+
+    return {
+        **options,
+        key: replace_options(
+            nested_options if isinstance(nested_options, dict) else {},
+            remaining_path,
+            new_options)
+    }
+
+
+def cursor_options(options, options_path, cursor_option, cursor):
+    # Copy the options that applied to the collection, without either cursor,
+    # and page from the given cursor.
+    collection_options = get(options, options_path)
+    if not isinstance(collection_options, dict):
+        collection_options = {}
+
+    new_options = {
+        option: value
+        for option, value
+        in collection_options.items()
+        if option not in ('after', 'before')}
+    new_options[cursor_option] = cursor
+
+    return new_options
+
+
+def wrap_result(
+        data_type_name,
+        result_name,
+        key,
+        value,
+        options_path,
+        options,
+        client,
+        result_format):
+    if options_path == '':
+        next_options_path = '.'.join(['include', key])
+    else:
+        next_options_path = '.'.join([options_path, 'include', key])
+
+    if get(value, 'edges') is not None:
+        # Wrap a collection in a CollectionResult to give it pagination
+        # helpers.
+        return CollectionResult(
+            data_type_name,
+            result_name,
+            value,
+            next_options_path,
+            options,
+            client,
+            result_format)
+    else:
+        # Otherwise traverse each field in the result and recursively wrap
+        # any that are collections.
+        return result_class(result_format)(
+            data_type_name,
+            result_name,
+            value,
+            next_options_path,
+            options,
+            client)
+
+
 class Result(dict):
     def __init__(
             self,
@@ -14,34 +117,16 @@ class Result(dict):
             options,
             client):
         for key, value in result.items():
-            if options_path == '':
-                next_options_path = '.'.join(['include', key])
-            else:
-                next_options_path = '.'.join([options_path, 'include', key])
-
             if type(value) is dict:
-                if get(value, 'edges') is not None:
-                    # Wrap a collection in a CollectionResult to give it
-                    # pagination helpers.
-                    result[key] = CollectionResult(
-                        data_type_name,
-                        result_name,
-                        value,
-                        next_options_path,
-                        options,
-                        client)
-                else:
-                    # Otherwise traverse each field in the result and
-                    # recursively wrap any that are collections.
-                    result[key] = Result(
-                        data_type_name,
-                        result_name,
-                        value,
-                        next_options_path,
-                        options,
-                        client)
-            else:
-                result[key] = value
+                result[key] = wrap_result(
+                    data_type_name,
+                    result_name,
+                    key,
+                    value,
+                    options_path,
+                    options,
+                    client,
+                    EAGER)
 
         dict.__init__(self, result)
 
@@ -52,8 +137,14 @@ class Result(dict):
         self[attr] = value
 
     @staticmethod
-    def build(data_type_name, result_name, result, options, client):
-        result = Result(
+    def build(
+            data_type_name,
+            result_name,
+            result,
+            options,
+            client,
+            result_format=EAGER):
+        result = result_class(result_format)(
             data_type_name,
             result_name,
             result,
@@ -64,6 +155,168 @@ class Result(dict):
         return result[result_name]
 
 
+class LazyResult(Result):
+    def __init__(
+            self,
+            data_type_name,
+            result_name,
+            result,
+            options_path,
+            options,
+            client):
+        # Only the top level of the result is copied. Nested objects and
+        # collections are wrapped the first time they are read, so fields that
+        # are never read are never converted.
+        dict.__init__(self, result)
+        object.__setattr__(self, '_LazyResult__context', (
+            data_type_name,
+            result_name,
+            options_path,
+            options,
+            client))
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+
+        if type(value) is dict:
+            value = self.__wrap(key, value)
+            dict.__setitem__(self, key, value)
+
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        else:
+            return default
+
+    def items(self):
+        self.__wrap_all()
+        return dict.items(self)
+
+    def values(self):
+        self.__wrap_all()
+        return dict.values(self)
+
+    def __wrap(self, key, value):
+        data_type_name, result_name, options_path, options, client = \
+            self.__context
+
+        return wrap_result(
+            data_type_name,
+            result_name,
+            key,
+            value,
+            options_path,
+            options,
+            client,
+            LAZY)
+
+    def __wrap_all(self):
+        for key in self:
+            self[key]
+
+
+class RecordLayout:
+    __slots__ = ('fields', 'indexes')
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.indexes = {field: index for index, field in enumerate(fields)}
+
+
+# Layouts are interned so that every record with the same fields, which is
+# every record of a data type returned by the same query, shares one.
+RECORD_LAYOUTS = {}
+
+
+def record_layout(fields):
+    layout = RECORD_LAYOUTS.get(fields)
+
+    if layout is None:
+        layout = RECORD_LAYOUTS.setdefault(fields, RecordLayout(fields))
+
+    return layout
+
+
+class Record(Mapping):
+    __slots__ = ('_Record__layout', '_Record__values')
+
+    def __init__(
+            self,
+            data_type_name,
+            result_name,
+            result,
+            options_path,
+            options,
+            client):
+        # A compact record only holds its values; the field names are held
+        # once by a layout that is shared with similar records.
+        self.__layout = record_layout(tuple(result.keys()))
+        self.__values = tuple(
+            wrap_result(
+                data_type_name,
+                result_name,
+                key,
+                value,
+                options_path,
+                options,
+                client,
+                COMPACT) if type(value) is dict else value
+            for key, value
+            in result.items())
+
+    def __getattr__(self, attr):
+        # Slots that have not been set yet, for example while the record is
+        # being copied or unpickled, must not be looked up as fields.
+        if attr in Record.__slots__ or attr.startswith('__'):
+            raise AttributeError(attr)
+
+        try:
+            return self[attr]
+        except KeyError:
+            raise AttributeError(attr)
+
+    def __getitem__(self, key):
+        return self.__values[self.__layout.indexes[key]]
+
+    def __iter__(self):
+        return iter(self.__layout.fields)
+
+    def __len__(self):
+        return len(self.__values)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class LazyRecords(Sequence):
+    def __init__(self, edges, build_record):
+        self.__build_record = build_record
+        self.__edges = edges
+        self.__records = [None] * len(edges)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        # Normalise negative indexes so each record is only built once.
+        index = range(len(self.__edges))[index]
+        record = self.__records[index]
+
+        if record is None:
+            record = self.__build_record(index, self.__edges[index])
+            self.__records[index] = record
+
+        return record
+
+    def __len__(self):
+        return len(self.__edges)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class CollectionResult:
     def __init__(
             self,
@@ -72,27 +325,38 @@ class CollectionResult:
             result,
             result_path,
             options,
-            client):
+            client,
+            result_format=EAGER):
         self.__client = client
         self.__data_type_name = data_type_name
         self.__options = options
         self.__result_path = result_path
         self.__page_info = result['pageInfo']
         self.__result_name = result_name
+        self.__result_format = result_format
 
         self.total_count = result['totalCount']
         self.has_previous_page = result['pageInfo']['hasPreviousPage']
         self.has_next_page = result['pageInfo']['hasNextPage']
-        self.data = []
-        for index, edge in enumerate(result['edges']):
-            self.data.append(
-                Result(
-                    data_type_name,
-                    result_name,
-                    edge['node'],
-                    result_path + f'[{index}]',
-                    options,
-                    client))
+        self.start_cursor = result['pageInfo']['startCursor']
+        self.end_cursor = result['pageInfo']['endCursor']
+        if result_format == LAZY:
+            # Each record is only wrapped when it is first read.
+            self.data = LazyRecords(result['edges'], self.__build_record)
+        else:
+            self.data = [
+                self.__build_record(index, edge)
+                for index, edge
+                in enumerate(result['edges'])]
+
+    def __build_record(self, index, edge):
+        return result_class(self.__result_format)(
+            self.__data_type_name,
+            self.__result_name,
+            edge['node'],
+            self.__result_path + f'[{index}]',
+            self.__options,
+            self.__client)
 
     def __str__(self):
         total_count_str = f'\'total_count\': {str(self.total_count)}'
@@ -120,12 +384,14 @@ class CollectionResult:
         return unwrapped_path.replace('include.', '').replace('[', 'data[')
 
     def __page(self, paged_options):
-        # Overwrite the options that applied to this collection with the new
+        # Replace the options that applied to this collection with the new
         # options and then unwrap these to remove the artificial
         # 'include': { data_type_name: ... } that we added when building the
         # result.
-        client_options = self.__options
-        set_(client_options, self.__options_path(), paged_options)
+        client_options = replace_options(
+            self.__options,
+            self.__options_path(),
+            paged_options)
         client_options = get(
             client_options,
             f'include.{self.__result_name}')
@@ -136,6 +402,14 @@ class CollectionResult:
             self.__data_type_name,
             client_options)
 
+        # When the client is asynchronous the callback hands back an awaitable
+        # so the page can only be hoisted once it has been awaited.
+        if isawaitable(result):
+            return self.__hoist_page_async(result)
+        else:
+            return self.__hoist_page(result)
+
+    def __hoist_page(self, result):
         # Determine where in the result the page is returned and hoist it up to
         # return it back.
         page_path = self.__page_path()
@@ -144,28 +418,31 @@ class CollectionResult:
         else:
             return get(result, page_path)
 
+    async def __hoist_page_async(self, result):
+        return self.__hoist_page(await result)
+
     def previous_page(self):
         if not self.__page_info['hasPreviousPage']:
-            return None
+            return no_page(self.__client)
         else:
-            # Fetch the options that applied to this collection, remove the
-            # 'after' parameter if it exists and set the 'before' parameter to
-            # the start cursor of the current page.
-            options = get(self.__options, self.__options_path())
-            options.pop('after', None)
-            options['before'] = self.__page_info['startCursor']
-
-            return self.__page(options)
+            # Copy the options that applied to this collection, without the
+            # 'after' parameter, and set the 'before' parameter to the start
+            # cursor of the current page.
+            return self.__page(cursor_options(
+                self.__options,
+                self.__options_path(),
+                'before',
+                self.__page_info['startCursor']))
 
     def next_page(self):
         if not self.__page_info['hasNextPage']:
-            return None
+            return no_page(self.__client)
         else:
-            # Fetch the options that applied to this collection, remove the
-            # 'before' parameter if it exists and set the 'after' parameter to
-            # the end cursor of the current page.
-            options = get(self.__options, self.__options_path())
-            options.pop('before', None)
-            options['after'] = self.__page_info['endCursor']
-
-            return self.__page(options)
+            # Copy the options that applied to this collection, without the
+            # 'before' parameter, and set the 'after' parameter to the end
+            # cursor of the current page.
+            return self.__page(cursor_options(
+                self.__options,
+                self.__options_path(),
+                'after',
+                self.__page_info['endCursor']))
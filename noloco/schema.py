@@ -0,0 +1,98 @@
+from hashlib import sha256
+from json import dumps
+from noloco.constants import (
+    COLLECTION,
+    MANY_TO_MANY,
+    MANY_TO_ONE,
+    ONE_TO_ONE)
+
+
+def schema_fingerprint(data_types):
+    return sha256(dumps(data_types, sort_keys=True).encode()).hexdigest()
+
+
+class DataTypeFields(list):
+    def __init__(self, fields):
+        super().__init__(fields)
+
+        # Index the fields by name, keeping the first field with a given name
+        # to match the order a linear search would find them in.
+        self.by_name = {}
+        for field in fields:
+            self.by_name.setdefault(field['name'], field)
+
+
+class Schema(list):
+    def __init__(self, data_types, previous_schema=None):
+        # Each data type is fingerprinted so that a later schema can tell
+        # which data types changed, and data types that have not changed
+        # since the previous schema reuse its copies and field indexes.
+        self.fingerprints = {}
+        copies = []
+        for data_type in data_types:
+            fingerprint = schema_fingerprint(data_type)
+            self.fingerprints.setdefault(data_type['name'], fingerprint)
+
+            if previous_schema is not None and \
+                    previous_schema.fingerprints.get(data_type['name']) == \
+                    fingerprint:
+                copies.append(previous_schema.by_name[data_type['name']])
+            else:
+                copies.append({
+                    **data_type,
+                    'fields': DataTypeFields(data_type['fields'])
+                })
+
+        super().__init__(copies)
+
+        self.by_name = {}
+        for data_type in self:
+            self.by_name.setdefault(data_type['name'], data_type)
+
+        # Index every relationship by the data type it points to and the
+        # name it is known by from that data type, so that reverse
+        # relationships can be resolved without scanning every field.
+        self.reverse_relationships = {}
+        self.reverse_fields = {}
+        for data_type in self:
+            for field in data_type['fields']:
+                self.__index_reverse_relationship(data_type, field)
+
+    def changed_data_types(self, previous_schema):
+        # The names of the data types that were added, removed or changed
+        # since the previous schema.
+        return {
+            data_type_name
+            for data_type_name
+            in self.fingerprints.keys() | previous_schema.fingerprints.keys()
+            if self.fingerprints.get(data_type_name) !=
+            previous_schema.fingerprints.get(data_type_name)}
+
+    def __index_reverse_relationship(self, data_type, field):
+        is_collection = field['relationship'] == MANY_TO_MANY or \
+            field['relationship'] == MANY_TO_ONE
+        reverse_name = field.get('reverseName')
+
+        # Relationships are keyed in the order a linear search would match
+        # them, so the first match always wins: first by reverse name, with
+        # the collection suffix for multi relationships...
+        if reverse_name is not None and reverse_name != '':
+            if is_collection:
+                relationship_name = reverse_name + COLLECTION
+            else:
+                relationship_name = reverse_name
+
+            self.reverse_relationships.setdefault(
+                (field['type'], relationship_name),
+                {'data_type': data_type, 'is_collection': is_collection})
+
+        # ...and then one-to-one relationships by the name of the data type
+        # they are from.
+        if field['relationship'] == ONE_TO_ONE:
+            self.reverse_relationships.setdefault(
+                (field['type'], data_type['name']),
+                {'data_type': data_type, 'is_collection': False})
+
+        # Mutations connect reverse relationships by their bare reverse name.
+        if reverse_name is not None:
+            self.reverse_fields[(field['type'], reverse_name)] = field
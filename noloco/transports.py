@@ -0,0 +1,133 @@
+from aiohttp import (
+    ClientResponse,
+    TCPConnector)
+from gql import Client
+from gql.transport.aiohttp import AIOHTTPTransport
+from gql.transport.requests import RequestsHTTPTransport
+from noloco.constants import (
+    DEFAULT_POOL_SIZE,
+    DEFAULT_POOL_SIZE_PER_HOST)
+from requests.adapters import HTTPAdapter
+
+
+def decoding_response_class(json_loads):
+    # aiohttp builds every response from the session's response class, so the
+    # decoder is bound to a response class for each session that uses one.
+    class DecodingClientResponse(ClientResponse):
+        async def json(self, *, loads=None, **kwargs):
+            return await super().json(loads=json_loads, **kwargs)
+
+    return DecodingClientResponse
+
+
+class PooledRequestsHTTPTransport(RequestsHTTPTransport):
+    def __init__(
+            self,
+            url,
+            headers,
+            pool_size,
+            pool_size_per_host,
+            keep_alive,
+            json_loads=None):
+        super().__init__(url=url, headers=headers)
+        self.__json_loads = json_loads
+        self.__pool_size = pool_size
+        self.__pool_size_per_host = pool_size_per_host
+        self.__keep_alive = keep_alive
+
+    def connect(self):
+        super().connect()
+
+        # Each transport only ever talks to a single host, so the per-host
+        # limit is the effective size of the pool. When more threads than that
+        # share the client they wait for a connection to be returned to the
+        # pool, rather than opening one that is thrown away afterwards.
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=min(self.__pool_size, self.__pool_size_per_host),
+            pool_block=True)
+        for prefix in 'http://', 'https://':
+            self.session.mount(prefix, adapter)
+
+        if not self.__keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+        if self.__json_loads is not None:
+            self.session.hooks['response'].append(self.__decode_with)
+
+    def __decode_with(self, response, *args, **kwargs):
+        # gql decodes the body with `response.json()`, so swap it for the
+        # configured decoder, which reads the raw bytes of the body.
+        json_loads = self.__json_loads
+        response.json = lambda **kwargs: json_loads(response.content)
+        return response
+
+
+class PooledAIOHTTPTransport(AIOHTTPTransport):
+    def __init__(
+            self,
+            url,
+            headers,
+            pool_size,
+            pool_size_per_host,
+            keep_alive,
+            json_loads=None):
+        super().__init__(url=url, headers=headers)
+        self.__json_loads = json_loads
+        self.__pool_size = pool_size
+        self.__pool_size_per_host = pool_size_per_host
+        self.__keep_alive = keep_alive
+
+    async def connect(self):
+        # The connector has to be created inside the running event loop, so
+        # it is only built once the transport is connected.
+        if self.session is None:
+            self.client_session_args = {
+                'connector': TCPConnector(
+                    limit=self.__pool_size,
+                    limit_per_host=self.__pool_size_per_host,
+                    force_close=not self.__keep_alive)
+            }
+
+            if self.__json_loads is not None:
+                self.client_session_args['response_class'] = \
+                    decoding_response_class(self.__json_loads)
+
+        await super().connect()
+
+
+class TransportBuilder:
+    def __init__(
+            self,
+            pool_size=DEFAULT_POOL_SIZE,
+            pool_size_per_host=DEFAULT_POOL_SIZE_PER_HOST,
+            keep_alive=True,
+            json_loads=None):
+        self.json_loads = json_loads
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.keep_alive = keep_alive
+
+    def build_client(self, url, api_key):
+        transport = PooledRequestsHTTPTransport(
+            url,
+            {'Authorization': api_key},
+            self.pool_size,
+            self.pool_size_per_host,
+            self.keep_alive,
+            self.json_loads)
+        return Client(
+            transport=transport,
+            fetch_schema_from_transport=False)
+
+    def build_async_client(self, url, api_key):
+        transport = PooledAIOHTTPTransport(
+            url,
+            {'Authorization': api_key},
+            self.pool_size,
+            self.pool_size_per_host,
+            self.keep_alive,
+            self.json_loads)
+        return Client(
+            transport=transport,
+            fetch_schema_from_transport=False)
@@ -13,9 +13,14 @@ from noloco.constants import (
     ONE_TO_ONE,
     SINGLE_OPTION,
     TEXT)
+from importlib import import_module
 from noloco.exceptions import (
     NolocoDataTypeNotFoundError,
+    NolocoMissingDependencyError,
     NolocoQueryNotSupportedError)
+from noloco.schema import (
+    DataTypeFields,
+    Schema)
 from pydash import (
     find,
     get,
@@ -114,9 +119,13 @@ def change_where_to_lookup(data_type, options):
 
 
 def find_data_type_by_name(data_type_name, data_types):
-    data_type = find(
-        data_types,
-        lambda project_data_type: project_data_type['name'] == data_type_name)
+    if isinstance(data_types, Schema):
+        data_type = data_types.by_name.get(data_type_name)
+    else:
+        data_type = find(
+            data_types,
+            lambda project_data_type:
+                project_data_type['name'] == data_type_name)
 
     if data_type is None:
         raise NolocoDataTypeNotFoundError(data_type_name)
@@ -125,11 +134,12 @@ def find_data_type_by_name(data_type_name, data_types):
 
 
 def find_field_by_name(field_name, fields):
-    field = find(
-        fields,
-        lambda data_type_field: data_type_field['name'] == field_name)
-
-    return field
+    if isinstance(fields, DataTypeFields):
+        return fields.by_name.get(field_name)
+    else:
+        return find(
+            fields,
+            lambda data_type_field: data_type_field['name'] == field_name)
 
 
 def find_relationship_data_type(
@@ -150,6 +160,12 @@ def find_relationship_data_type(
                 relationship_field['type'], data_types),
             'is_collection': is_multi_relationship(relationship_field['relationship'])
         }
+    elif isinstance(data_types, Schema):
+        # If there isn't a corresponding relationship field on the parent
+        # data type then this is a reverse relationship, which the schema has
+        # already indexed.
+        return data_types.reverse_relationships.get(
+            (data_type_name, relationship_name))
     else:
         # If there isn't a corresponding relationship field on the
         # parent data type then this is a reverse relationship and we
@@ -183,6 +199,26 @@ def find_relationship_data_type(
                             }
 
 
+def find_reverse_relationship_field(
+        relationship_name,
+        data_type_name,
+        data_types):
+    if isinstance(data_types, Schema):
+        return data_types.reverse_fields.get(
+            (data_type_name, relationship_name))
+
+    # Search every field for a relationship to the data type with a reverse
+    # name that matches; the last matching field wins.
+    related_field = None
+    for related_data_type in data_types:
+        for field in related_data_type['fields']:
+            if field['type'] == data_type_name and \
+                    field['reverseName'] == relationship_name:
+                related_field = field
+
+    return related_field
+
+
 def flatten_args(data_type_name, args):
     flattened_args = {}
 
@@ -245,6 +281,65 @@ def has_files(args):
     return False
 
 
+def data_type_dependencies(data_type, data_types, args, new_value=None):
+    # The names of the data types a document for the data type, args and new
+    # value is built from, so that it can be discarded if any of them change.
+    dependencies = {data_type['name']}
+
+    for relationship_name, nested_args in (get(args, 'include') or {}).items():
+        relationship_data_type = find_relationship_data_type(
+            relationship_name,
+            data_type['name'],
+            data_type['fields'],
+            data_types)
+
+        if relationship_data_type is not None:
+            dependencies |= data_type_dependencies(
+                relationship_data_type['data_type'],
+                data_types,
+                {} if nested_args is True else nested_args)
+
+    for arg_name in (new_value or {}).keys():
+        data_type_field = find_field_by_name(arg_name, data_type['fields'])
+
+        if data_type_field is not None:
+            if data_type_field['relationship'] is not None:
+                dependencies.add(data_type_field['type'])
+        else:
+            # Values for reverse relationships are typed by the fields that
+            # point to this data type from other data types.
+            dependencies |= {
+                related_data_type['name']
+                for related_data_type
+                in data_types
+                for field
+                in related_data_type['fields']
+                if field['type'] == data_type['name']}
+
+    return dependencies
+
+
+def import_optional_dependency(package_name, extra_name):
+    # Optional dependencies are only imported when the feature that needs them
+    # is used, so that they do not have to be installed otherwise.
+    try:
+        return import_module(package_name)
+    except ImportError:
+        raise NolocoMissingDependencyError(package_name, extra_name)
+
+
+def include_shape(args):
+    # The shape of the relationships included by a set of options, ignoring
+    # any values passed alongside them.
+    include = get(args, 'include') or {}
+
+    return tuple(
+        (relationship_name,
+         True if nested_args is True else include_shape(nested_args))
+        for relationship_name, nested_args
+        in include.items())
+
+
 def options_without_data(options):
     new_options = {}
 
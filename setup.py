@@ -14,5 +14,9 @@ setup(
     license='MIT',
     packages=find_packages(exclude=('docs', 'tests')),
     include_package_data=True,
-    install_requires=['gql[all]', 'pydash']
+    install_requires=['gql[all]', 'pydash'],
+    extras_require={
+        'arrow': ['pyarrow'],
+        'columnar': ['numpy']
+    }
 )
@@ -0,0 +1,133 @@
+import pyarrow
+import pyarrow.parquet
+from noloco.arrow import (
+    arrow_schema,
+    build_record_batch,
+    iterate_record_batches,
+    parquet_writer)
+from noloco.schema import Schema
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+
+DATA_TYPES = Schema([{
+    'name': 'order',
+    'fields': [
+        {'name': 'id', 'type': 'INTEGER', 'relationship': None},
+        {'name': 'total', 'type': 'DECIMAL', 'relationship': None},
+        {'name': 'paid', 'type': 'BOOLEAN', 'relationship': None},
+        {'name': 'placedAt', 'type': 'DATE', 'relationship': None},
+        {'name': 'status', 'type': 'SINGLE_OPTION', 'relationship': None},
+        {'name': 'tags', 'type': 'MULTIPLE_OPTION', 'relationship': None},
+        {'name': 'leadTime', 'type': 'DURATION', 'relationship': None},
+        {
+            'name': 'customer',
+            'type': 'user',
+            'relationship': 'MANY_TO_ONE',
+            'reverseName': 'orders'
+        }
+    ]
+}])
+
+
+ORDERS = [
+    {
+        'id': 1,
+        'total': 10.5,
+        'paid': True,
+        'placedAt': '2023-01-02T03:04:05.678Z',
+        'status': 'OPEN',
+        'tags': ['A', 'B'],
+        'leadTime': {'days': 1},
+        'customer': {'id': 7}
+    },
+    {
+        'id': 2,
+        'total': None,
+        'paid': None,
+        'placedAt': None,
+        'status': None,
+        'tags': None,
+        'leadTime': None,
+        'customer': None
+    }
+]
+
+
+class FakePage:
+    def __init__(self, data, end_cursor, has_next_page):
+        self.data = data
+        self.end_cursor = end_cursor
+        self.has_next_page = has_next_page
+
+
+class TestArrowSchema(TestCase):
+    def test_arrow_schema_from_field_types(self):
+        schema = arrow_schema(DATA_TYPES[0])
+
+        self.assertEqual(pyarrow.schema([
+            ('id', pyarrow.int64()),
+            ('total', pyarrow.float64()),
+            ('paid', pyarrow.bool_()),
+            ('placedAt', pyarrow.timestamp('ms', tz='UTC')),
+            ('status', pyarrow.string()),
+            ('tags', pyarrow.list_(pyarrow.string())),
+            ('leadTime', pyarrow.string())
+        ]), schema)
+
+
+class TestBuildRecordBatch(TestCase):
+    def test_build_record_batch(self):
+        record_batch = build_record_batch(
+            arrow_schema(DATA_TYPES[0]),
+            ORDERS)
+
+        rows = record_batch.to_pylist()
+        self.assertEqual(2, record_batch.num_rows)
+        self.assertEqual(1, rows[0]['id'])
+        self.assertEqual(
+            '2023-01-02T03:04:05.678000+00:00',
+            rows[0]['placedAt'].isoformat())
+        self.assertEqual(['A', 'B'], rows[0]['tags'])
+        self.assertEqual('{"days": 1}', rows[0]['leadTime'])
+        self.assertNotIn('customer', rows[0])
+        self.assertEqual(
+            {
+                'id': 2,
+                'total': None,
+                'paid': None,
+                'placedAt': None,
+                'status': None,
+                'tags': None,
+                'leadTime': None
+            },
+            rows[1])
+
+
+class TestIterateRecordBatches(TestCase):
+    def test_iterate_record_batches_writes_parquet(self):
+        pages = {
+            None: FakePage(ORDERS[:1], 'a', True),
+            'a': FakePage(ORDERS[1:], 'b', False)
+        }
+
+        def find_many(data_type_name, options):
+            self.assertEqual('order', data_type_name)
+            return pages[options.get('after')]
+
+        with TemporaryDirectory() as directory:
+            file_path = path.join(directory, 'orders.parquet')
+
+            with parquet_writer(file_path, DATA_TYPES[0]) as writer:
+                for record_batch in iterate_record_batches(
+                        find_many,
+                        DATA_TYPES[0],
+                        {},
+                        1):
+                    self.assertEqual(1, record_batch.num_rows)
+                    writer.write_batch(record_batch)
+
+            table = pyarrow.parquet.read_table(file_path)
+
+        self.assertEqual([1, 2], table.column('id').to_pylist())
@@ -0,0 +1,316 @@
+from noloco.backends import (
+    FileBackend,
+    MemoryBackend,
+    RedisBackend,
+    SQLiteBackend,
+    encode_command)
+from noloco.cache import ResultCache
+from noloco.exceptions import NolocoCacheBackendError
+import os
+from socketserver import (
+    StreamRequestHandler,
+    ThreadingTCPServer)
+import sqlite3
+import stat
+from tempfile import TemporaryDirectory
+from threading import Thread
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+
+class FakeRedisHandler(StreamRequestHandler):
+    # Just enough of the Redis protocol to stand in for a server.
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+
+            arguments = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                arguments.append(self.rfile.read(length + 2)[:-2])
+
+            self.wfile.write(self.server.reply(arguments))
+
+    def finish(self):
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+
+class FakeRedisServer(ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.commands = []
+        self.databases = 16
+        self.entries = {}
+
+    def reply(self, arguments):
+        command = arguments[0].decode().upper()
+        self.commands.append(command)
+
+        if command == 'GET':
+            return self.__bulk(self.__get(arguments[1]))
+        elif command == 'MGET':
+            values = [self.__get(key) for key in arguments[1:]]
+            return f'*{len(values)}\r\n'.encode() + b''.join(
+                self.__bulk(value) for value in values)
+        elif command == 'SET':
+            expiry = None
+            if len(arguments) == 5:
+                expiry = time.time() + int(arguments[4]) / 1000
+            self.entries[arguments[1]] = (arguments[2], expiry)
+            return b'+OK\r\n'
+        elif command == 'DEL':
+            deleted = self.entries.pop(arguments[1], None) is not None
+            return f':{int(deleted)}\r\n'.encode()
+        elif command == 'SELECT':
+            if int(arguments[1]) < self.databases:
+                return b'+OK\r\n'
+            else:
+                return b'-ERR DB index is out of range\r\n'
+        elif command == 'AUTH':
+            if arguments[1] == b'secret':
+                return b'+OK\r\n'
+            else:
+                return b'-WRONGPASS invalid password\r\n'
+        else:
+            return b'-ERR unknown command\r\n'
+
+    def __get(self, key):
+        value, expiry = self.entries.get(key, (None, None))
+        if expiry is not None and time.time() >= expiry:
+            return None
+        return value
+
+    def __bulk(self, value):
+        if value is None:
+            return b'$-1\r\n'
+        else:
+            return f'${len(value)}\r\n'.encode() + value + b'\r\n'
+
+
+class BackendContract:
+    def test_set_and_get(self):
+        self.backend.set('a', b'1')
+        self.backend.set('b', b'2\r\n')
+
+        self.assertEqual(b'1', self.backend.get('a'))
+        self.assertEqual([b'1', None, b'2\r\n'], self.backend.get_many([
+            'a',
+            'missing',
+            'b']))
+
+    def test_delete(self):
+        self.backend.set('a', b'1')
+        self.backend.delete('a')
+        self.backend.delete('missing')
+
+        self.assertIsNone(self.backend.get('a'))
+
+    def test_entries_expire(self):
+        self.backend.set('a', b'1', 0.05)
+        self.assertEqual(b'1', self.backend.get('a'))
+
+        time.sleep(0.1)
+
+        self.assertIsNone(self.backend.get('a'))
+        self.assertEqual([None], self.backend.get_many(['a']))
+
+    def test_results_are_shared_through_the_backend(self):
+        # Two caches over the same backend stand in for two processes.
+        first = ResultCache(self.backend, 60, 'portal')
+        second = ResultCache(self.backend, 60, 'portal')
+
+        first.set('key', {'user': None}, first.generations(['user']))
+        self.assertEqual({'user': None}, second.get('key'))
+
+        second.invalidate(['user'])
+        self.assertIsNone(first.get('key'))
+
+
+class TestMemoryBackend(BackendContract, TestCase):
+    def setUp(self):
+        self.backend = MemoryBackend(16)
+
+    def test_evicts_least_recently_used(self):
+        backend = MemoryBackend(1)
+        backend.set('a', b'1')
+        backend.set('b', b'2')
+
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(b'2', backend.get('b'))
+
+    def test_evicted_generations_do_not_revive_results(self):
+        # Only room for the result and one generation at a time.
+        cache = ResultCache(MemoryBackend(3), 60, 'portal')
+        generations = cache.generations(['user'])
+        cache.set('key', {'user': None}, generations)
+        cache.invalidate(['user'])
+
+        cache.generations(['company'])
+        cache.generations(['role'])
+
+        self.assertIsNone(cache.get('key'))
+
+
+class TestFileBackend(BackendContract, TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.backend = FileBackend(os.path.join(self.directory.name, 'cache'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_entries_are_private(self):
+        self.backend.set('a', b'1')
+
+        directory_mode = os.stat(self.backend.directory).st_mode
+        self.assertEqual(0o700, stat.S_IMODE(directory_mode))
+        for entry in os.listdir(self.backend.directory):
+            entry_mode = os.stat(
+                os.path.join(self.backend.directory, entry)).st_mode
+            self.assertEqual(0o600, stat.S_IMODE(entry_mode))
+
+    def test_expired_entries_are_swept(self):
+        backend = FileBackend(self.backend.directory, sweep_interval=0)
+        backend.set('a', b'1', 0.05)
+        backend.set('b', b'2')
+
+        time.sleep(0.1)
+        backend.set('c', b'3', 60)
+
+        self.assertEqual(2, len(os.listdir(backend.directory)))
+        self.assertEqual([None, b'2', b'3'], backend.get_many([
+            'a',
+            'b',
+            'c']))
+
+
+class TestSQLiteBackend(BackendContract, TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.backend = SQLiteBackend(
+            os.path.join(self.directory.name, 'cache', 'cache.sqlite3'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_database_is_private(self):
+        self.assertEqual(
+            0o600,
+            stat.S_IMODE(os.stat(self.backend.path).st_mode))
+
+    def test_database_errors_are_backend_errors(self):
+        cache = ResultCache(self.backend, 60, 'portal')
+        generations = cache.generations(['user'])
+        cache.set('key', {'user': None}, generations)
+
+        with sqlite3.connect(self.backend.path) as connection:
+            connection.execute('DROP TABLE entries')
+
+        with self.assertRaises(NolocoCacheBackendError):
+            self.backend.get('a')
+        with self.assertRaises(NolocoCacheBackendError):
+            self.backend.set('a', b'1')
+        with self.assertRaises(NolocoCacheBackendError):
+            self.backend.delete('a')
+
+        # The cache treats them as a miss rather than failing the call.
+        self.assertIsNone(cache.get('key'))
+        self.assertIsNone(cache.generations(['user']))
+        cache.set('key', {'user': None}, generations)
+        cache.invalidate(['user'])
+
+    def test_threads_share_the_database(self):
+        thread = Thread(target=self.backend.set, args=('a', b'1'))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(b'1', self.backend.get('a'))
+
+
+class TestRedisBackend(BackendContract, TestCase):
+    def setUp(self):
+        self.server = FakeRedisServer()
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.backend = RedisBackend(
+            '127.0.0.1',
+            self.server.server_address[1],
+            password='secret')
+
+    def tearDown(self):
+        self.backend.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_encode_command(self):
+        self.assertEqual(
+            b'*3\r\n$3\r\nSET\r\n$1\r\na\r\n$2\r\n10\r\n',
+            encode_command('SET', 'a', 10))
+
+    def test_keys_are_prefixed(self):
+        self.backend.set('a', b'1')
+
+        self.assertIn(b'noloco:a', self.server.entries)
+
+    def test_authenticates_once_per_connection(self):
+        self.backend.set('a', b'1')
+        self.backend.get('a')
+
+        self.assertEqual(['AUTH', 'SET', 'GET'], self.server.commands)
+
+    def test_error_replies_are_raised(self):
+        backend = RedisBackend(
+            '127.0.0.1',
+            self.server.server_address[1],
+            password='wrong')
+
+        try:
+            with self.assertRaises(NolocoCacheBackendError):
+                backend.get('a')
+            with self.assertRaises(NolocoCacheBackendError):
+                backend.get('a')
+        finally:
+            backend.close()
+
+        # The command is never sent over a connection that failed to
+        # authenticate.
+        self.assertEqual(['AUTH', 'AUTH'], self.server.commands)
+
+    def test_failed_connections_are_retried(self):
+        backend = RedisBackend(
+            '127.0.0.1',
+            self.server.server_address[1],
+            db=3,
+            password='secret')
+        self.server.databases = 1
+
+        try:
+            with self.assertRaises(NolocoCacheBackendError):
+                backend.set('a', b'1')
+
+            self.server.databases = 16
+            backend.set('a', b'1')
+        finally:
+            backend.close()
+
+        self.assertEqual(
+            ['AUTH', 'SELECT', 'AUTH', 'SELECT', 'SET'],
+            self.server.commands)
+
+    def test_reconnects_after_the_connection_drops(self):
+        self.backend.set('a', b'1')
+
+        # Simulate the server closing the idle connection.
+        with patch('socket.socket.sendall', side_effect=BrokenPipeError):
+            with self.assertRaises(OSError):
+                self.backend.get('a')
+
+        self.assertEqual(b'1', self.backend.get('a'))
@@ -0,0 +1,392 @@
+import asyncio
+from gql.transport.exceptions import TransportQueryError
+from graphql import print_ast
+from noloco.batches import (
+    Batch,
+    run_bulk,
+    run_bulk_async,
+    unique_lookup)
+from noloco.backends import MemoryBackend
+from noloco.cache import (
+    LRUCache,
+    ResultCache)
+from noloco.exceptions import (
+    NolocoBatchNotExecutedError,
+    NolocoFieldNotFoundError)
+from noloco.project import ProjectSnapshot
+from unittest import TestCase
+
+
+DATA_TYPES = [
+    {
+        'name': 'user',
+        'fields': [
+            {'name': 'id',
+             'type': 'INTEGER',
+             'relationship': None,
+             'required': False},
+            {'name': 'firstName',
+             'type': 'TEXT',
+             'relationship': None,
+             'required': False}
+        ]
+    },
+    {
+        'name': 'user1',
+        'fields': [
+            {'name': 'id',
+             'type': 'INTEGER',
+             'relationship': None,
+             'required': False}
+        ]
+    }
+]
+
+
+class FakeClient:
+    def __init__(self, response):
+        self.requests = []
+        self.response = response
+
+    def execute(self, document, variable_values, upload_files):
+        self.requests.append((print_ast(document), variable_values))
+
+        if isinstance(self.response, Exception):
+            raise self.response
+        elif callable(self.response):
+            return self.response(variable_values)
+        else:
+            return self.response
+
+
+def create_users(message):
+    # Like a server that cannot coerce a variable, any bad value fails the
+    # whole document before it is executed.
+    def execute(variable_values):
+        if 'Bad' in variable_values.values():
+            raise TransportQueryError(message, errors=[{'message': message}])
+
+        return {
+            name[:-len('_firstName')]: {'id': 1, 'firstName': first_name}
+            for name, first_name
+            in variable_values.items()}
+
+    return execute
+
+
+class FakeAsyncClient(FakeClient):
+    async def execute(self, document, variable_values, upload_files):
+        return super().execute(document, variable_values, upload_files)
+
+
+class FakeProject:
+    def __init__(self, response, client_class=FakeClient):
+        self.client = client_class(response)
+        self.documents = LRUCache(16)
+        self.refreshes = 0
+        self.results = None
+        self.snapshot = ProjectSnapshot(self.client, DATA_TYPES, None, 0)
+
+    def cache_document(self, key, document, dependencies, generation):
+        self.documents.set(key, document, dependencies)
+
+    def connect(self):
+        pass
+
+    def refresh(self, generation=None):
+        self.refreshes += 1
+
+
+class FakeAsyncProject(FakeProject):
+    def __init__(self, response):
+        super().__init__(response, FakeAsyncClient)
+
+    async def connect(self):
+        pass
+
+    async def refresh(self, generation=None):
+        self.refreshes += 1
+
+
+class TestBatch(TestCase):
+    def test_batch_sends_aliased_operations_in_one_request(self):
+        project = FakeProject({
+            'b0_createUser': {'id': 1, 'firstName': 'Jane'},
+            'b1_createUser': {'id': 2, 'firstName': 'John'}
+        })
+        batch = Batch(project, None, None)
+
+        jane = batch.create('user', {'data': {'firstName': 'Jane'}})
+        john = batch.create('user', {'data': {'firstName': 'John'}})
+        batch.execute()
+
+        self.assertEqual(1, len(project.client.requests))
+        document, variable_values = project.client.requests[0]
+        self.assertIn(
+            'b0_createUser: createUser(firstName: $b0_createUser_firstName)',
+            document)
+        self.assertIn(
+            'b1_createUser: createUser(firstName: $b1_createUser_firstName)',
+            document)
+        self.assertEqual({
+            'b0_createUser_firstName': 'Jane',
+            'b1_createUser_firstName': 'John'
+        }, variable_values)
+        self.assertEqual(1, jane.result().id)
+        self.assertEqual('John', john.result().firstName)
+
+    def test_batch_attributes_errors_to_failed_operations(self):
+        project = FakeProject(TransportQueryError(
+            'cannot create',
+            errors=[{'message': 'cannot create', 'path': ['b1_createUser']}],
+            data={
+                'b0_createUser': {'id': 1, 'firstName': 'Jane'},
+                'b1_createUser': None
+            }))
+        batch = Batch(project, None, None)
+
+        jane = batch.create('user', {'data': {'firstName': 'Jane'}})
+        john = batch.create('user', {'data': {'firstName': 'John'}})
+        results = batch.execute()
+
+        self.assertEqual(1, jane.result().id)
+        self.assertIsInstance(results[1], TransportQueryError)
+        with self.assertRaises(TransportQueryError):
+            john.result()
+
+    def test_aliases_are_unique_across_data_types(self):
+        project = FakeProject({})
+        batch = Batch(project, None, None)
+
+        # Without a delimiter, the `user1` lookup at index 1 and the `user`
+        # lookup at index 11 would both be aliased `user11`.
+        batch.findUnique('user', {'where': {'id': {'equals': 0}}})
+        batch.findUnique('user1', {'where': {'id': {'equals': 1}}})
+        for id in range(2, 12):
+            batch.findUnique('user', {'where': {'id': {'equals': id}}})
+        batch.execute()
+
+        document, variable_values = project.client.requests[0]
+        self.assertIn('b1_user1: user1(', document)
+        self.assertIn('b11_user: user(', document)
+        self.assertEqual(list(range(12)), list(variable_values.values()))
+
+    def test_batch_fails_operations_that_cannot_be_built(self):
+        project = FakeProject({
+            'b1_createUser': {'id': 1, 'firstName': 'Jane'}})
+        batch = Batch(project, None, None)
+
+        unknown = batch.create('user', {'data': {'lastName': 'Doe'}})
+        jane = batch.create('user', {'data': {'firstName': 'Jane'}})
+        batch.execute()
+
+        # The schema is refreshed once in case it was stale, and the rest of
+        # the batch is still sent.
+        self.assertEqual(1, project.refreshes)
+        self.assertEqual(1, len(project.client.requests))
+        self.assertNotIn('b0_createUser', project.client.requests[0][0])
+        self.assertEqual(1, jane.result().id)
+        with self.assertRaises(NolocoFieldNotFoundError):
+            unknown.result()
+
+    def test_batch_executes_asynchronously(self):
+        project = FakeAsyncProject({
+            'b0_user': {'id': 1, 'firstName': 'Jane'},
+            'b1_createUser': {'id': 2, 'firstName': 'John'}
+        })
+
+        async def execute():
+            async with Batch(project, None, None) as batch:
+                jane = batch.findUnique(
+                    'user',
+                    {'where': {'id': {'equals': 1}}})
+                john = batch.create('user', {'data': {'firstName': 'John'}})
+                unknown = batch.create('user', {'data': {'lastName': 'Doe'}})
+
+            return jane, john, unknown
+
+        jane, john, unknown = asyncio.run(execute())
+
+        self.assertEqual(2, len(project.client.requests))
+        self.assertEqual('Jane', jane.result().firstName)
+        self.assertEqual(2, john.result().id)
+        self.assertIsInstance(unknown.error, NolocoFieldNotFoundError)
+
+    def test_batch_mutations_invalidate_cached_results(self):
+        project = FakeProject({
+            'b0_createUser': {'id': 1, 'firstName': 'Jane'}})
+        project.results = ResultCache(MemoryBackend(16), 60, 'portal')
+        project.results.set(
+            'users',
+            {'userCollection': None},
+            project.results.generations(['user']))
+
+        with Batch(project, None, None) as batch:
+            batch.create('user', {'data': {'firstName': 'Jane'}})
+
+        self.assertIsNone(project.results.get('users'))
+
+    def test_batch_operation_result_before_execution(self):
+        batch = Batch(FakeProject({}), None, None)
+
+        jane = batch.create('user', {'data': {'firstName': 'Jane'}})
+
+        with self.assertRaises(NolocoBatchNotExecutedError):
+            jane.result()
+
+
+class TestRunBulk(TestCase):
+    def test_run_bulk_chunks_rows_into_batches(self):
+        project = FakeProject({
+            'b0_createUser': {'id': 1, 'firstName': 'Jane'},
+            'b1_createUser': {'id': 2, 'firstName': 'John'}
+        })
+        rows = [
+            {'data': {'firstName': 'Jane'}},
+            {'data': {'firstName': 'John'}},
+            {'data': {'firstName': 'Jane'}}
+        ]
+
+        bulk_result = run_bulk(
+            lambda: Batch(project, None, None),
+            lambda batch, options: batch.create('user', options),
+            rows,
+            2,
+            1)
+
+        self.assertEqual(2, len(project.client.requests))
+        self.assertEqual(3, len(bulk_result.succeeded))
+        self.assertEqual([], bulk_result.failed)
+        self.assertEqual(
+            [1, 2, 1],
+            [result.id for result in bulk_result.results])
+
+    def test_run_bulk_reports_failed_rows(self):
+        project = FakeProject(Exception('Server unavailable'))
+
+        bulk_result = run_bulk(
+            lambda: Batch(project, None, None),
+            lambda batch, options: batch.create('user', options),
+            [{'data': {'firstName': 'Jane'}}],
+            2,
+            1)
+
+        self.assertEqual([], bulk_result.succeeded)
+        self.assertEqual(0, bulk_result.failed[0][0])
+
+    def test_run_bulk_fails_bad_rows_on_their_own(self):
+        project = FakeProject({
+            'b1_createUser': {'id': 1, 'firstName': 'Jane'}})
+
+        bulk_result = run_bulk(
+            lambda: Batch(project, None, None),
+            lambda batch, options: batch.create('user', options),
+            [
+                {'firstName': 'John'},
+                {'data': {'lastName': 'Doe'}},
+                {'data': {'firstName': 'Jane'}}
+            ],
+            3,
+            1)
+
+        self.assertEqual(1, len(project.client.requests))
+        self.assertEqual([(2, 1)], [
+            (index, result.id)
+            for index, result
+            in bulk_result.succeeded])
+        self.assertIsInstance(bulk_result.results[0], KeyError)
+        self.assertIsInstance(
+            bulk_result.results[1],
+            NolocoFieldNotFoundError)
+
+    def test_run_bulk_fails_rows_named_by_a_document_error(self):
+        project = FakeProject(create_users(
+            'Variable "$b1_createUser_firstName" got invalid value'))
+
+        bulk_result = run_bulk(
+            lambda: Batch(project, None, None),
+            lambda batch, first_name: batch.create(
+                'user',
+                {'data': {'firstName': first_name}}),
+            ['Jane', 'Bad', 'John'],
+            3,
+            1)
+
+        # The rows that were not executed because of the bad one are sent
+        # again without it.
+        self.assertEqual(2, len(project.client.requests))
+        self.assertEqual(['Jane', 'John'], [
+            result.firstName
+            for _, result
+            in bulk_result.succeeded])
+        self.assertEqual(1, bulk_result.failed[0][0])
+        self.assertIn('$b1_createUser', str(bulk_result.failed[0][1]))
+
+    def test_run_bulk_splits_chunks_that_fail_as_a_whole(self):
+        project = FakeAsyncProject(create_users('Variable coercion failed'))
+
+        bulk_result = asyncio.run(run_bulk_async(
+            lambda: Batch(project, None, None),
+            lambda batch, first_name: batch.create(
+                'user',
+                {'data': {'firstName': first_name}}),
+            ['Jane', 'John', 'Bad', 'Joan'],
+            4,
+            1))
+
+        self.assertEqual(
+            "{'succeeded': 3, 'failed': 1}",
+            str(bulk_result))
+        self.assertEqual(2, bulk_result.failed[0][0])
+        self.assertIsInstance(bulk_result.failed[0][1], TransportQueryError)
+
+    def test_run_bulk_async_keeps_a_bounded_number_of_chunks_in_flight(self):
+        project = FakeAsyncProject({
+            'b0_createUser': {'id': 1, 'firstName': 'Jane'}
+        })
+        consumed = []
+        rows_consumed_when_sent = []
+
+        def rows():
+            for _ in range(4):
+                consumed.append(1)
+                yield {'data': {'firstName': 'Jane'}}
+
+        def new_batch():
+            rows_consumed_when_sent.append(len(consumed))
+            return Batch(project, None, None)
+
+        bulk_result = asyncio.run(run_bulk_async(
+            new_batch,
+            lambda batch, options: batch.create('user', options),
+            rows(),
+            1,
+            1))
+
+        # Each chunk is sent as soon as the chunk after it has been read,
+        # rather than once every row has been.
+        self.assertEqual(4, len(bulk_result.succeeded))
+        self.assertEqual([2, 3, 4, 4], rows_consumed_when_sent)
+
+    def test_unique_lookups_are_returned_in_input_order(self):
+        project = FakeProject({
+            'b0_user': {'id': 2, 'firstName': 'John'},
+            'b1_user': {'id': 1, 'firstName': 'Jane'}
+        })
+
+        bulk_result = run_bulk(
+            lambda: Batch(project, None, None),
+            unique_lookup('user', 'firstName', {}),
+            ['John', 'Jane'],
+            2,
+            1)
+
+        self.assertEqual(1, len(project.client.requests))
+        document, variable_values = project.client.requests[0]
+        self.assertIn('b0_user: user(firstName: $b0_user_firstName)', document)
+        self.assertEqual(
+            {'b0_user_firstName': 'John', 'b1_user_firstName': 'Jane'},
+            variable_values)
+        self.assertEqual(
+            [2, 1],
+            [result.id for result in bulk_result.results])
@@ -0,0 +1,199 @@
+import asyncio
+from noloco.backends import (
+    FileBackend,
+    MemoryBackend)
+from noloco.cache import (
+    LRUCache,
+    ResultCache,
+    SchemaCache)
+import os
+import stat
+from tempfile import TemporaryDirectory
+from threading import get_ident
+from unittest import TestCase
+from unittest.mock import patch
+
+
+class TestLRUCache(TestCase):
+    def test_get_missing_key(self):
+        cache = LRUCache(2)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual('b', cache.get('a', 'b'))
+
+    def test_set_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(1, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual(2, len(cache))
+
+    def test_clear(self):
+        cache = LRUCache(2)
+
+        cache.set('a', 1)
+        cache.clear()
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, len(cache))
+
+    def test_invalidate_removes_tagged_entries(self):
+        cache = LRUCache(4)
+
+        cache.set('a', 1, {'user'})
+        cache.set('b', 2, {'user', 'company'})
+        cache.set('c', 3, {'company'})
+        cache.set('d', 4)
+        cache.invalidate({'user'})
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual(4, cache.get('d'))
+
+    def test_zero_size_cache_stores_nothing(self):
+        cache = LRUCache(0)
+
+        cache.set('a', 1)
+
+        self.assertIsNone(cache.get('a'))
+
+
+DATA_TYPES = [{'name': 'user', 'fields': []}]
+
+
+class TestSchemaCache(TestCase):
+    def test_save_and_load(self):
+        with TemporaryDirectory() as directory:
+            cache = SchemaCache(FileBackend(directory), 60, 'account key')
+            cache.save('portal', 'project key', DATA_TYPES)
+
+            cached_schema = cache.load('portal')
+
+            self.assertEqual('project key', cached_schema.project_api_key)
+            self.assertEqual(DATA_TYPES, cached_schema.data_types)
+            self.assertIsNone(cache.load('other portal'))
+            other_cache = SchemaCache(
+                FileBackend(directory),
+                60,
+                'other key')
+            self.assertIsNone(other_cache.load('portal'))
+
+    def test_entries_are_private(self):
+        with TemporaryDirectory() as directory:
+            cache_directory = os.path.join(directory, 'schemas')
+            cache = SchemaCache(
+                FileBackend(cache_directory),
+                60,
+                'account key')
+            cache.save('portal', 'project key', DATA_TYPES)
+
+            entries = os.listdir(cache_directory)
+            self.assertEqual(1, len(entries))
+            entry_mode = os.stat(
+                os.path.join(cache_directory, entries[0])).st_mode
+            self.assertEqual(0o600, stat.S_IMODE(entry_mode))
+            with open(os.path.join(cache_directory, entries[0])) as entry:
+                self.assertNotIn('account key', entry.read())
+
+    def test_expired_entry_is_a_miss(self):
+        with TemporaryDirectory() as directory:
+            cache = SchemaCache(FileBackend(directory), 60, 'account key')
+
+            with patch('noloco.cache.time.time', return_value=1000):
+                cache.save('portal', 'project key', DATA_TYPES)
+
+            with patch('noloco.cache.time.time', return_value=1061):
+                self.assertIsNone(cache.load('portal'))
+
+            with patch('noloco.cache.time.time', return_value=1060):
+                self.assertIsNotNone(cache.load('portal'))
+
+    def test_corrupt_entry_is_a_miss(self):
+        with TemporaryDirectory() as directory:
+            cache = SchemaCache(FileBackend(directory), 60, 'account key')
+            cache.save('portal', 'project key', DATA_TYPES)
+
+            entry_path = os.path.join(directory, os.listdir(directory)[0])
+            with open(entry_path, 'w') as entry_file:
+                entry_file.write('{"projectApiKey": ')
+
+            self.assertIsNone(cache.load('portal'))
+
+
+class TestResultCache(TestCase):
+    def test_hits_are_fresh_copies(self):
+        cache = ResultCache(MemoryBackend(16), 60, 'portal')
+        cache.set('key', {'user': {'id': 1}}, cache.generations(['user']))
+
+        result = cache.get('key')
+        result['user']['id'] = 2
+
+        self.assertEqual({'user': {'id': 1}}, cache.get('key'))
+
+    def test_results_expire(self):
+        cache = ResultCache(MemoryBackend(16), 60, 'portal')
+
+        with patch('noloco.backends.time.time', return_value=1000):
+            cache.set('key', {'user': None}, cache.generations(['user']))
+
+        with patch('noloco.backends.time.time', return_value=1059):
+            self.assertEqual({'user': None}, cache.get('key'))
+
+        with patch('noloco.backends.time.time', return_value=1060):
+            self.assertIsNone(cache.get('key'))
+
+    def test_invalidate_discards_results_of_data_type(self):
+        cache = ResultCache(MemoryBackend(16), 60, 'portal')
+        cache.set('user', {'user': None}, cache.generations(['user']))
+        cache.set(
+            'company',
+            {'company': None},
+            cache.generations(['company', 'user']))
+        cache.set('role', {'role': None}, cache.generations(['role']))
+
+        cache.invalidate(['user'])
+
+        self.assertIsNone(cache.get('user'))
+        self.assertIsNone(cache.get('company'))
+        self.assertEqual({'role': None}, cache.get('role'))
+
+        cache.invalidate()
+
+        self.assertIsNone(cache.get('role'))
+
+    def test_results_read_before_an_invalidation_are_not_cached(self):
+        cache = ResultCache(MemoryBackend(16), 60, 'portal')
+        generations = cache.generations(['user'])
+
+        # The data type changed while the query was in flight.
+        cache.invalidate(['user'])
+        cache.set('key', {'user': None}, generations)
+
+        self.assertIsNone(cache.get('key'))
+
+    def test_blocking_backends_are_called_from_a_thread(self):
+        class RecordingBackend(MemoryBackend):
+            def get_many(self, keys):
+                self.threads.append(get_ident())
+                return super().get_many(keys)
+
+        async def get_generations(backend):
+            cache = ResultCache(backend, 60, 'portal')
+            return await cache.generations_async(['user'])
+
+        for blocking in [False, True]:
+            backend = RecordingBackend(16)
+            backend.blocking = blocking
+            backend.threads = []
+
+            self.assertIsNotNone(asyncio.run(get_generations(backend)))
+            self.assertEqual(
+                blocking,
+                backend.threads != [get_ident()])
@@ -0,0 +1,352 @@
+import asyncio
+from gql import gql
+from gql.transport.exceptions import TransportQueryError
+from graphql import print_ast
+from noloco.client import (
+    AsyncNoloco,
+    Noloco)
+from noloco.exceptions import NolocoUnknownError
+from unittest import TestCase
+from unittest.mock import patch
+
+
+DATA_TYPES = [
+    {
+        'name': 'user',
+        'fields': [
+            {'name': 'id',
+             'type': 'INTEGER',
+             'relationship': None,
+             'required': False},
+            {'name': 'firstName',
+             'type': 'TEXT',
+             'relationship': None,
+             'required': False}
+        ]
+    }
+]
+
+COMPANY = {
+    'name': 'company',
+    'fields': [
+        {'name': 'id',
+         'type': 'INTEGER',
+         'relationship': None,
+         'required': False}
+    ]
+}
+
+VALIDATION_FAILURE = TransportQueryError(
+    'Cannot query field',
+    errors=[{
+        'message': 'Cannot query field',
+        'extensions': {'code': 'GRAPHQL_VALIDATION_FAILED'}
+    }])
+
+USERS = [{'id': id, 'firstName': f'User {id}'} for id in range(1, 4)]
+
+
+def user_collection(variable_values):
+    # Pages through the users a record at a time, using the index of the last
+    # record as the cursor.
+    start = int(variable_values.get('userCollection_after', -1)) + 1
+    first = variable_values.get('userCollection_first', len(USERS))
+    page = USERS[start:start + first]
+
+    return {
+        'userCollection': {
+            'totalCount': len(USERS),
+            'edges': [{'node': user} for user in page],
+            'pageInfo': {
+                'hasPreviousPage': start > 0,
+                'hasNextPage': start + first < len(USERS),
+                'startCursor': str(start),
+                'endCursor': str(start + len(page) - 1)
+            }
+        }
+    }
+
+
+class FakeSession:
+    def __init__(self, url, api_key):
+        self.api_key = api_key
+        self.data_types = DATA_TYPES
+        self.errors = []
+        self.requests = []
+        self.url = url
+
+    def execute(self, document, variable_values, upload_files=False):
+        self.requests.append((print_ast(document), variable_values))
+
+        if self.errors:
+            raise self.errors.pop(0)
+        elif 'projectId' in variable_values:
+            return {
+                'project': {
+                    'apiKeys': {'project': 'project key'},
+                    'dataTypes': self.data_types
+                }
+            }
+        elif 'projectToken' in variable_values:
+            return {'validateApiKeys': {}}
+        elif print_ast(document).startswith('mutation'):
+            # Mutations name their variables after the field they return.
+            result_name = next(iter(variable_values)).split('_')[0]
+            return {result_name: USERS[0]}
+        else:
+            return user_collection(variable_values)
+
+
+class FakeAsyncSession(FakeSession):
+    async def execute(self, document, variable_values, upload_files=False):
+        return super().execute(document, variable_values, upload_files)
+
+
+class FakeClient:
+    def __init__(self, session):
+        self.closed = False
+        self.connections = 0
+        self.session = session
+
+    def connect_sync(self):
+        # Like gql, a client cannot be connected twice without being closed.
+        if self.connections > 0 and not self.closed:
+            raise RuntimeError('Transport is already connected')
+
+        self.closed = False
+        self.connections += 1
+        return self.session
+
+    def close_sync(self):
+        self.closed = True
+
+    async def connect_async(self):
+        return self.connect_sync()
+
+    async def close_async(self):
+        self.close_sync()
+
+
+class FakeTransportBuilder:
+    def __init__(self, *args):
+        self.clients = []
+        FakeTransportBuilder.last = self
+
+    def build_client(self, url, api_key):
+        client = FakeClient(FakeSession(url, api_key))
+        self.clients.append(client)
+        return client
+
+    def build_async_client(self, url, api_key):
+        client = FakeClient(FakeAsyncSession(url, api_key))
+        self.clients.append(client)
+        return client
+
+
+@patch('noloco.client.TransportBuilder', FakeTransportBuilder)
+class TestNoloco(TestCase):
+    def test_client_shares_sessions_until_closed(self):
+        client = Noloco('account key', 'portal')
+        client.findMany('user')
+        client.findMany('user')
+
+        account_client, project_client = FakeTransportBuilder.last.clients
+        self.assertEqual(1, account_client.connections)
+        self.assertEqual(1, project_client.connections)
+        self.assertEqual(2, len(project_client.session.requests))
+        self.assertFalse(account_client.closed)
+        self.assertFalse(project_client.closed)
+
+        client.close()
+
+        self.assertTrue(account_client.closed)
+        self.assertTrue(project_client.closed)
+
+    def test_commands_with_the_same_shape_reuse_their_document(self):
+        with Noloco('account key', 'portal') as client:
+            with patch('noloco.requests.gql', wraps=gql) as parse:
+                first = client.findMany('user', {'first': 1})
+                second = client.findMany('user', {'first': 2})
+
+        self.assertEqual(1, parse.call_count)
+        self.assertEqual(1, len(first.data))
+        self.assertEqual(2, len(second.data))
+
+    def test_client_reconnects_after_being_closed(self):
+        client = Noloco('account key', 'portal')
+        client.close()
+
+        try:
+            users = client.findMany('user', {'first': 2})
+        finally:
+            client.close()
+
+        account_client, _, project_client = FakeTransportBuilder.last.clients
+        self.assertEqual(2, len(users.data))
+        self.assertEqual(2, account_client.connections)
+        self.assertTrue(account_client.closed)
+        self.assertTrue(project_client.closed)
+
+    def test_client_closes_when_used_as_a_context_manager(self):
+        with Noloco('account key', 'portal') as client:
+            users = client.findMany('user', {'first': 2})
+
+        self.assertEqual(2, len(users.data))
+        self.assertTrue(all(
+            client.closed
+            for client
+            in FakeTransportBuilder.last.clients))
+
+
+class TestResultCaching(TestCase):
+    def setUp(self):
+        transport_builder = patch(
+            'noloco.client.TransportBuilder',
+            FakeTransportBuilder)
+        transport_builder.start()
+        self.addCleanup(transport_builder.stop)
+
+        self.client = Noloco('account key', 'portal', result_cache_size=16)
+        self.account_client, self.project_client = \
+            FakeTransportBuilder.last.clients
+
+    def tearDown(self):
+        self.client.close()
+
+    def requests(self):
+        return len(self.project_client.session.requests)
+
+    def test_query_results_are_cached(self):
+        first = self.client.findMany('user', {'first': 2})
+        second = self.client.findMany('user', {'first': 2})
+        self.client.findMany('user', {'first': 1})
+
+        self.assertEqual(2, self.requests())
+        self.assertEqual(
+            [user.firstName for user in first.data],
+            [user.firstName for user in second.data])
+
+    def test_mutations_invalidate_cached_results(self):
+        mutations = [
+            lambda: self.client.create(
+                'user',
+                {'data': {'firstName': 'Jane'}}),
+            lambda: self.client.update(
+                'user',
+                1,
+                {'data': {'firstName': 'Jane'}}),
+            lambda: self.client.delete('user', 1)]
+
+        self.client.findMany('user')
+        for mutation in mutations:
+            mutation()
+            self.client.findMany('user')
+
+        self.assertEqual(7, self.requests())
+
+    def test_invalidate_results(self):
+        self.client.findMany('user')
+        self.client.invalidate_results('company')
+        self.client.findMany('user')
+        self.assertEqual(1, self.requests())
+
+        self.client.invalidate_results('user')
+        self.client.findMany('user')
+        self.client.invalidate_results()
+        self.client.findMany('user')
+        self.assertEqual(3, self.requests())
+
+    def test_results_survive_changes_to_other_data_types(self):
+        self.client.findMany('user', {'first': 2})
+
+        # Another data type is added, and the schema is refreshed when the
+        # next query fails to validate.
+        self.account_client.session.data_types = DATA_TYPES + [COMPANY]
+        self.project_client.session.errors.append(VALIDATION_FAILURE)
+        self.client.findMany('user', {'first': 1})
+        self.assertEqual(3, self.requests())
+
+        self.client.findMany('user', {'first': 2})
+        self.assertEqual(3, self.requests())
+
+
+@patch('noloco.client.TransportBuilder', FakeTransportBuilder)
+class TestAsyncNoloco(TestCase):
+    def test_client_connects_on_first_call(self):
+        async def find_users():
+            client = AsyncNoloco('account key', 'portal')
+            account_client = FakeTransportBuilder.last.clients[0]
+            self.assertEqual([], account_client.session.requests)
+
+            try:
+                return await client.findMany('user', {'first': 2})
+            finally:
+                await client.close()
+
+        users = asyncio.run(find_users())
+
+        account_client, project_client = FakeTransportBuilder.last.clients
+        self.assertEqual(2, len(account_client.session.requests))
+        self.assertEqual('project key', project_client.session.api_key)
+        self.assertTrue(account_client.closed)
+        self.assertTrue(project_client.closed)
+        self.assertEqual(['User 1', 'User 2'], [
+            user.firstName
+            for user
+            in users.data])
+
+    def test_calls_share_one_project_session(self):
+        async def find_users():
+            async with AsyncNoloco('account key', 'portal') as client:
+                return await asyncio.gather(*[
+                    client.findMany('user', {'first': 1})
+                    for _
+                    in range(4)])
+
+        results = asyncio.run(find_users())
+
+        account_client, project_client = FakeTransportBuilder.last.clients
+        self.assertEqual(4, len(results))
+        self.assertEqual(4, len(project_client.session.requests))
+        self.assertEqual(1, project_client.connections)
+
+    def test_pages_are_awaited(self):
+        async def page_through_users():
+            async with AsyncNoloco('account key', 'portal') as client:
+                page = await client.findMany('user', {'first': 2})
+                next_page = await page.next_page()
+                last_page = await next_page.next_page()
+
+                return page, next_page, last_page
+
+        page, next_page, last_page = asyncio.run(page_through_users())
+
+        self.assertEqual(['User 3'], [
+            user.firstName
+            for user
+            in next_page.data])
+        self.assertFalse(next_page.has_next_page)
+        self.assertIsNone(last_page)
+        self.assertEqual(
+            {'userCollection_after': '1', 'userCollection_first': 2},
+            FakeTransportBuilder.last.clients[1].session.requests[1][1])
+
+    def test_connection_is_retried_after_a_failure(self):
+        async def connect_twice():
+            client = AsyncNoloco('account key', 'portal')
+            account_client = FakeTransportBuilder.last.clients[0]
+            account_client.session.errors.append(ConnectionError())
+
+            with self.assertRaises(NolocoUnknownError):
+                await client.connect()
+
+            try:
+                await client.connect()
+                return account_client
+            finally:
+                await client.close()
+
+        account_client = asyncio.run(connect_twice())
+
+        self.assertEqual(1, account_client.connections)
+        self.assertEqual(3, len(account_client.session.requests))
@@ -0,0 +1,118 @@
+import numpy
+from noloco.columns import (
+    build_columns,
+    ColumnarResult)
+from noloco.exceptions import NolocoMissingDependencyError
+from noloco.schema import Schema
+from unittest import TestCase
+from unittest.mock import patch
+
+
+DATA_TYPES = Schema([{
+    'name': 'order',
+    'fields': [
+        {'name': 'id', 'type': 'INTEGER', 'relationship': None},
+        {'name': 'quantity', 'type': 'INTEGER', 'relationship': None},
+        {'name': 'total', 'type': 'DECIMAL', 'relationship': None},
+        {'name': 'paid', 'type': 'BOOLEAN', 'relationship': None},
+        {'name': 'placedAt', 'type': 'DATE', 'relationship': None},
+        {'name': 'status', 'type': 'SINGLE_OPTION', 'relationship': None},
+        {
+            'name': 'customer',
+            'type': 'user',
+            'relationship': 'MANY_TO_ONE',
+            'reverseName': 'orders'
+        }
+    ]
+}])
+
+
+class TestBuildColumns(TestCase):
+    def test_build_columns(self):
+        columns = build_columns(DATA_TYPES[0], [
+            {
+                'id': 1,
+                'quantity': 2,
+                'total': 10.5,
+                'paid': True,
+                'placedAt': '2023-01-02T03:04:05.678Z',
+                'status': 'OPEN',
+                'customer': {'id': 7}
+            },
+            {
+                'id': 2,
+                'quantity': None,
+                'total': None,
+                'paid': False,
+                'placedAt': None,
+                'status': None,
+                'customer': None
+            }
+        ])
+
+        self.assertEqual(
+            ['id', 'quantity', 'total', 'paid', 'placedAt', 'status',
+             'customer'],
+            list(columns.keys()))
+        self.assertEqual(numpy.int64, columns['id'].dtype)
+        self.assertEqual([1, 2], columns['id'].tolist())
+        self.assertEqual(numpy.float64, columns['quantity'].dtype)
+        self.assertEqual(2, columns['quantity'][0])
+        self.assertTrue(numpy.isnan(columns['quantity'][1]))
+        self.assertTrue(numpy.isnan(columns['total'][1]))
+        self.assertEqual(numpy.bool_, columns['paid'].dtype)
+        self.assertEqual(
+            numpy.datetime64('2023-01-02T03:04:05.678'),
+            columns['placedAt'][0])
+        self.assertTrue(numpy.isnat(columns['placedAt'][1]))
+        self.assertEqual(object, columns['status'].dtype)
+        self.assertEqual({'id': 7}, columns['customer'][0])
+
+    def test_build_columns_without_records(self):
+        columns = build_columns(DATA_TYPES[0], [])
+
+        self.assertEqual(
+            ['id', 'quantity', 'total', 'paid', 'placedAt', 'status'],
+            list(columns.keys()))
+        self.assertEqual(0, len(columns['id']))
+
+    def test_build_columns_without_numpy(self):
+        with patch.dict('sys.modules', {'numpy': None}):
+            with self.assertRaises(NolocoMissingDependencyError):
+                build_columns(DATA_TYPES[0], [])
+
+
+class TestColumnarResult(TestCase):
+    def test_next_page(self):
+        raw_result = {
+            'orderCollection': {
+                'totalCount': 2,
+                'edges': [{'node': {'id': 1}}],
+                'pageInfo': {
+                    'hasPreviousPage': True,
+                    'hasNextPage': True,
+                    'startCursor': 'aaaaaaaaaaa=',
+                    'endCursor': 'bbbbbbbbbbb='
+                }
+            }
+        }
+
+        def callback(data_type_name, paged_options):
+            self.assertEqual('order', data_type_name)
+            self.assertEqual(
+                {'after': 'bbbbbbbbbbb=', 'first': 1},
+                paged_options)
+
+            return 'next page'
+
+        result = ColumnarResult.build(
+            DATA_TYPES[0],
+            'orderCollection',
+            raw_result,
+            {'before': 'zzzzzzzzzzz=', 'first': 1},
+            callback)
+
+        self.assertEqual(2, result.total_count)
+        self.assertEqual(1, len(result))
+        self.assertEqual([1], result['id'].tolist())
+        self.assertEqual('next page', result.next_page())
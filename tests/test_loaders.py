@@ -0,0 +1,132 @@
+import asyncio
+from noloco.loaders import (
+    AsyncLoader,
+    Loader)
+from unittest import TestCase
+
+
+class FakeOperation:
+    def __init__(self, options):
+        self.error = None
+        self.options = options
+
+    def result(self):
+        return self.options['where']['id']['equals']
+
+
+class FakeBatch:
+    def __init__(self, batches, error=None):
+        self.batches = batches
+        self.error = error
+        self.operations = []
+
+    def findUnique(self, data_type_name, options):
+        operation = FakeOperation(options)
+        self.operations.append(operation)
+        return operation
+
+    def execute(self):
+        self.batches.append(
+            [operation.result() for operation in self.operations])
+
+        if self.error is not None:
+            raise self.error
+
+    async def execute_async(self):
+        self.execute()
+
+
+def lookup(id):
+    return {'where': {'id': {'equals': id}}}
+
+
+class TestLoader(TestCase):
+    def test_lookups_in_a_window_are_sent_together(self):
+        batches = []
+        loader = Loader(lambda: FakeBatch(batches), 0.01, 10)
+
+        first = loader.load('company', lookup(1))
+        second = loader.load('company', lookup(2))
+        duplicate = loader.load('company', lookup(1))
+
+        self.assertEqual([1, 2, 1], [
+            first.result(),
+            second.result(),
+            duplicate.result()])
+        self.assertEqual([[1, 2]], batches)
+
+        # Records that have been loaded are cached until the loader is
+        # cleared.
+        self.assertEqual(1, loader.findUnique('company', lookup(1)))
+        self.assertEqual([[1, 2]], batches)
+
+        loader.clear()
+        self.assertEqual(1, loader.findUnique('company', lookup(1)))
+        self.assertEqual([[1, 2], [1]], batches)
+
+    def test_full_batches_are_sent_straight_away(self):
+        batches = []
+        loader = Loader(lambda: FakeBatch(batches), 60, 2)
+
+        first = loader.load('company', lookup(1))
+        second = loader.load('company', lookup(2))
+
+        self.assertTrue(first.done())
+        self.assertTrue(second.done())
+        self.assertEqual([[1, 2]], batches)
+
+    def test_failed_lookups_are_not_cached(self):
+        batches = []
+        error = Exception('Server unavailable')
+        loader = Loader(lambda: FakeBatch(batches, error), 0.001, 10)
+
+        with self.assertRaises(Exception):
+            loader.findUnique('company', lookup(1))
+
+        with self.assertRaises(Exception):
+            loader.findUnique('company', lookup(1))
+
+        self.assertEqual([[1], [1]], batches)
+
+
+class TestAsyncLoader(TestCase):
+    def test_lookups_in_a_tick_are_sent_together(self):
+        batches = []
+
+        async def load_companies():
+            async with AsyncLoader(lambda: FakeBatch(batches), 10) as loader:
+                return await asyncio.gather(
+                    loader.findUnique('company', lookup(1)),
+                    loader.findUnique('company', lookup(2)),
+                    loader.findUnique('company', lookup(1)))
+
+        self.assertEqual([1, 2, 1], asyncio.run(load_companies()))
+        self.assertEqual([[1, 2]], batches)
+
+    def test_cancelled_lookups_do_not_fail_other_tasks(self):
+        batches = []
+
+        async def load_companies():
+            async with AsyncLoader(lambda: FakeBatch(batches), 10) as loader:
+                cancelled = asyncio.ensure_future(
+                    loader.findUnique('company', lookup(1)))
+                waiting = asyncio.ensure_future(
+                    loader.findUnique('company', lookup(1)))
+                await asyncio.sleep(0)
+                cancelled.cancel()
+
+                return await waiting, cancelled.cancelled()
+
+        self.assertEqual((1, True), asyncio.run(load_companies()))
+        self.assertEqual([[1]], batches)
+
+    def test_cancelled_lookups_are_not_cached(self):
+        batches = []
+
+        async def load_company():
+            async with AsyncLoader(lambda: FakeBatch(batches), 10) as loader:
+                loader.load('company', lookup(1)).cancel()
+
+                return await loader.findUnique('company', lookup(1))
+
+        self.assertEqual(1, asyncio.run(load_company()))
@@ -250,6 +250,7 @@ class TestBuildDataTypeMutationArgs(TestCase):
 
     def test_optional_reverse_relationship_field(self):
         data_type = {
+            'name': 'data_type_1',
             'type': 'data_type_1',
             'fields': []
         }
@@ -273,6 +274,7 @@ class TestBuildDataTypeMutationArgs(TestCase):
 
     def test_reverse_one_to_one_relationship_field(self):
         data_type = {
+            'name': 'data_type_1',
             'type': 'data_type_1',
             'fields': []
         }
@@ -297,6 +299,7 @@ class TestBuildDataTypeMutationArgs(TestCase):
 
     def test_reverse_one_to_many_relationship_field(self):
         data_type = {
+            'name': 'data_type_1',
             'type': 'data_type_1',
             'fields': []
         }
@@ -321,6 +324,7 @@ class TestBuildDataTypeMutationArgs(TestCase):
 
     def test_reverse_many_to_many_relationship_field(self):
         data_type = {
+            'name': 'data_type_1',
             'type': 'data_type_1',
             'fields': []
         }
@@ -345,6 +349,7 @@ class TestBuildDataTypeMutationArgs(TestCase):
 
     def test_required_reverse_relationship_field(self):
         data_type = {
+            'name': 'data_type_1',
             'type': 'data_type_1',
             'fields': []
         }
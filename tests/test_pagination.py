@@ -0,0 +1,351 @@
+import asyncio
+from noloco.pagination import (
+    export_records,
+    export_records_async,
+    iterate_records,
+    iterate_records_async,
+    merge_pages_async,
+    page_options,
+    partition_options,
+    prefetch,
+    split_range)
+import threading
+from unittest import TestCase
+
+
+class FakePage:
+    def __init__(self, data, end_cursor, has_next_page, total_count=None):
+        self.data = data
+        self.end_cursor = end_cursor
+        self.has_next_page = has_next_page
+        self.total_count = total_count
+
+
+def matches(value, condition):
+    for operator, operand in condition.items():
+        if operator == 'not':
+            if value == operand:
+                return False
+        elif value is None:
+            return False
+        elif operator == 'gt' and not value > operand:
+            return False
+        elif operator == 'gte' and not value >= operand:
+            return False
+        elif operator == 'lt' and not value < operand:
+            return False
+        elif operator == 'lte' and not value <= operand:
+            return False
+
+    return True
+
+
+class FakeCollection:
+    def __init__(self, records):
+        self.records = records
+        self.requests = []
+
+    def find_many(self, data_type_name, options):
+        self.requests.append(options)
+        condition = (options.get('where') or {}).get('id') or {}
+        records = [
+            record
+            for record
+            in self.records
+            if matches(record['id'], condition)]
+
+        # Like Postgres, empty values sort last when sorting ascending and
+        # first when sorting descending.
+        if 'order_by' in options:
+            empty = [record for record in records if record['id'] is None]
+            records = sorted(
+                [record for record in records if record['id'] is not None],
+                key=lambda record: record['id'])
+
+            if options['order_by']['direction'] == 'DESC':
+                records = empty + records[::-1]
+            else:
+                records = records + empty
+
+        start = int(options.get('after', -1)) + 1
+        page = records[start:start + options['first']]
+
+        return FakePage(
+            page,
+            str(start + len(page) - 1),
+            start + len(page) < len(records),
+            len(records))
+
+    async def find_many_async(self, data_type_name, options):
+        return self.find_many(data_type_name, options)
+
+
+class TestPageOptions(TestCase):
+    def test_page_options_replaces_paging_options(self):
+        options = {'before': 'a', 'first': 5, 'where': {'id': {'gt': 1}}}
+
+        paged_options = page_options(options, 10, 'b')
+
+        self.assertEqual(
+            {'after': 'b', 'first': 10, 'where': {'id': {'gt': 1}}},
+            paged_options)
+        self.assertEqual(
+            {'before': 'a', 'first': 5, 'where': {'id': {'gt': 1}}},
+            options)
+
+
+class TestIterateRecords(TestCase):
+    def test_iterate_records_follows_end_cursor(self):
+        pages = {
+            None: FakePage([1, 2], 'a', True),
+            'a': FakePage([3, 4], 'b', True),
+            'b': FakePage([5], 'c', False)
+        }
+        requests = []
+
+        def find_many(data_type_name, options):
+            requests.append((data_type_name, options))
+            return pages[options.get('after')]
+
+        records = iterate_records(find_many, 'user', {}, 2)
+
+        self.assertEqual([], requests)
+        self.assertEqual([1, 2, 3, 4, 5], list(records))
+        self.assertEqual([
+            ('user', {'first': 2}),
+            ('user', {'after': 'a', 'first': 2}),
+            ('user', {'after': 'b', 'first': 2})
+        ], requests)
+
+    def test_iterate_records_async_follows_end_cursor(self):
+        pages = {
+            None: FakePage([1, 2], 'a', True),
+            'a': FakePage([3], 'b', False)
+        }
+        requests = []
+
+        async def find_many(data_type_name, options):
+            requests.append(options)
+            return pages[options.get('after')]
+
+        async def iterate(prefetch_pages):
+            return [
+                record
+                async for record
+                in iterate_records_async(
+                    find_many,
+                    'user',
+                    {},
+                    2,
+                    prefetch_pages)]
+
+        self.assertEqual([1, 2, 3], asyncio.run(iterate(0)))
+        self.assertEqual([1, 2, 3], asyncio.run(iterate(1)))
+        self.assertEqual(
+            [{'first': 2}, {'after': 'a', 'first': 2}],
+            requests[:2])
+
+
+class TestPrefetch(TestCase):
+    def test_prefetch_yields_pages_in_order(self):
+        self.assertEqual([1, 2, 3, 4], list(prefetch(iter([1, 2, 3, 4]), 2)))
+
+    def test_prefetch_raises_fetch_errors(self):
+        def pages():
+            yield 1
+            raise ValueError('Could not fetch page')
+
+        prefetched_pages = prefetch(pages(), 2)
+
+        self.assertEqual(1, next(prefetched_pages))
+        with self.assertRaises(ValueError):
+            next(prefetched_pages)
+
+    def test_closing_early_stops_the_fetcher(self):
+        fetched = threading.Event()
+
+        def pages():
+            yield 1
+            yield 2
+            fetched.set()
+
+        threads = set(threading.enumerate())
+        prefetched_pages = prefetch(pages(), 1)
+
+        self.assertEqual(1, next(prefetched_pages))
+        fetchers = set(threading.enumerate()) - threads
+
+        # Once the last page fills the queue the fetcher is left with the end
+        # of the pages to put, until it sees the consumer has stopped.
+        fetched.wait(1)
+        prefetched_pages.close()
+
+        for fetcher in fetchers:
+            fetcher.join(1)
+            self.assertFalse(fetcher.is_alive())
+
+    def test_iterate_records_with_prefetched_pages(self):
+        pages = {
+            None: FakePage([1, 2], 'a', True),
+            'a': FakePage([3], 'b', False)
+        }
+
+        records = iterate_records(
+            lambda _, options: pages[options.get('after')],
+            'user',
+            {},
+            2,
+            prefetch_pages=1)
+
+        self.assertEqual([1, 2, 3], list(records))
+
+
+class TestMergePagesAsync(TestCase):
+    def test_merge_pages_async_yields_every_page(self):
+        async def pages(first, last):
+            for page in range(first, last):
+                await asyncio.sleep(0)
+                yield page
+
+        async def merge():
+            return [
+                page
+                async for page
+                in merge_pages_async([pages(0, 3), pages(3, 5)], 1)]
+
+        self.assertEqual([0, 1, 2, 3, 4], sorted(asyncio.run(merge())))
+
+    def test_merge_pages_async_raises_fetch_errors(self):
+        async def pages():
+            yield 1
+            raise ValueError('Could not fetch page')
+
+        async def merge():
+            merged_pages = merge_pages_async([pages()], 2)
+            self.assertEqual(1, await merged_pages.__anext__())
+
+            with self.assertRaises(ValueError):
+                await merged_pages.__anext__()
+
+        asyncio.run(merge())
+
+    def test_closing_early_cancels_the_fetchers(self):
+        fetched = []
+
+        async def pages():
+            for page in range(10):
+                fetched.append(page)
+                yield page
+
+        async def merge():
+            merged_pages = merge_pages_async([pages()], 1)
+            self.assertEqual(0, await merged_pages.__anext__())
+            await merged_pages.aclose()
+            await asyncio.sleep(0.01)
+
+        asyncio.run(merge())
+
+        self.assertLess(len(fetched), 4)
+
+
+class TestSplitRange(TestCase):
+    def test_split_range_integers(self):
+        self.assertEqual([
+            {'gte': 1, 'lte': 25},
+            {'gt': 25, 'lte': 50},
+            {'gt': 50, 'lte': 75},
+            {'gt': 75, 'lte': 100}
+        ], split_range(1, 100, 4))
+
+    def test_split_range_narrow_integers(self):
+        self.assertEqual([
+            {'gte': 1, 'lte': 1},
+            {'gt': 1, 'lte': 2}
+        ], split_range(1, 2, 8))
+
+    def test_split_range_dates(self):
+        self.assertEqual([
+            {'gte': '2022-01-01T00:00:00.000Z',
+             'lte': '2022-01-01T12:00:00.000Z'},
+            {'gt': '2022-01-01T12:00:00.000Z',
+             'lte': '2022-01-02T00:00:00.000Z'}
+        ], split_range(
+            '2022-01-01T00:00:00.000Z',
+            '2022-01-02T00:00:00.000Z',
+            2))
+
+
+class TestExportRecords(TestCase):
+    def setUp(self):
+        self.collection = FakeCollection(
+            [{'id': None}] + [{'id': id} for id in range(1, 11)])
+
+    def test_export_records_pages_through_every_slice(self):
+        records = export_records(
+            self.collection.find_many,
+            'order',
+            {},
+            'id',
+            4,
+            2)
+
+        self.assertEqual(
+            list(range(1, 11)),
+            sorted(record['id'] for record in records))
+
+        # Records without a value are left out of the bounds as well as the
+        # export.
+        self.assertEqual(
+            {'not': None},
+            self.collection.requests[1]['where']['id'])
+        self.assertEqual(
+            {'not': None, 'gte': 1, 'lte': 3},
+            self.collection.requests[2]['where']['id'])
+
+    def test_export_records_reads_small_collections_sequentially(self):
+        records = export_records(
+            self.collection.find_many,
+            'order',
+            {},
+            'id',
+            4,
+            100)
+
+        self.assertEqual(
+            list(range(1, 11)),
+            [record['id'] for record in records])
+        self.assertEqual(2, len(self.collection.requests))
+
+    def test_export_records_async(self):
+        async def export():
+            return [
+                record['id']
+                async for record
+                in export_records_async(
+                    self.collection.find_many_async,
+                    'order',
+                    {'where': {'id': {'gt': 2}}},
+                    'id',
+                    4,
+                    2)]
+
+        self.assertEqual(list(range(3, 11)), sorted(asyncio.run(export())))
+
+
+class TestPartitionOptions(TestCase):
+    def test_partition_options_replaces_range_on_partition_field(self):
+        options = {
+            'first': 5,
+            'where': {
+                'id': {'gt': 3, 'not': 7},
+                'name': {'equals': 'Jane'}
+            }
+        }
+
+        self.assertEqual({
+            'first': 5,
+            'where': {
+                'id': {'not': 7, 'gte': 4, 'lte': 10},
+                'name': {'equals': 'Jane'}
+            }
+        }, partition_options(options, 'id', {'gte': 4, 'lte': 10}))
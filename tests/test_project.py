@@ -0,0 +1,340 @@
+import asyncio
+from noloco.project import (
+    AsyncProject,
+    Project)
+from threading import (
+    Event,
+    Thread)
+from unittest import TestCase
+
+
+DATA_TYPES = [
+    {'name': 'company', 'fields': []},
+    {'name': 'user', 'fields': []}
+]
+
+
+class FakeAccountSession:
+    def __init__(self, project_api_key='project key', started=None):
+        self.data_types = DATA_TYPES
+        self.project_api_key = project_api_key
+        self.requests = []
+        self.started = started
+
+    def execute(self, document, variable_values):
+        if self.started is not None:
+            self.started.wait()
+
+        self.requests.append(variable_values)
+
+        if 'projectId' in variable_values:
+            return {
+                'project': {
+                    'apiKeys': {'project': self.project_api_key},
+                    'dataTypes': self.data_types
+                }
+            }
+        else:
+            return {'validateApiKeys': {}}
+
+
+class FakeClient:
+    def __init__(self, session):
+        self.closed = False
+        self.session = session
+
+    def connect_sync(self):
+        return self.session
+
+    def close_sync(self):
+        self.closed = True
+
+
+class FakeTransportBuilder:
+    def __init__(self):
+        self.clients = []
+
+    def build_client(self, url, api_key):
+        client = FakeClient((url, api_key))
+        self.clients.append(client)
+        return client
+
+
+class FakeAsyncAccountSession(FakeAccountSession):
+    async def execute(self, document, variable_values):
+        # Yield to the event loop, as a request would, before answering.
+        await asyncio.sleep(0)
+        return super().execute(document, variable_values)
+
+
+class FakeAsyncClient(FakeClient):
+    async def connect_async(self):
+        return self.connect_sync()
+
+    async def close_async(self):
+        self.close_sync()
+
+
+class FakeAsyncTransportBuilder:
+    def __init__(self):
+        self.clients = []
+
+    def build_async_client(self, url, api_key):
+        client = FakeAsyncClient((url, api_key))
+        self.clients.append(client)
+        return client
+
+
+class TestProject(TestCase):
+    def test_project_connects_on_construction(self):
+        session = FakeAccountSession()
+        transport_builder = FakeTransportBuilder()
+
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            transport_builder,
+            16)
+
+        self.assertEqual(2, len(session.requests))
+        self.assertEqual(DATA_TYPES, project.data_types)
+        self.assertEqual(
+            ('http://localhost/data/portal', 'project key'),
+            project.client)
+
+    def test_lazy_project_connects_on_first_use(self):
+        session = FakeAccountSession()
+
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            FakeTransportBuilder(),
+            16,
+            lazy=True)
+
+        self.assertEqual([], session.requests)
+        self.assertIsNone(project.client)
+
+        project.connect()
+        project.connect()
+
+        self.assertEqual(2, len(session.requests))
+        self.assertIsNotNone(project.client)
+
+    def test_lazy_project_preloads_in_background(self):
+        started = Event()
+        session = FakeAccountSession(started=started)
+
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            FakeTransportBuilder(),
+            16,
+            lazy=True,
+            preload=True)
+
+        # Construction returns before the project document is fetched, and a
+        # command waits for the background fetch rather than repeating it.
+        self.assertIsNone(project.client)
+        started.set()
+        project.connect()
+
+        self.assertEqual(2, len(session.requests))
+        self.assertEqual(DATA_TYPES, project.data_types)
+
+    def test_refresh_skips_validating_an_unchanged_key(self):
+        session = FakeAccountSession()
+        transport_builder = FakeTransportBuilder()
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            transport_builder,
+            16)
+        client = project.client
+
+        project.refresh()
+
+        self.assertEqual(3, len(session.requests))
+        self.assertIn('projectId', session.requests[2])
+        self.assertIs(client, project.client)
+        self.assertEqual(1, len(transport_builder.clients))
+
+    def test_refresh_validates_a_changed_key(self):
+        session = FakeAccountSession()
+        transport_builder = FakeTransportBuilder()
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            transport_builder,
+            16)
+
+        session.project_api_key = 'new project key'
+        project.refresh()
+
+        self.assertEqual(
+            {'projectToken': 'new project key'},
+            session.requests[3])
+        self.assertEqual(
+            ('http://localhost/data/portal', 'new project key'),
+            project.client)
+        self.assertTrue(transport_builder.clients[0].closed)
+
+    def test_refresh_validates_an_expected_key_alongside_the_document(self):
+        session = FakeAccountSession()
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            FakeTransportBuilder(),
+            16,
+            lazy=True)
+
+        project.refresh('project key')
+
+        self.assertEqual(2, len(session.requests))
+        self.assertIn({'projectToken': 'project key'}, session.requests)
+
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            FakeTransportBuilder(),
+            16,
+            lazy=True)
+        session.requests.clear()
+
+        project.refresh('old project key')
+
+        # The expected key was wrong so the fetched key is validated as well.
+        self.assertEqual(3, len(session.requests))
+        self.assertEqual({'projectToken': 'project key'}, session.requests[2])
+
+    def test_refresh_only_invalidates_changed_data_types(self):
+        session = FakeAccountSession()
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            FakeTransportBuilder(),
+            16)
+        project.documents.set('company document', 1, {'company'})
+        project.documents.set('user document', 2, {'user'})
+        company = project.data_types.by_name['company']
+
+        session.data_types = [
+            {'name': 'company', 'fields': []},
+            {'name': 'user', 'fields': [
+                {'name': 'email', 'type': 'TEXT', 'relationship': None}
+            ]}
+        ]
+        project.refresh()
+
+        self.assertEqual(1, project.documents.get('company document'))
+        self.assertIsNone(project.documents.get('user document'))
+        self.assertIs(company, project.data_types.by_name['company'])
+
+    def test_concurrent_refreshes_share_a_single_fetch(self):
+        started = Event()
+        started.set()
+        session = FakeAccountSession(started=started)
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            FakeTransportBuilder(),
+            16)
+        generation = project.generation
+        session.requests.clear()
+
+        # Every caller failed against the same schema, so once the first has
+        # refreshed it the rest find it already replaced.
+        started.clear()
+        threads = [
+            Thread(target=project.refresh, kwargs={'generation': generation})
+            for _
+            in range(8)]
+        for thread in threads:
+            thread.start()
+        started.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, len(session.requests))
+        self.assertEqual(generation + 1, project.generation)
+
+    def test_documents_from_a_replaced_schema_are_not_cached(self):
+        session = FakeAccountSession()
+        project = Project(
+            FakeClient(session),
+            'http://localhost',
+            'portal',
+            FakeTransportBuilder(),
+            16)
+        generation = project.generation
+
+        project.refresh()
+        project.cache_document('stale', 1, {'user'}, generation)
+        project.cache_document('current', 2, {'user'}, project.generation)
+
+        self.assertIsNone(project.documents.get('stale'))
+        self.assertEqual(2, project.documents.get('current'))
+
+
+class TestAsyncProject(TestCase):
+    def test_project_connects_once(self):
+        session = FakeAsyncAccountSession()
+        account_client = FakeAsyncClient(session)
+        project = AsyncProject(
+            account_client,
+            'http://localhost',
+            'portal',
+            FakeAsyncTransportBuilder(),
+            16)
+
+        async def connect_and_close():
+            self.assertIsNone(project.client)
+
+            await asyncio.gather(project.connect(), project.connect())
+            client = project.client
+
+            await project.close()
+            return client
+
+        client = asyncio.run(connect_and_close())
+
+        self.assertEqual(2, len(session.requests))
+        self.assertEqual(
+            ('http://localhost/data/portal', 'project key'),
+            client)
+        self.assertTrue(account_client.closed)
+        self.assertIsNone(project.client)
+
+    def test_concurrent_refreshes_share_a_single_fetch(self):
+        session = FakeAsyncAccountSession()
+        project = AsyncProject(
+            FakeAsyncClient(session),
+            'http://localhost',
+            'portal',
+            FakeAsyncTransportBuilder(),
+            16)
+
+        async def refresh():
+            await project.connect()
+            generation = project.generation
+            session.requests.clear()
+
+            await asyncio.gather(*[
+                project.refresh(generation=generation)
+                for _
+                in range(8)])
+            return generation
+
+        generation = asyncio.run(refresh())
+
+        self.assertEqual(1, len(session.requests))
+        self.assertEqual(generation + 1, project.generation)
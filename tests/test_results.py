@@ -1,4 +1,11 @@
-from noloco.results import Result
+from noloco.constants import (
+    COMPACT,
+    LAZY)
+from noloco.results import (
+    CollectionResult,
+    LazyResult,
+    Record,
+    Result)
 from unittest import TestCase
 
 
@@ -871,3 +878,245 @@ class TestPagingCollectionResult(TestCase):
         self.assertEqual(1, prev_page_result.data[0].id)
         self.assertEqual('xxxxxxxxxxxxxxxxxxxx', prev_page_result.data[0].uuid)
         self.assertEqual('My Value A', prev_page_result.data[0].myField)
+
+    def test_paging_leaves_options_unchanged(self):
+        options = {
+            'after': 'aaaaaaaaaaa=',
+            'first': 1,
+            'include': {
+                'myNestedDataTypeCollection': {'first': 1}
+            }
+        }
+        raw_result = {
+            'myDataTypeCollection': {
+                'totalCount': 3,
+                'edges': [
+                    {
+                        'node': {
+                            'id': 2,
+                            'myNestedDataTypeCollection': {
+                                'totalCount': 2,
+                                'edges': [{'node': {'id': 4}}],
+                                'pageInfo': {
+                                    'hasPreviousPage': False,
+                                    'hasNextPage': True,
+                                    'startCursor': 'ddddddddddd=',
+                                    'endCursor': 'eeeeeeeeeee='
+                                }
+                            }
+                        }
+                    }
+                ],
+                'pageInfo': {
+                    'hasPreviousPage': True,
+                    'hasNextPage': True,
+                    'startCursor': 'bbbbbbbbbbb=',
+                    'endCursor': 'ccccccccccc='
+                }
+            }
+        }
+        paged_options = []
+
+        def callback(data_type_name, options):
+            paged_options.append(options)
+            return {}
+
+        result = Result.build(
+            'myDataType',
+            'myDataTypeCollection',
+            raw_result,
+            options,
+            callback)
+
+        result.previous_page()
+        result.next_page()
+        result.data[0].myNestedDataTypeCollection.next_page()
+
+        # Every page is requested with its own copy of the options, and the
+        # options the result was built from are left as they were.
+        self.assertEqual({
+            'after': 'aaaaaaaaaaa=',
+            'first': 1,
+            'include': {
+                'myNestedDataTypeCollection': {'first': 1}
+            }
+        }, options)
+        self.assertEqual('bbbbbbbbbbb=', paged_options[0]['before'])
+        self.assertNotIn('after', paged_options[0])
+        self.assertEqual('ccccccccccc=', paged_options[1]['after'])
+        self.assertEqual(
+            {'first': 1, 'after': 'eeeeeeeeeee='},
+            paged_options[2]['include']['myNestedDataTypeCollection'])
+
+
+class TestLazyResult(TestCase):
+    def build_raw_result(self):
+        return {
+            'myDataTypeCollection': {
+                'totalCount': 2,
+                'edges': [
+                    {
+                        'node': {
+                            'id': 1,
+                            'myRelationship': {
+                                'id': 3,
+                                'myOtherField': 'My Other Value'
+                            }
+                        }
+                    },
+                    {
+                        'node': {
+                            'id': 2,
+                            'myRelationship': None
+                        }
+                    }
+                ],
+                'pageInfo': {
+                    'hasPreviousPage': False,
+                    'hasNextPage': True,
+                    'startCursor': 'aaaaaaaaaaa=',
+                    'endCursor': 'bbbbbbbbbbb='
+                },
+                '__typename': 'MyDataTypeConnection'
+            }
+        }
+
+    def test_lazy_result_wraps_nested_results_on_access(self):
+        raw_result = self.build_raw_result()
+
+        result = Result.build(
+            'myDataType',
+            'myDataTypeCollection',
+            raw_result,
+            {'first': 1, 'include': {'myRelationship': True}},
+            lambda _: None,
+            LAZY)
+
+        # Nothing below the collection has been wrapped yet.
+        edges = raw_result['myDataTypeCollection']['edges']
+        self.assertIsInstance(result, CollectionResult)
+        self.assertEqual(2, len(result.data))
+        self.assertIs(dict, type(edges[0]['node']['myRelationship']))
+
+        record = result.data[0]
+        self.assertIsInstance(record, LazyResult)
+        self.assertIs(record, result.data[0])
+        self.assertIs(record, result.data[-2])
+        self.assertEqual(1, record.id)
+        self.assertEqual('My Other Value', record.myRelationship.myOtherField)
+        self.assertIsInstance(record['myRelationship'], LazyResult)
+        self.assertIs(record.myRelationship, record.get('myRelationship'))
+        self.assertIsNone(result.data[1].myRelationship)
+        self.assertEqual([1, 2], [record.id for record in result.data])
+
+    def test_lazy_result_wraps_everything_when_iterating_values(self):
+        result = Result.build(
+            'myDataType',
+            'myDataTypeCollection',
+            self.build_raw_result(),
+            {'first': 1, 'include': {'myRelationship': True}},
+            lambda _: None,
+            LAZY)
+
+        record = result.data[0]
+        self.assertEqual(
+            [int, LazyResult],
+            [type(value) for value in record.values()])
+        self.assertEqual(
+            ['id', 'myRelationship'],
+            [key for key, _ in record.items()])
+
+    def test_lazy_result_next_page(self):
+        def callback(data_type_name, paged_options):
+            self.assertEqual('myDataType', data_type_name)
+            self.assertEqual({
+                'after': 'bbbbbbbbbbb=',
+                'first': 1,
+                'include': {'myRelationship': True}
+            }, paged_options)
+
+            return 'next page'
+
+        result = Result.build(
+            'myDataType',
+            'myDataTypeCollection',
+            self.build_raw_result(),
+            {'first': 1, 'include': {'myRelationship': True}},
+            callback,
+            LAZY)
+
+        self.assertEqual('next page', result.next_page())
+
+
+class TestCompactRecord(TestCase):
+    def test_compact_records_share_a_layout(self):
+        raw_result = {
+            'myDataTypeCollection': {
+                'totalCount': 2,
+                'edges': [
+                    {
+                        'node': {
+                            'id': 1,
+                            'myField': 'My Value A',
+                            'myRelationship': {'id': 3}
+                        }
+                    },
+                    {
+                        'node': {
+                            'id': 2,
+                            'myField': 'My Value B',
+                            'myRelationship': None
+                        }
+                    }
+                ],
+                'pageInfo': {
+                    'hasPreviousPage': False,
+                    'hasNextPage': False,
+                    'startCursor': 'aaaaaaaaaaa=',
+                    'endCursor': 'bbbbbbbbbbb='
+                },
+                '__typename': 'MyDataTypeConnection'
+            }
+        }
+
+        result = Result.build(
+            'myDataType',
+            'myDataTypeCollection',
+            raw_result,
+            {'include': {'myRelationship': True}},
+            lambda _: None,
+            COMPACT)
+
+        record_a, record_b = result.data
+        self.assertIsInstance(record_a, Record)
+        self.assertFalse(hasattr(record_a, '__dict__'))
+        self.assertIs(
+            record_a._Record__layout,
+            record_b._Record__layout)
+
+        self.assertEqual(1, record_a.id)
+        self.assertEqual('My Value B', record_b['myField'])
+        self.assertEqual(3, record_a.myRelationship.id)
+        self.assertIsInstance(record_a.myRelationship, Record)
+        self.assertIsNone(record_b.myRelationship)
+        self.assertEqual(
+            ['id', 'myField', 'myRelationship'],
+            list(record_a))
+        self.assertEqual(
+            {'id': 2, 'myField': 'My Value B', 'myRelationship': None},
+            dict(record_b))
+
+    def test_compact_record_missing_field(self):
+        record = Result.build(
+            'myDataType',
+            'myDataType',
+            {'myDataType': {'id': 1}},
+            {},
+            lambda _: None,
+            COMPACT)
+
+        with self.assertRaises(KeyError):
+            record['myField']
+
+        with self.assertRaises(AttributeError):
+            record.myField
@@ -0,0 +1,189 @@
+from noloco.exceptions import NolocoDataTypeNotFoundError
+from noloco.schema import Schema
+from noloco.utils import (
+    data_type_dependencies,
+    find_data_type_by_name,
+    find_field_by_name,
+    find_relationship_data_type,
+    find_reverse_relationship_field)
+from unittest import TestCase
+
+
+DATA_TYPES = [
+    {
+        'name': 'author',
+        'fields': [
+            {'name': 'firstName',
+             'type': 'TEXT',
+             'relationship': None,
+             'reverseName': None}
+        ]
+    },
+    {
+        'name': 'book',
+        'fields': [
+            {'name': 'title',
+             'type': 'TEXT',
+             'relationship': None,
+             'reverseName': None},
+            {'name': 'author',
+             'type': 'author',
+             'relationship': 'MANY_TO_ONE',
+             'reverseName': 'books'}
+        ]
+    },
+    {
+        'name': 'biography',
+        'fields': [
+            {'name': 'subject',
+             'type': 'author',
+             'relationship': 'ONE_TO_ONE',
+             'reverseName': None}
+        ]
+    }
+]
+
+
+class TestSchema(TestCase):
+    def test_schema_is_a_list_of_data_types(self):
+        schema = Schema(DATA_TYPES)
+
+        self.assertEqual(DATA_TYPES, list(schema))
+
+    def test_find_data_type_by_name(self):
+        schema = Schema(DATA_TYPES)
+
+        data_type = find_data_type_by_name('book', schema)
+
+        self.assertIs(schema.by_name['book'], data_type)
+        self.assertEqual('book', data_type['name'])
+
+    def test_find_data_type_by_name_not_found(self):
+        schema = Schema(DATA_TYPES)
+
+        with self.assertRaises(NolocoDataTypeNotFoundError):
+            find_data_type_by_name('review', schema)
+
+    def test_find_field_by_name(self):
+        schema = Schema(DATA_TYPES)
+        fields = find_data_type_by_name('book', schema)['fields']
+
+        self.assertEqual(
+            'author',
+            find_field_by_name('author', fields)['type'])
+        self.assertIsNone(find_field_by_name('pageCount', fields))
+
+    def test_find_reverse_collection_relationship(self):
+        schema = Schema(DATA_TYPES)
+        author_fields = schema.by_name['author']['fields']
+
+        relationship = find_relationship_data_type(
+            'booksCollection',
+            'author',
+            author_fields,
+            schema)
+
+        self.assertEqual(
+            find_relationship_data_type(
+                'booksCollection',
+                'author',
+                DATA_TYPES[0]['fields'],
+                DATA_TYPES),
+            relationship)
+        self.assertEqual('book', relationship['data_type']['name'])
+        self.assertTrue(relationship['is_collection'])
+
+    def test_find_reverse_one_to_one_relationship_by_data_type_name(self):
+        schema = Schema(DATA_TYPES)
+        author_fields = schema.by_name['author']['fields']
+
+        relationship = find_relationship_data_type(
+            'biography',
+            'author',
+            author_fields,
+            schema)
+
+        self.assertEqual('biography', relationship['data_type']['name'])
+        self.assertFalse(relationship['is_collection'])
+
+    def test_find_reverse_relationship_not_found(self):
+        schema = Schema(DATA_TYPES)
+        author_fields = schema.by_name['author']['fields']
+
+        self.assertIsNone(find_relationship_data_type(
+            'books',
+            'author',
+            author_fields,
+            schema))
+
+    def test_find_reverse_relationship_field(self):
+        schema = Schema(DATA_TYPES)
+
+        self.assertEqual(
+            'author',
+            find_reverse_relationship_field('books', 'author', schema)['name'])
+        self.assertIsNone(
+            find_reverse_relationship_field('reviews', 'author', schema))
+
+
+class TestSchemaDiff(TestCase):
+    def test_changed_data_types(self):
+        schema = Schema(DATA_TYPES)
+        changed_data_types = [
+            DATA_TYPES[0],
+            {
+                **DATA_TYPES[1],
+                'fields': DATA_TYPES[1]['fields'] + [
+                    {'name': 'pageCount',
+                     'type': 'INTEGER',
+                     'relationship': None,
+                     'reverseName': None}
+                ]
+            },
+            {'name': 'review', 'fields': []}
+        ]
+
+        new_schema = Schema(changed_data_types, schema)
+
+        self.assertEqual(
+            {'book', 'biography', 'review'},
+            new_schema.changed_data_types(schema))
+        self.assertIs(schema.by_name['author'], new_schema.by_name['author'])
+        self.assertIsNot(schema.by_name['book'], new_schema.by_name['book'])
+        self.assertIsNotNone(find_field_by_name(
+            'pageCount',
+            new_schema.by_name['book']['fields']))
+
+    def test_unchanged_schema(self):
+        schema = Schema(DATA_TYPES)
+
+        self.assertEqual(
+            set(),
+            Schema(DATA_TYPES, schema).changed_data_types(schema))
+
+
+class TestDataTypeDependencies(TestCase):
+    def test_data_type_dependencies(self):
+        schema = Schema(DATA_TYPES)
+
+        self.assertEqual(
+            {'book'},
+            data_type_dependencies(schema.by_name['book'], schema, {}))
+        self.assertEqual(
+            {'author', 'book', 'biography'},
+            data_type_dependencies(
+                schema.by_name['author'],
+                schema,
+                {
+                    'include': {
+                        'booksCollection': True,
+                        'biography': True
+                    }
+                }))
+        self.assertEqual(
+            {'author', 'book'},
+            data_type_dependencies(
+                schema.by_name['book'],
+                schema,
+                {},
+                {'title': 'Emma', 'author': {'connect': {'id': 1}}}))
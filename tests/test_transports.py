@@ -0,0 +1,160 @@
+from aiohttp import (
+    ClientResponse,
+    web)
+from aiohttp.test_utils import TestServer
+import asyncio
+from gql import gql
+from json import loads
+from noloco.transports import (
+    decoding_response_class,
+    PooledAIOHTTPTransport,
+    PooledRequestsHTTPTransport,
+    TransportBuilder)
+from requests import Response
+from unittest import TestCase
+
+
+async def serve_graphql(request):
+    return web.json_response({'data': {'id': 1}})
+
+
+class TestTransportBuilder(TestCase):
+    def test_build_client_uses_pooled_transport(self):
+        client = TransportBuilder(8, 4, False).build_client(
+            'http://localhost',
+            'api key')
+
+        self.assertIsInstance(client.transport, PooledRequestsHTTPTransport)
+        self.assertEqual('http://localhost', client.transport.url)
+        self.assertEqual(
+            {'Authorization': 'api key'},
+            client.transport.headers)
+
+    def test_build_async_client_uses_pooled_transport(self):
+        client = TransportBuilder(8, 4).build_async_client(
+            'http://localhost',
+            'api key')
+
+        self.assertIsInstance(client.transport, PooledAIOHTTPTransport)
+        self.assertEqual('http://localhost', client.transport.url)
+        self.assertEqual(
+            {'Authorization': 'api key'},
+            client.transport.headers)
+
+
+class TestPooledAIOHTTPTransport(TestCase):
+    def test_transport_limits_its_connection_pool(self):
+        async def connect():
+            transport = PooledAIOHTTPTransport(
+                'http://localhost',
+                {},
+                8,
+                4,
+                False)
+            await transport.connect()
+
+            try:
+                return transport.session.connector
+            finally:
+                await transport.close()
+
+        connector = asyncio.run(connect())
+
+        self.assertEqual(8, connector.limit)
+        self.assertEqual(4, connector.limit_per_host)
+        self.assertTrue(connector.force_close)
+
+    def test_transport_decodes_with_json_loads(self):
+        bodies = []
+
+        def json_loads(body):
+            bodies.append(body)
+            return loads(body)
+
+        async def execute():
+            app = web.Application()
+            app.router.add_post('/', serve_graphql)
+
+            async with TestServer(app) as server:
+                transport = PooledAIOHTTPTransport(
+                    str(server.make_url('/')),
+                    {},
+                    1,
+                    1,
+                    True,
+                    json_loads)
+                await transport.connect()
+
+                try:
+                    return await transport.execute(gql('{ id }'))
+                finally:
+                    await transport.close()
+
+        result = asyncio.run(execute())
+
+        self.assertEqual({'id': 1}, result.data)
+        self.assertEqual(['{"data": {"id": 1}}'], bodies)
+
+
+class TestJsonLoads(TestCase):
+    def test_requests_transport_decodes_with_json_loads(self):
+        bodies = []
+
+        def json_loads(body):
+            bodies.append(body)
+            return loads(body)
+
+        transport = PooledRequestsHTTPTransport(
+            'http://localhost',
+            {},
+            1,
+            1,
+            True,
+            json_loads)
+        transport.connect()
+
+        try:
+            response = Response()
+            response._content = b'{"data": {"id": 1}}'
+            for hook in transport.session.hooks['response']:
+                response = hook(response)
+
+            self.assertEqual({'data': {'id': 1}}, response.json())
+            self.assertEqual([b'{"data": {"id": 1}}'], bodies)
+        finally:
+            transport.close()
+
+    def test_requests_transport_without_json_loads(self):
+        transport = PooledRequestsHTTPTransport(
+            'http://localhost',
+            {},
+            1,
+            1,
+            True)
+        transport.connect()
+
+        try:
+            self.assertEqual([], transport.session.hooks['response'])
+        finally:
+            transport.close()
+
+    def test_requests_transport_pool_blocks_when_full(self):
+        transport = PooledRequestsHTTPTransport(
+            'http://localhost',
+            {},
+            8,
+            4,
+            True)
+        transport.connect()
+
+        try:
+            adapter = transport.session.get_adapter('http://localhost')
+            self.assertEqual(4, adapter._pool_maxsize)
+            self.assertTrue(adapter._pool_block)
+        finally:
+            transport.close()
+
+    def test_decoding_response_class(self):
+        response_class = decoding_response_class(loads)
+
+        self.assertTrue(issubclass(response_class, ClientResponse))
@@ -5,6 +5,7 @@ from noloco.utils import (
     build_operation_args,
     gql_args,
     has_files,
+    include_shape,
     pascal_case,
     gql_type,
     with_required)
@@ -295,6 +296,30 @@ class TestHasFiles(TestCase):
         self.assertFalse(has_files(args))
 
 
+class TestIncludeShape(TestCase):
+    def test_include_shape_no_include(self):
+        self.assertEqual((), include_shape({'first': 5}))
+
+    def test_include_shape_ignores_values(self):
+        args_a = {
+            'include': {
+                'a': True,
+                'b': {'first': 1, 'include': {'c': True}}
+            }
+        }
+        args_b = {
+            'include': {
+                'a': True,
+                'b': {'first': 2, 'include': {'c': True}}
+            }
+        }
+
+        self.assertEqual(
+            (('a', True), ('b', (('c', True),))),
+            include_shape(args_a))
+        self.assertEqual(include_shape(args_a), include_shape(args_b))
+
+
 class TestWithRequired(TestCase):
     def test_with_required_optional(self):
         mapped_type = 'A'